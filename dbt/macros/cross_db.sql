@@ -0,0 +1,21 @@
+-- cross_db.sql
+-- Adapter-neutral wrappers so the models build on BigQuery (prod) and DuckDB (local/offline).
+-- dbt's own cross-db macros cover types (dbt.type_*); these fill the gaps.
+
+-- safe_cast: NULL instead of an error on a bad value (BigQuery SAFE_CAST, DuckDB TRY_CAST)
+{% macro try_cast(field, type) -%}
+  {{ return(adapter.dispatch('try_cast', 'beauty_price_tracker')(field, type)) }}
+{%- endmacro %}
+
+{% macro default__try_cast(field, type) -%}
+  {{ dbt.safe_cast(field, type) }}
+{%- endmacro %}
+
+{% macro duckdb__try_cast(field, type) -%}
+  try_cast({{ field }} as {{ type }})
+{%- endmacro %}
+
+-- timestamp literal, replaces BigQuery TIMESTAMP('1970-01-01')
+{% macro timestamp_literal(value) -%}
+  cast('{{ value }}' as {{ dbt.type_timestamp() }})
+{%- endmacro %}
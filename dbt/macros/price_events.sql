@@ -0,0 +1,20 @@
+-- price_events.sql
+-- Where an incremental price_events run restarts, shared by the model and its pre-hook.
+
+-- price_events_state, looked up rather than ref()'d (it is built after price_events); none until it exists
+{% macro price_events_state() -%}
+  {{ return(adapter.get_relation(this.database, this.schema, 'price_events_state')) }}
+{%- endmacro %}
+
+-- first obs_hour to (re)process: the newest hour at the last run, which price_history may have re-debounced since
+{% macro price_events_reprocess_from(state) -%}
+  (select coalesce(max(reprocess_from), {{ timestamp_literal('1970-01-01') }}) from {{ state }})
+{%- endmacro %}
+
+-- pre-hook: drop the events this run derives again, including ones the re-debounced hour no longer produces
+{% macro price_events_clear_reprocessed() -%}
+  {%- set state = price_events_state() if is_incremental() else none -%}
+  {%- if state -%}
+  delete from {{ this }} where event_ts >= {{ price_events_reprocess_from(state) }}
+  {%- endif -%}
+{%- endmacro %}
@@ -1,6 +1,13 @@
-{{ config(materialized='view') }}
+{{ config(
+  materialized='incremental',
+  unique_key=['retailer','product_url'],
+  incremental_strategy=('merge' if target.type == 'bigquery' else 'delete+insert')
+) }}
 -- latest price per (retailer, product_url)
-with ranked as (
+-- incremental: only observations at/after the current watermark are ranked and merged over the
+-- existing rows (a key's newest row always replaces the older one). Backfilled history older than the
+-- watermark needs `dbt run --full-refresh -s current_prices`.
+with candidates as (
   select
     retailer,
     product_url,
@@ -9,12 +16,23 @@ with ranked as (
     list_price,
     discount_pct,
     in_stock,
-    observed_at_utc,
+    observed_at_utc
+  from {{ ref('stg_obs_latest') }}
+  {% if is_incremental() %}
+  where observed_at_utc >= (
+    select coalesce(max(last_seen_at_utc), {{ timestamp_literal('1970-01-01') }})
+    from {{ this }}
+  )
+  {% endif %}
+),
+ranked as (
+  select
+    *,
     row_number() over (
       partition by retailer, product_url
       order by observed_at_utc desc
     ) as rn
-  from {{ ref('stg_obs_latest') }}
+  from candidates
 )
 select
   retailer,
@@ -18,7 +18,7 @@ deltas AS (
     observed_at_utc,
     price,
     prev_price,
-    SAFE_DIVIDE(price - prev_price, NULLIF(prev_price,0)) AS price_change_pct,
+    {{ dbt_utils.safe_divide('price - prev_price', 'prev_price') }} AS price_change_pct,
     CASE 
       WHEN prev_price IS NULL THEN NULL
       WHEN price > prev_price   THEN 'up'
@@ -29,4 +29,3 @@ deltas AS (
 )
 SELECT * FROM deltas
 WHERE prev_price IS NOT NULL
-ORDER BY observed_at_utc DESC
@@ -0,0 +1,108 @@
+{{ config(
+  materialized='incremental',
+  unique_key=['sku_id','retailer','event_ts','event_type'],
+  incremental_strategy=('merge' if target.type == 'bigquery' else 'delete+insert'),
+  partition_by=({'field': 'event_date', 'data_type': 'date'} if target.type == 'bigquery' else none),
+  cluster_by=(['retailer', 'sku_id'] if target.type == 'bigquery' else none),
+  pre_hook="{{ price_events_clear_reprocessed() }}"
+) }}
+-- price_up|price_down when abs(new - prev) / prev >= var('price_change_pct') for a (sku_id, retailer),
+-- oos|restock on in_stock transitions (docs/d02-tracking-plan.md, "Event logic").
+-- incremental: observations from reprocess_from on (the newest obs_hour at the last run: price_history may
+-- since have re-debounced it), compared against each series' last price / stock reading before that hour,
+-- both kept in price_events_state (built right after this model). The pre-hook first deletes the stored
+-- events from that hour on, so a sample replaced in its hour leaves no event behind.
+-- Price and stock are separate series: a sample without a price / stock reading is skipped, not an event.
+
+{% set threshold = var('price_change_pct', 0.01) %}
+{#- without price_events_state yet, all history is reprocessed (the merge on the unique key keeps that idempotent) -#}
+{% set state = price_events_state() if is_incremental() else none %}
+
+with obs as (
+  select
+    sku_id,
+    retailer,
+    product_url,
+    observed_at_utc,
+    price,
+    in_stock
+  from {{ ref('price_history') }}
+  where sku_id is not null
+  {% if state %}
+    and obs_hour >= {{ price_events_reprocess_from(state) }}
+  {% endif %}
+),
+
+-- observations to (re)process + the series' last price and stock readings before them
+series as (
+  select * from obs
+  {% if state %}
+  union all
+  select sku_id, retailer, product_url, last_price_at, last_price, cast(null as {{ dbt.type_boolean() }})
+  from {{ state }}
+  where last_price_at is not null
+  union all
+  select sku_id, retailer, product_url, last_stock_at, cast(null as {{ dbt.type_numeric() }}), last_in_stock
+  from {{ state }}
+  where last_stock_at is not null
+  {% endif %}
+),
+
+price_steps as (
+  select
+    sku_id, retailer, product_url, observed_at_utc, price,
+    lag(price) over (partition by sku_id, retailer order by observed_at_utc) as prev_price
+  from series
+  where price is not null
+),
+stock_steps as (
+  select
+    sku_id, retailer, product_url, observed_at_utc, in_stock,
+    lag(in_stock) over (partition by sku_id, retailer order by observed_at_utc) as prev_in_stock
+  from series
+  where in_stock is not null
+),
+
+price_moves as (
+  select
+    sku_id,
+    retailer,
+    product_url,
+    observed_at_utc                                                       as event_ts,
+    case when price > prev_price then 'price_up' else 'price_down' end    as event_type,
+    prev_price,
+    price,
+    cast({{ dbt_utils.safe_divide('price - prev_price', 'prev_price') }} as {{ dbt.type_numeric() }}) as price_change_pct,
+    cast(null as {{ dbt.type_boolean() }})                                as prev_in_stock,
+    cast(null as {{ dbt.type_boolean() }})                                as in_stock
+  from price_steps
+  where prev_price is not null
+    and abs({{ dbt_utils.safe_divide('price - prev_price', 'prev_price') }}) >= {{ threshold }}
+),
+stock_moves as (
+  select
+    sku_id,
+    retailer,
+    product_url,
+    observed_at_utc                                          as event_ts,
+    case when in_stock then 'restock' else 'oos' end         as event_type,
+    cast(null as {{ dbt.type_numeric() }})                   as prev_price,
+    cast(null as {{ dbt.type_numeric() }})                   as price,
+    cast(null as {{ dbt.type_numeric() }})                   as price_change_pct,
+    prev_in_stock,
+    in_stock
+  from stock_steps
+  where prev_in_stock is not null
+    and in_stock != prev_in_stock
+),
+
+events as (
+  select * from price_moves
+  union all
+  select * from stock_moves
+)
+
+select
+  cast(event_ts as date) as event_date,
+  *
+from events
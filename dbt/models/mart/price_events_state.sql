@@ -0,0 +1,91 @@
+{{ config(
+  materialized='incremental',
+  unique_key=['sku_id','retailer'],
+  incremental_strategy=('merge' if target.type == 'bigquery' else 'delete+insert')
+) }}
+-- depends_on: {{ ref('price_events') }}
+-- price_events' state: per (sku_id, retailer) the last price and the last in_stock reading in price_history
+-- before reprocess_from, the newest obs_hour at this run. That hour is left out because price_history
+-- re-debounces it when a later sample arrives, so the next price_events run starts again from it.
+-- Built right after price_events, folding in the hours it just processed up to reprocess_from, so the next
+-- run compares against it however long a series has been quiet. Build the two together
+-- (`dbt run -s price_events+`); refreshing this one alone would skip the events of the hours it folds in.
+
+{% set newest_hour %}(select max(obs_hour) from {{ ref('price_history') }}){% endset %}
+
+with batch as (
+  select
+    sku_id,
+    retailer,
+    product_url,
+    observed_at_utc,
+    price,
+    in_stock
+  from {{ ref('price_history') }}
+  where sku_id is not null
+    and obs_hour < {{ newest_hour }}
+  {% if is_incremental() %}
+    and obs_hour >= (
+      select coalesce(max(reprocess_from), {{ timestamp_literal('1970-01-01') }})
+      from {{ this }}
+    )
+  {% endif %}
+),
+
+latest as (
+  select
+    sku_id, retailer, product_url,
+    row_number() over (partition by sku_id, retailer order by observed_at_utc desc) as rn
+  from batch
+),
+last_price as (
+  select
+    sku_id, retailer, price, observed_at_utc,
+    row_number() over (partition by sku_id, retailer order by observed_at_utc desc) as rn
+  from batch
+  where price is not null
+),
+last_stock as (
+  select
+    sku_id, retailer, in_stock, observed_at_utc,
+    row_number() over (partition by sku_id, retailer order by observed_at_utc desc) as rn
+  from batch
+  where in_stock is not null
+),
+
+-- the stored state of the series in this batch (a reading the batch lacks is carried over)
+prior as (
+  select sku_id, retailer, last_price, last_price_at, last_in_stock, last_stock_at
+  {% if is_incremental() %}
+  from {{ this }}
+  {% else %}
+  from (
+    select
+      cast(null as {{ dbt.type_string() }})    as sku_id,
+      cast(null as {{ dbt.type_string() }})    as retailer,
+      cast(null as {{ dbt.type_numeric() }})   as last_price,
+      cast(null as {{ dbt.type_timestamp() }}) as last_price_at,
+      cast(null as {{ dbt.type_boolean() }})   as last_in_stock,
+      cast(null as {{ dbt.type_timestamp() }}) as last_stock_at
+  ) as empty
+  where 1 = 0
+  {% endif %}
+)
+
+select
+  l.sku_id,
+  l.retailer,
+  l.product_url,
+  coalesce(p.price, prior.last_price)                 as last_price,
+  coalesce(p.observed_at_utc, prior.last_price_at)    as last_price_at,
+  coalesce(s.in_stock, prior.last_in_stock)           as last_in_stock,
+  coalesce(s.observed_at_utc, prior.last_stock_at)    as last_stock_at,
+  {{ newest_hour }}                                   as reprocess_from
+from latest as l
+left join last_price as p
+  on p.sku_id = l.sku_id and p.retailer = l.retailer and p.rn = 1
+left join last_stock as s
+  on s.sku_id = l.sku_id and s.retailer = l.retailer and s.rn = 1
+left join prior
+  on prior.sku_id = l.sku_id and prior.retailer = l.retailer
+where l.rn = 1
@@ -1,9 +1,14 @@
 {{ config(
   materialized='incremental',
-  unique_key=['retailer','product_url','observed_at_utc']
+  unique_key=['sku_id','retailer','obs_hour'],
+  incremental_strategy=('merge' if target.type == 'bigquery' else 'delete+insert'),
+  on_schema_change='append_new_columns'
 ) }}
+-- one row per (sku_id, retailer, hour) from the debounced stg_obs_hourly,
+-- so history grows with time, not with retries/reruns
 
 SELECT
+  sku_id,
   retailer,
   product_url,
   http_status,
@@ -11,13 +16,14 @@ SELECT
   list_price,
   discount_pct,
   in_stock,
-  observed_at_utc
-FROM {{ ref('stg_obs_latest') }}
+  observed_at_utc,
+  obs_hour
+FROM {{ ref('stg_obs_hourly') }}
 
 {% if is_incremental() %}
--- only new rows since last run
-WHERE observed_at_utc > (
-  SELECT IFNULL(MAX(observed_at_utc), TIMESTAMP('1970-01-01'))
+-- only hours from the newest stored one on (it may have been re-debounced)
+WHERE obs_hour >= (
+  SELECT COALESCE(MAX(obs_hour), {{ timestamp_literal('1970-01-01') }})
   FROM {{ this }}
 )
 {% endif %}
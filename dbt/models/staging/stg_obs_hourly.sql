@@ -0,0 +1,59 @@
+{{ config(
+  materialized='incremental',
+  unique_key=['sku_id','retailer','obs_hour'],
+  incremental_strategy=('merge' if target.type == 'bigquery' else 'delete+insert')
+) }}
+-- stg_obs_hourly.sql
+-- Debounce: one sample per (sku_id, retailer, hour), the last good one (HTTP 200, or a 304 revalidation
+-- reusing the cached result, parsed without error into a price or a stock reading: an out-of-stock page
+-- has no price), else the last one. Reruns/retries inside an hour replace that hour's row instead of adding rows.
+-- incremental: the newest stored hour is re-derived in full, so late samples in it are picked up.
+
+with src as (
+  select
+    sku_id,
+    retailer,
+    product_url,
+    http_status,
+    price,
+    list_price,
+    discount_pct,
+    in_stock,
+    parse_error,
+    observed_at_utc,
+    {{ dbt.date_trunc('hour', 'observed_at_utc') }} as obs_hour
+  from {{ ref('stg_obs_latest') }}
+  where sku_id is not null
+  {% if is_incremental() %}
+    and observed_at_utc >= (
+      select coalesce(max(obs_hour), {{ timestamp_literal('1970-01-01') }})
+      from {{ this }}
+    )
+  {% endif %}
+),
+ranked as (
+  select
+    *,
+    row_number() over (
+      partition by sku_id, retailer, obs_hour
+      order by
+        case when http_status in (200, 304) and coalesce(parse_error, '') = ''
+                  and (price is not null or in_stock is not null) then 0 else 1 end,
+        observed_at_utc desc
+    ) as rn
+  from src
+)
+
+select
+  sku_id,
+  retailer,
+  product_url,
+  http_status,
+  price,
+  list_price,
+  discount_pct,
+  in_stock,
+  observed_at_utc,
+  obs_hour
+from ranked
+where rn = 1
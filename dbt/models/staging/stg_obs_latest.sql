@@ -1,19 +1,25 @@
 -- stg_obs_latest.sql
--- Normalize types and column names coming from the obs_latest seed.
+-- Normalize types and column names coming from the obs_latest seed
+-- (or, on the duckdb target, from raw.observations written by the runner).
 
 with src as (
   select
     retailer,
     product_url,
-    safe_cast(http_status as int64)                     as http_status,
-    safe_cast(price  as numeric)                   as price,
-    safe_cast(list_price as numeric)                   as list_price,   -- backticks: list is a reserved word
-    safe_cast(discount_pct   as numeric)                   as discount_pct,     -- source column is 'disc'
-    safe_cast(in_stock as bool)                    as in_stock,
-    safe_cast(sku_id as string)               as sku_id,
+    {{ try_cast('http_status', dbt.type_int()) }}          as http_status,
+    {{ try_cast('price', dbt.type_numeric()) }}            as price,
+    {{ try_cast('list_price', dbt.type_numeric()) }}       as list_price,
+    {{ try_cast('discount_pct', dbt.type_numeric()) }}     as discount_pct,
+    {{ try_cast('in_stock', dbt.type_boolean()) }}         as in_stock,
+    {{ try_cast('sku_id', dbt.type_string()) }}            as sku_id,
+    {{ try_cast('parse_error', dbt.type_string()) }}       as parse_error,
     -- ISO8601 string -> TIMESTAMP (UTC)
-    cast(observed_at_utc as timestamp)   as observed_at_utc
+    cast(observed_at_utc as {{ dbt.type_timestamp() }})   as observed_at_utc
+  {% if target.type == 'duckdb' %}
+  from {{ source('raw', 'observations') }}
+  {% else %}
   from {{ ref('obs_latest') }}
+  {% endif %}
 )
 
 select
@@ -25,5 +31,6 @@ select
   discount_pct,
   in_stock,
   sku_id,
+  parse_error,
   observed_at_utc
 from src
@@ -0,0 +1,33 @@
+-- Regression: the incremental current_prices must equal the full window-function version
+-- over stg_obs_latest (rows missing on either side fail the test).
+WITH expected AS (
+  SELECT
+    retailer,
+    product_url,
+    http_status,
+    price,
+    list_price,
+    discount_pct,
+    in_stock,
+    observed_at_utc AS last_seen_at_utc
+  FROM (
+    SELECT
+      *,
+      ROW_NUMBER() OVER (PARTITION BY retailer, product_url ORDER BY observed_at_utc DESC) AS rn
+    FROM {{ ref('stg_obs_latest') }}
+  ) ranked
+  WHERE rn = 1
+),
+actual AS (
+  SELECT retailer, product_url, http_status, price, list_price, discount_pct, in_stock, last_seen_at_utc
+  FROM {{ ref('current_prices') }}
+),
+missing AS (
+  SELECT 'missing' AS issue, * FROM (SELECT * FROM expected {{ dbt.except() }} SELECT * FROM actual) e
+),
+extra AS (
+  SELECT 'extra' AS issue, * FROM (SELECT * FROM actual {{ dbt.except() }} SELECT * FROM expected) a
+)
+SELECT * FROM missing
+UNION ALL
+SELECT * FROM extra
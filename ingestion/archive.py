@@ -0,0 +1,195 @@
+# ingestion/archive.py
+# Content-addressed, compressed archive of fetched pages (replaces the raw debug/ dump).
+# - blobs/<aa>/<sha256>.zst (zstd; .gz when zstandard is not installed), written once per unique body
+# - index.sqlite maps (run_id, sku_id, retailer) -> blob, plus URL / timestamp / HTTP status
+# - prune() enforces a retention window and a total size cap
+# - open_text()/read() stream a page back out for re-parsing or debugging
+
+import io, gzip, sqlite3, threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, TextIO, Tuple
+
+from validators import content_hash
+
+try:
+    import zstandard as zstd
+except ImportError:  # optional: fall back to gzip
+    zstd = None
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash         TEXT PRIMARY KEY,
+    codec        TEXT NOT NULL,
+    raw_bytes    INTEGER NOT NULL,
+    stored_bytes INTEGER NOT NULL,
+    created_at   TEXT NOT NULL,
+    last_seen_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id          TEXT NOT NULL,
+    sku_id          TEXT,
+    retailer        TEXT NOT NULL,
+    product_url     TEXT,
+    observed_at_utc TEXT NOT NULL,
+    http_status     INTEGER,
+    blob            TEXT NOT NULL REFERENCES blobs(hash)
+);
+CREATE INDEX IF NOT EXISTS pages_run      ON pages(run_id, sku_id, retailer);
+CREATE INDEX IF NOT EXISTS pages_retailer ON pages(retailer, observed_at_utc);
+CREATE INDEX IF NOT EXISTS pages_blob     ON pages(blob);
+"""
+
+_EXT = {"zstd": ".zst", "gzip": ".gz"}
+
+def _utc_now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+class HtmlArchive:
+    def __init__(self, root: Path, level: int = 10):
+        self.root = root
+        self.level = level
+        self.codec = "zstd" if zstd is not None else "gzip"
+        (root / "blobs").mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(root / "index.sqlite"), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(_SCHEMA)
+
+    # ---------- write ----------
+
+    def _blob_path(self, h: str, codec: str) -> Path:
+        return self.root / "blobs" / h[:2] / f"{h}{_EXT[codec]}"
+
+    def _compress(self, raw: bytes) -> bytes:
+        if self.codec == "zstd":
+            return zstd.ZstdCompressor(level=self.level).compress(raw)
+        return gzip.compress(raw, compresslevel=6)
+
+    def put(self, html: str, *, run_id: str, sku_id: Optional[str], retailer: str,
+            product_url: str, http_status: int, observed_at_utc: Optional[str] = None) -> str:
+        """Store `html` (deduplicated by content hash) and index it; returns the blob hash."""
+        h = content_hash(html)
+        with self._lock:
+            known = self._db.execute("SELECT 1 FROM blobs WHERE hash = ?", (h,)).fetchone()
+        if not known:
+            raw = html.encode("utf-8", errors="ignore")
+            data = self._compress(raw)
+            path = self._blob_path(h, self.codec)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f"{path.suffix}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            tmp.replace(path)
+            with self._lock, self._db:
+                self._db.execute(
+                    "INSERT OR IGNORE INTO blobs (hash, codec, raw_bytes, stored_bytes, created_at, last_seen_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (h, self.codec, len(raw), len(data), _utc_now(), _utc_now()),
+                )
+        self.link(h, run_id=run_id, sku_id=sku_id, retailer=retailer, product_url=product_url,
+                  http_status=http_status, observed_at_utc=observed_at_utc)
+        return h
+
+    def link(self, blob: str, *, run_id: str, sku_id: Optional[str], retailer: str,
+             product_url: str, http_status: int, observed_at_utc: Optional[str] = None) -> bool:
+        """Index an already-archived blob for this observation (e.g. after a 304). False if unknown."""
+        ts = observed_at_utc or _utc_now()
+        with self._lock, self._db:
+            cur = self._db.execute("UPDATE blobs SET last_seen_at = ? WHERE hash = ?", (ts, blob))
+            if cur.rowcount == 0:
+                return False
+            self._db.execute(
+                "INSERT INTO pages (run_id, sku_id, retailer, product_url, observed_at_utc, http_status, blob) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (run_id, sku_id, retailer, product_url, ts, http_status, blob),
+            )
+        return True
+
+    # ---------- read ----------
+
+    def pages(self, run_id: Optional[str] = None, sku_id: Optional[str] = None, retailer: Optional[str] = None,
+              since: Optional[str] = None, until: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Index rows matching the filters (timestamps are ISO8601 UTC strings), oldest first."""
+        where, args = [], []
+        for col, val in (("run_id", run_id), ("sku_id", sku_id), ("retailer", retailer)):
+            if val is not None:
+                where.append(f"{col} = ?")
+                args.append(val)
+        if since:
+            where.append("observed_at_utc >= ?"); args.append(since)
+        if until:
+            where.append("observed_at_utc < ?"); args.append(until)
+        sql = "SELECT * FROM pages" + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY observed_at_utc, id"
+        with self._lock:
+            rows = [dict(r) for r in self._db.execute(sql, args)]
+        return iter(rows)
+
+    def open_text(self, blob: str) -> TextIO:
+        """Stream a stored page back out as text (caller closes)."""
+        with self._lock:
+            row = self._db.execute("SELECT codec FROM blobs WHERE hash = ?", (blob,)).fetchone()
+        if row is None:
+            raise KeyError(blob)
+        path = self._blob_path(blob, row["codec"])
+        if row["codec"] == "zstd":
+            if zstd is None:
+                raise RuntimeError("archive blob is zstd-compressed but zstandard is not installed")
+            return io.TextIOWrapper(zstd.ZstdDecompressor().stream_reader(path.open("rb")),
+                                    encoding="utf-8", errors="ignore")
+        return gzip.open(path, "rt", encoding="utf-8", errors="ignore")
+
+    def read(self, blob: str) -> str:
+        with self.open_text(blob) as f:
+            return f.read()
+
+    # ---------- retention ----------
+
+    def stored_bytes(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(stored_bytes), 0) FROM blobs").fetchone()[0]
+
+    def _drop_orphans(self) -> Tuple[int, int]:
+        with self._lock, self._db:
+            orphans = self._db.execute(
+                "SELECT hash, codec, stored_bytes FROM blobs WHERE hash NOT IN (SELECT DISTINCT blob FROM pages)"
+            ).fetchall()
+            for o in orphans:
+                self._blob_path(o["hash"], o["codec"]).unlink(missing_ok=True)
+            self._db.executemany("DELETE FROM blobs WHERE hash = ?", [(o["hash"],) for o in orphans])
+        return len(orphans), sum(o["stored_bytes"] for o in orphans)
+
+    def prune(self, max_bytes: Optional[int] = None, max_age_days: Optional[int] = None) -> Dict[str, int]:
+        """Drop index rows older than `max_age_days`, then least-recently-seen blobs until under `max_bytes`."""
+        pages_removed = 0
+        if max_age_days is not None:
+            cutoff = (datetime.now(timezone.utc) - timedelta(days=max_age_days)).strftime("%Y-%m-%dT%H:%M:%SZ")
+            with self._lock, self._db:
+                pages_removed += self._db.execute("DELETE FROM pages WHERE observed_at_utc < ?", (cutoff,)).rowcount
+        blobs_removed, freed = self._drop_orphans()
+
+        if max_bytes is not None:
+            total = self.stored_bytes()
+            if total > max_bytes:
+                with self._lock:
+                    victims = self._db.execute(
+                        "SELECT hash, stored_bytes FROM blobs ORDER BY last_seen_at, created_at"
+                    ).fetchall()
+                doomed = []
+                for v in victims:
+                    if total <= max_bytes:
+                        break
+                    doomed.append((v["hash"],))
+                    total -= v["stored_bytes"]
+                with self._lock, self._db:
+                    pages_removed += sum(
+                        self._db.execute("DELETE FROM pages WHERE blob = ?", d).rowcount for d in doomed
+                    )
+                b, f = self._drop_orphans()
+                blobs_removed += b
+                freed += f
+        return {"pages_removed": pages_removed, "blobs_removed": blobs_removed, "bytes_freed": freed}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,112 @@
+# ingestion/cadence.py
+# Adaptive per-domain request interval, enforcing thresholds.block_rate_max from retail_coverage.yml:
+# - keeps a rolling window of recent responses per retailer (blocked = 0 / 403 / 429 / 5xx)
+# - the rate is only judged on at least 1/block_rate_max responses (50 at 2%): one block in 10 is not 10%
+# - block rate above the max -> double the interval and judge the new pace on a fresh full window;
+#   healthy window -> shave max(step_seconds, recover_pct of the interval) off it, so a slowed lane recovers
+#   in proportion to how far it backed off
+# - interval stays between the coverage rate limit (floor) and max_slowdown x the selectors.yml one (ceiling)
+# - state persists in data/cache/cadence.json so the next run starts where this one ended
+
+import json, math, threading
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+BLOCK_STATUSES = {0, 403, 429}
+
+def is_block_status(status: int) -> bool:
+    return status in BLOCK_STATUSES or 500 <= status < 600
+
+class CadenceController:
+    """AIMD controller for one domain; `record()` returns the new interval when it changes."""
+
+    def __init__(self, retailer: str, base_s: float, floor_s: float, block_rate_max: float = 0.02,
+                 window: int = 50, min_samples: int = 10, step_s: float = 1.0, max_slowdown: float = 8.0,
+                 recover_pct: float = 0.1, interval_s: Optional[float] = None, history: Iterable[int] = ()):
+        self.retailer = retailer
+        self.floor_s = max(0.0, float(floor_s))
+        self.ceiling_s = max(self.floor_s, float(base_s) * max_slowdown)
+        self.block_rate_max = block_rate_max
+        self.min_samples = max(1, min_samples)
+        # fewer responses than 1/block_rate_max cannot tell a tolerated rate from a bad one
+        self.judge_samples = max(self.min_samples, math.ceil(1 / block_rate_max) if block_rate_max > 0 else 0)
+        self.step_s = step_s
+        self.recover_pct = max(0.0, recover_pct)
+        self.interval_s = self._clamp(base_s if interval_s is None else interval_s)
+        self.window = deque((1 if h else 0 for h in history), maxlen=max(window, self.judge_samples))
+        self.changes = 0
+        self.judged_rate = 0.0  # block rate behind the last adjustment (the window is cleared after a slowdown)
+        self._since_eval = 0
+        self._lock = threading.Lock()
+
+    def _clamp(self, v: float) -> float:
+        return min(self.ceiling_s, max(self.floor_s, float(v)))
+
+    def block_rate(self) -> float:
+        return sum(self.window) / len(self.window) if self.window else 0.0
+
+    def record(self, status: int, blocked: Optional[bool] = None) -> Optional[float]:
+        with self._lock:
+            self.window.append(1 if (is_block_status(status) if blocked is None else blocked) else 0)
+            self._since_eval += 1
+            if len(self.window) < self.judge_samples or self._since_eval < self.min_samples:
+                return None
+            self._since_eval = 0
+            old = self.interval_s
+            self.judged_rate = self.block_rate()
+            if self.judged_rate > self.block_rate_max:
+                self.interval_s = self._clamp(old * 2)   # multiplicative back-off
+                self.window.clear()                      # judge the new pace on a fresh full window
+            else:
+                self.interval_s = self._clamp(old - max(self.step_s, old * self.recover_pct))
+            if self.interval_s == old:
+                return None
+            self.changes += 1
+            return self.interval_s
+
+    def state(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "interval_s": round(self.interval_s, 3),
+                "block_rate": round(self.block_rate(), 4),
+                "history": list(self.window),
+                "updated_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            }
+
+class CadenceStore:
+    """Persisted controller state for every domain (data/cache/cadence.json)."""
+
+    def __init__(self, path: Path, settings: Optional[Dict[str, Any]] = None, block_rate_max: float = 0.02):
+        self.path = path
+        self.settings = settings or {}
+        self.block_rate_max = block_rate_max
+        self._state: Dict[str, Dict[str, Any]] = {}
+        self._controllers: Dict[str, CadenceController] = {}
+        if path.exists():
+            try:
+                self._state = json.loads(path.read_text(encoding="utf-8")) or {}
+            except (OSError, ValueError):
+                self._state = {}
+
+    def controller(self, retailer: str, base_s: float, floor_s: float) -> CadenceController:
+        if retailer not in self._controllers:
+            saved = self._state.get(retailer) or {}
+            s = self.settings
+            self._controllers[retailer] = CadenceController(
+                retailer, base_s, floor_s, self.block_rate_max,
+                window=int(s.get("window", 50)), min_samples=int(s.get("min_samples", 10)),
+                step_s=float(s.get("step_seconds", 1.0)), max_slowdown=float(s.get("max_slowdown", 8.0)),
+                recover_pct=float(s.get("recover_pct", 10)) / 100,
+                interval_s=saved.get("interval_s"), history=saved.get("history") or (),
+            )
+        return self._controllers[retailer]
+
+    def save(self):
+        for retailer, c in self._controllers.items():
+            self._state[retailer] = c.state()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._state, indent=1, sort_keys=True), encoding="utf-8")
+        tmp.replace(self.path)
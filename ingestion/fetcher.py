@@ -0,0 +1,189 @@
+# ingestion/fetcher.py
+# HTTP layer for the runner: one pooled keep-alive requests.Session per retailer.
+# - connection reuse across a lane (no TCP+TLS handshake per PDP)
+# - pool size configurable (defaults to the lane's worker count)
+# - Accept-Encoding negotiated from the decoders actually installed (gzip/deflate, + br/zstd when available)
+# - optional block detector: the body is streamed and the download aborted as soon as a block page is recognised
+# - optional streaming mode: probe the prefix at growing checkpoints and stop once the caller has its fields
+# - per-request stage timings: connect (DNS+TCP+TLS, 0 on a reused connection), ttfb, download, probe
+
+import time, threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util import make_headers
+
+ACCEPT_ENCODING = make_headers(accept_encoding=True)["accept-encoding"]
+
+# connections are opened lazily by the thread that sends the request, so thread-local
+# accumulators attribute connect (and probe) time to the fetch that paid for it
+_timing = threading.local()
+
+class _TimedConnect:
+    def connect(self):
+        t0 = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _timing.connect_s = getattr(_timing, "connect_s", 0.0) + time.perf_counter() - t0
+
+class _TimedHTTPConnection(_TimedConnect, HTTPConnection):
+    pass
+
+class _TimedHTTPSConnection(_TimedConnect, HTTPSConnection):
+    pass
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+class FetchResult:
+    __slots__ = ("status", "text", "headers", "wire_bytes", "body_bytes", "elapsed_s", "blocked", "truncated",
+                 "timings")
+
+    def __init__(self, status: int, text: str, headers: Optional[Dict[str, str]] = None,
+                 wire_bytes: int = 0, body_bytes: int = 0, elapsed_s: float = 0.0, blocked: str = "",
+                 truncated: bool = False, timings: Optional[Dict[str, float]] = None):
+        self.status = status
+        self.text = text
+        self.headers = headers or {}
+        self.wire_bytes = wire_bytes    # bytes received from the socket (compressed)
+        self.body_bytes = body_bytes    # bytes after content decoding
+        self.elapsed_s = elapsed_s
+        self.blocked = blocked          # block-detector reason ("" = not a block page)
+        self.truncated = truncated      # body cut short (block page, probe satisfied or byte cap)
+        self.timings = timings or {}    # seconds per stage: connect, ttfb, download, probe
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 200 and not self.blocked and not self.text.startswith("__ERROR__")
+
+class RetailerSession:
+    """Keep-alive session for one retailer domain, shared by all workers of its lane."""
+
+    def __init__(self, retailer: str, ua: str, pool_size: int = 1, timeout: int = 30):
+        self.retailer = retailer
+        self.timeout = timeout
+        self.session = requests.Session()
+        self._adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max(1, pool_size), pool_block=True)
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+        self._adapter.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool, "https": _TimedHTTPSConnectionPool,
+        }
+        self.session.headers.update({
+            "User-Agent": ua or "Mozilla/5.0",
+            "Accept-Language": "fr-FR,fr;q=0.9,en;q=0.8",
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            "Accept-Encoding": ACCEPT_ENCODING,
+            "Connection": "keep-alive",
+        })
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.wire_bytes = 0
+        self.body_bytes = 0
+        self.blocked = 0
+
+    def connections_opened(self) -> int:
+        """New TCP(+TLS) connections made so far across this session's pools."""
+        pools = self._adapter.poolmanager.pools
+        total = 0
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                total += getattr(pool, "num_connections", 0)
+        return total
+
+    def _read_streamed(self, resp: requests.Response, detector=None, probe: Optional[Callable[[str], bool]] = None,
+                       first_probe: int = 65536, max_bytes: Optional[int] = None) -> Tuple[str, bool]:
+        """Stream the body; returns (block reason or "", truncated).
+
+        - detector: the first `detector.scan_bytes` are checked for block needles before anything else
+        - probe: called on the decoded prefix at first_probe, 2x, 4x ... bytes; True = we have what we need
+        - max_bytes: hard cap on bytes read
+        Stopping early closes the response, so that connection is dropped instead of returned to the pool.
+        """
+        buf = bytearray()
+        _timing.probe_s = 0.0
+        checked = detector is None
+        next_probe = first_probe
+        enc = resp.encoding or "utf-8"
+        prefix = lambda n=None: bytes(buf[:n] if n else buf).decode(enc, errors="replace")
+        for chunk in resp.iter_content(chunk_size=16384):
+            buf += chunk
+            stop = bool(max_bytes and len(buf) >= max_bytes)
+            if not checked and (len(buf) >= detector.scan_bytes or stop):
+                checked = True
+                reason = detector.check_prefix(prefix(detector.scan_bytes))
+                if reason:
+                    resp._content = bytes(buf)
+                    resp.close()
+                    return reason, True
+            if probe is not None and len(buf) >= next_probe and not stop:
+                next_probe *= 2
+                t_probe = time.perf_counter()
+                stop = probe(prefix())
+                _timing.probe_s += time.perf_counter() - t_probe
+            if stop:
+                resp._content = bytes(buf)
+                resp.close()
+                return "", True
+        resp._content = bytes(buf)  # lets resp.text apply requests' usual charset detection
+        return (detector.check_complete(resp.text) or "") if detector is not None else "", False
+
+    def fetch(self, url: str, headers: Optional[Dict[str, str]] = None, detector=None,
+              probe: Optional[Callable[[str], bool]] = None, first_probe: int = 65536,
+              max_bytes: Optional[int] = None) -> FetchResult:
+        """GET `url`; with a plans.BlockDetector and/or a probe the body is streamed and may be cut short."""
+        _timing.connect_s = 0.0
+        _timing.probe_s = 0.0
+        t0 = time.perf_counter()
+        try:
+            blocked, truncated = "", False
+            if detector is not None or probe is not None or max_bytes:
+                resp = self.session.get(url, headers=headers, timeout=self.timeout, stream=True)
+                if resp.status_code == 200:
+                    blocked, truncated = self._read_streamed(resp, detector, probe, first_probe, max_bytes)
+            else:
+                resp = self.session.get(url, headers=headers, timeout=self.timeout)
+            body = resp.content
+            try:
+                wire = int(resp.raw.tell())
+            except Exception:
+                wire = len(body)
+            total = time.perf_counter() - t0
+            elapsed = resp.elapsed.total_seconds()  # request sent -> headers parsed (includes connect)
+            connect = min(_timing.connect_s, elapsed)
+            timings = {"connect": connect, "ttfb": elapsed - connect,
+                       "download": max(0.0, total - elapsed - _timing.probe_s), "probe": _timing.probe_s}
+            res = FetchResult(resp.status_code, resp.text, dict(resp.headers), wire, len(body),
+                              elapsed, blocked, truncated, timings)
+        except Exception as e:
+            res = FetchResult(0, f"__ERROR__{e}", timings={"connect": _timing.connect_s,
+                                                          "ttfb": time.perf_counter() - t0 - _timing.connect_s})
+        with self._lock:
+            self.requests += 1
+            self.wire_bytes += res.wire_bytes
+            self.body_bytes += res.body_bytes
+            self.blocked += bool(res.blocked)
+        return res
+
+    def stats(self) -> Dict[str, Any]:
+        opened = self.connections_opened()
+        return {
+            "requests": self.requests,
+            "connections_opened": opened,
+            "handshakes_saved": max(0, self.requests - opened),
+            "wire_bytes": self.wire_bytes,
+            "body_bytes": self.body_bytes,
+            "blocked_pages": self.blocked,
+            "accept_encoding": ACCEPT_ENCODING,
+        }
+
+    def close(self):
+        self.session.close()
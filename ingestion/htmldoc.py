@@ -0,0 +1,183 @@
+# ingestion/htmldoc.py
+# Pluggable HTML parser backends behind one small DOM surface.
+# - html.parser / lxml go through BeautifulSoup (+ soupsieve for CSS)
+# - selectolax uses the lexbor engine directly (much faster on big Amazon PDPs)
+# Extraction code only uses: select_one / select / get_text / get / name / find / iter_text.
+# Selectors can be passed as raw CSS strings or as pre-compiled `Selector`s.
+
+from typing import Dict, Iterator, List, Optional, Union
+
+import soupsieve as sv
+from bs4 import BeautifulSoup, FeatureNotFound
+from bs4.element import CData, NavigableString, Tag
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # optional backend
+    LexborHTMLParser = None
+
+PARSERS = ("html.parser", "lxml", "selectolax")
+DEFAULT_PARSER = "html.parser"
+SOUP_PARSERS = ("html.parser", "lxml")  # BeautifulSoup tree builders, for code that walks bs4 trees itself
+
+# text inside these never counts as page text (matches BeautifulSoup.get_text defaults)
+_NON_TEXT_TAGS = {"script", "style", "template"}
+# ... and iter_text (visible text only) also skips these
+_HIDDEN_TAGS = _NON_TEXT_TAGS | {"noscript"}
+_TEXT_TYPES = (NavigableString, CData)  # not comments, doctypes or script/style strings
+
+class Selector:
+    """A CSS selector compiled once (soupsieve) and reused for every page."""
+    __slots__ = ("css", "sieve")
+
+    def __init__(self, css: str):
+        self.css = css.strip()
+        self.sieve = sv.compile(self.css)
+
+    def __repr__(self) -> str:
+        return f"Selector({self.css!r})"
+
+Css = Union[str, Selector]
+
+# ---------- BeautifulSoup backends ----------
+
+class SoupNode:
+    __slots__ = ("_el",)
+
+    def __init__(self, el):
+        self._el = el
+
+    @property
+    def name(self) -> str:
+        return self._el.name
+
+    def get(self, attr: str, default=None):
+        return self._el.get(attr, default)
+
+    def get_text(self) -> str:
+        return self._el.get_text(" ", strip=True)
+
+    def iter_text(self) -> Iterator[str]:
+        """Stripped visible text nodes in document order, one at a time (no joined page string)."""
+        stack = [self._el]
+        while stack:
+            cur = stack.pop()
+            if isinstance(cur, Tag):
+                if cur.name not in _HIDDEN_TAGS:
+                    stack.extend(reversed(cur.contents))
+            elif type(cur) in _TEXT_TYPES:
+                s = cur.strip()
+                if s:
+                    yield s
+
+    def find(self, tag: str) -> Optional["SoupNode"]:
+        el = self._el.find(tag)
+        return SoupNode(el) if el is not None else None
+
+    def select_one(self, css: Css) -> Optional["SoupNode"]:
+        el = css.sieve.select_one(self._el) if isinstance(css, Selector) else self._el.select_one(css)
+        return SoupNode(el) if el is not None else None
+
+    def select(self, css: Css) -> List["SoupNode"]:
+        els = css.sieve.select(self._el) if isinstance(css, Selector) else self._el.select(css)
+        return [SoupNode(el) for el in els]
+
+class SoupDocument(SoupNode):
+    __slots__ = ()
+
+    def __init__(self, html: str, features: str):
+        super().__init__(BeautifulSoup(html, features))
+
+    def script_texts(self, script_type: str) -> List[str]:
+        return [tag.get_text(" ", strip=True) for tag in self._el.find_all("script", attrs={"type": script_type})]
+
+# ---------- selectolax (lexbor) backend ----------
+
+def _lexbor_strings(node, skip=_NON_TEXT_TAGS) -> Iterator[str]:
+    """Stripped text nodes in document order, not descending into `skip` tags."""
+    stack = [node]
+    while stack:
+        cur = stack.pop()
+        tag = cur.tag
+        if tag == "-text":
+            s = (cur.text_content or "").strip()
+            if s:
+                yield s
+        elif tag not in skip and not tag.startswith(("-", "_", "!")):
+            children = list(cur.iter(include_text=True))
+            stack.extend(reversed(children))
+
+def _lexbor_text(node) -> str:
+    """Same shape as BeautifulSoup's get_text(" ", strip=True): stripped text nodes joined by a space."""
+    return " ".join(_lexbor_strings(node))
+
+class LexborNode:
+    __slots__ = ("_node",)
+
+    def __init__(self, node):
+        self._node = node
+
+    @property
+    def name(self) -> str:
+        return self._node.tag
+
+    def get(self, attr: str, default=None):
+        attrs: Dict[str, Optional[str]] = self._node.attributes
+        if attr not in attrs:
+            return default
+        val = attrs[attr]
+        return "" if val is None else val  # valueless attributes (e.g. `disabled`) read as "" like bs4
+
+    def get_text(self) -> str:
+        return _lexbor_text(self._node)
+
+    def iter_text(self) -> Iterator[str]:
+        return _lexbor_strings(self._node, _HIDDEN_TAGS)
+
+    def find(self, tag: str) -> Optional["LexborNode"]:
+        el = self._node.css_first(tag)
+        return LexborNode(el) if el is not None else None
+
+    def select_one(self, css: Css) -> Optional["LexborNode"]:
+        el = self._node.css_first(css.css if isinstance(css, Selector) else css)
+        return LexborNode(el) if el is not None else None
+
+    def select(self, css: Css) -> List["LexborNode"]:
+        return [LexborNode(el) for el in self._node.css(css.css if isinstance(css, Selector) else css)]
+
+class LexborDocument(LexborNode):
+    __slots__ = ("_tree",)
+
+    def __init__(self, html: str):
+        if LexborHTMLParser is None:
+            raise RuntimeError("parser 'selectolax' requested but selectolax is not installed (pip install selectolax)")
+        self._tree = LexborHTMLParser(html)
+        super().__init__(self._tree.root)
+
+    def script_texts(self, script_type: str) -> List[str]:
+        return [(tag.text(deep=True) or "").strip() for tag in self._tree.css(f'script[type="{script_type}"]')]
+
+# ---------- factory ----------
+
+def available_parsers() -> List[str]:
+    out = ["html.parser"]
+    try:
+        BeautifulSoup("", "lxml")
+        out.append("lxml")
+    except FeatureNotFound:
+        pass
+    if LexborHTMLParser is not None:
+        out.append("selectolax")
+    return out
+
+def default_soup_parser() -> str:
+    """lxml when installed (several times faster than html.parser on big PDPs), else html.parser."""
+    return "lxml" if "lxml" in available_parsers() else "html.parser"
+
+def parse_document(html: str, parser: str = DEFAULT_PARSER):
+    """Build a document for `html` with the requested backend."""
+    if parser == "selectolax":
+        return LexborDocument(html)
+    if parser in SOUP_PARSERS:
+        return SoupDocument(html, parser)
+    raise ValueError(f"unknown parser {parser!r} (expected one of {', '.join(PARSERS)})")
@@ -0,0 +1,166 @@
+# ingestion/jsonld.py
+# schema.org JSON-LD straight from the raw HTML, without building a DOM.
+# - script_blocks(): <script type="application/ld+json"> bodies found by a regex scan of the tags (comments skipped)
+# - parsed with orjson when installed, else the stdlib json module
+# - extract(): one pass over the decoded blocks for price / priceCurrency / availability / sku / gtin / offers
+# parse_html uses extract() as its primary path for retailers with `jsonld_primary: true` in selectors.yml;
+# once a DOM exists, detect_stock feeds its script blocks to extract_blocks() instead (cheaper than a rescan).
+
+import re, json
+from typing import Any, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib parser gives the same result, slower
+    orjson = None
+
+LD_TYPE = "application/ld+json"
+GTIN_KEYS = ("gtin13", "gtin", "gtin14", "gtin12", "gtin8")
+LIST_PRICE_TYPES = ("ListPrice", "StrikethroughPrice")
+
+# an opening <script ...> tag, or a comment (whose content is skipped)
+_SCRIPT_OR_COMMENT = re.compile(r"<!--|<script\b([^>]*)>", re.I)
+_SCRIPT_END = re.compile(r"</script\s*>", re.I)
+
+def loads(text: str) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass  # stricter than json (NaN, lone surrogates): let the stdlib decide
+    return json.loads(text)
+
+def script_blocks(html: str) -> List[str]:
+    """Stripped bodies of the JSON-LD <script> blocks in document order (the DOM backends' script_texts)."""
+    out = []
+    pos = 0
+    while True:
+        m = _SCRIPT_OR_COMMENT.search(html, pos)
+        if m is None:
+            break
+        if m.group(1) is None:  # <!-- ... -->
+            end = html.find("-->", m.end())
+            if end < 0:
+                break
+            pos = end + 3
+            continue
+        close = _SCRIPT_END.search(html, m.end())
+        body_end = close.start() if close else len(html)
+        if LD_TYPE in m.group(1).lower():
+            out.append(html[m.end():body_end].strip())
+        pos = close.end() if close else len(html)
+    return out
+
+def _availability(av: Any) -> Optional[bool]:
+    if isinstance(av, str):
+        if "InStock" in av: return True
+        if "OutOfStock" in av: return False
+    return None
+
+def _num(v: Any) -> Optional[float]:
+    if isinstance(v, bool) or v is None:
+        return None
+    if isinstance(v, (int, float)):
+        return float(v)
+    if isinstance(v, str):
+        try:
+            return float(v.strip().replace(",", "."))
+        except ValueError:
+            return None
+    return None
+
+def _types(node: Dict[str, Any]) -> List[str]:
+    t = node.get("@type")
+    if isinstance(t, str):
+        return [t]
+    return [x for x in t if isinstance(x, str)] if isinstance(t, list) else []
+
+class JsonLd:
+    """What the JSON-LD blocks of one page say about the product (first value found wins per field)."""
+    __slots__ = ("price", "list_price", "currency", "availability", "in_stock", "sku", "gtin", "offers", "blocks")
+
+    def __init__(self):
+        self.price: Optional[float] = None
+        self.list_price: Optional[float] = None
+        self.currency: Optional[str] = None
+        self.availability: Optional[str] = None
+        self.in_stock: Optional[bool] = None
+        self.sku: Optional[str] = None
+        self.gtin: Optional[str] = None
+        self.offers: List[Dict[str, Any]] = []
+        self.blocks = 0
+
+    @property
+    def complete(self) -> bool:
+        """Enough to stand in for the DOM selectors: a price and a stock verdict."""
+        return self.price is not None and self.in_stock is not None
+
+    def _offer(self, node: Dict[str, Any]):
+        price = _num(node.get("price"))
+        if price is None:
+            price = _num(node.get("lowPrice"))  # AggregateOffer
+        list_price = None
+        specs = node.get("priceSpecification")
+        for spec in specs if isinstance(specs, list) else [specs]:
+            if not isinstance(spec, dict):
+                continue
+            if price is None and not spec.get("priceType"):
+                price = _num(spec.get("price"))
+            if any(t in str(spec.get("priceType") or "") for t in LIST_PRICE_TYPES):
+                list_price = _num(spec.get("price"))
+        currency = node.get("priceCurrency")
+        av = node.get("availability") or node.get("itemAvailability")
+        self.offers.append({"price": price, "list_price": list_price,
+                            "currency": currency if isinstance(currency, str) else None,
+                            "availability": av if isinstance(av, str) else None})
+        if self.price is None and price is not None:
+            self.price, self.list_price = price, list_price
+            self.currency = currency if isinstance(currency, str) else self.currency
+
+    def add(self, data: Any):
+        """Walk one decoded block depth-first in document order; every node is visited once."""
+        self.blocks += 1
+        stack = [data]
+        while stack:
+            cur = stack.pop()
+            if isinstance(cur, list):
+                stack.extend(reversed(cur))
+                continue
+            if not isinstance(cur, dict):
+                continue
+            av = cur.get("availability") or cur.get("itemAvailability")
+            if self.in_stock is None:
+                verdict = _availability(av)
+                if verdict is not None:
+                    self.in_stock, self.availability = verdict, av
+            types = _types(cur)
+            if "Offer" in types or "AggregateOffer" in types or (not types and ("price" in cur or "lowPrice" in cur)):
+                self._offer(cur)
+            if self.sku is None and isinstance(cur.get("sku"), (str, int)):
+                self.sku = str(cur["sku"])
+            if self.gtin is None:
+                self.gtin = next((str(cur[k]) for k in GTIN_KEYS if isinstance(cur.get(k), (str, int))), None)
+            stack.extend(v for v in reversed(list(cur.values())) if isinstance(v, (dict, list)))
+
+    def add_text(self, txt: str):
+        """A block that is not valid JSON still gives a stock verdict from the schema.org token."""
+        if not txt:
+            return
+        try:
+            data = loads(txt)
+        except ValueError:  # json.JSONDecodeError and orjson.JSONDecodeError both subclass it
+            if self.in_stock is None:
+                if "InStock" in txt: self.in_stock, self.availability = True, "InStock"
+                elif "OutOfStock" in txt: self.in_stock, self.availability = False, "OutOfStock"
+            return
+        self.add(data)
+
+def extract_blocks(blocks: List[str]) -> JsonLd:
+    ld = JsonLd()
+    for txt in blocks:
+        ld.add_text(txt)
+    return ld
+
+def extract(html: str) -> JsonLd:
+    """JSON-LD facts of a raw HTML page; no DOM is built."""
+    return extract_blocks(script_blocks(html))
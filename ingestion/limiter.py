@@ -0,0 +1,172 @@
+# ingestion/limiter.py
+# Per-domain politeness primitives used by each runner lane:
+# - TokenBucket: one token every `interval` seconds (burst capacity, additive jitter, never faster than the limit)
+# - DomainLimiter: token bucket + circuit breaker that pauses the domain on 403/429; the first success after
+#   a pause closes it again, so only consecutive trips escalate the cooldown and count toward max_trips
+# - RetryPolicy: retries.attempts / retries.backoff_seconds from retail_coverage.yml, honoring Retry-After
+# - RetryQueue: lane work queue where items waiting on backoff don't block ready ones
+
+import heapq, random, threading, time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+class TokenBucket:
+    def __init__(self, interval: float, burst: int = 1, jitter_pct: float = 0.0, rng: Optional[random.Random] = None):
+        self.interval = max(0.0, float(interval))
+        self.burst = max(1, int(burst))
+        self.jitter_pct = max(0.0, float(jitter_pct))
+        self._rng = rng or random.Random()
+        self._tokens = 1.0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_interval(self, interval: float):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.interval = max(0.0, float(interval))
+
+    def _refill(self, now: float):
+        if self.interval > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._last) / self.interval)
+        else:
+            self._tokens = float(self.burst)
+        self._last = now
+
+    def acquire(self) -> float:
+        """Block until a token is available; returns the seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1.0  # may go negative: that is a reservation for a later slot
+            wait = -self._tokens * self.interval if self._tokens < 0 else 0.0
+            if self.jitter_pct:
+                wait += self._rng.uniform(0.0, self.jitter_pct / 100.0 * self.interval)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+class DomainLimiter:
+    """Token bucket plus a circuit breaker; `acquire` waits for both. `trips` counts consecutive trips."""
+
+    def __init__(self, interval: float, burst: int = 1, jitter_pct: float = 0.0,
+                 cooldown_s: float = 60.0, max_cooldown_s: float = 900.0, max_trips: int = 3):
+        self.bucket = TokenBucket(interval, burst, jitter_pct)
+        self.cooldown_s = cooldown_s
+        self.max_cooldown_s = max_cooldown_s
+        self.max_trips = max_trips
+        self.trips = 0
+        self.aborted = False
+        self._open_until = 0.0
+        self._lock = threading.Lock()
+
+    def trip(self, retry_after: Optional[float] = None) -> float:
+        """Open the breaker (Retry-After if given, else escalating cooldown); returns the pause length."""
+        with self._lock:
+            self.trips += 1
+            pause = retry_after if retry_after is not None else self.cooldown_s * 2 ** (self.trips - 1)
+            pause = min(self.max_cooldown_s, max(0.0, pause))
+            self._open_until = max(self._open_until, time.monotonic() + pause)
+            if self.trips >= self.max_trips:
+                self.aborted = True
+            return pause
+
+    def success(self, sent_at: float) -> bool:
+        """A request sent (time.monotonic()) after the last pause got through: half-open -> closed.
+        Resets the trip count and with it the escalated cooldown; returns True if the breaker closed."""
+        with self._lock:
+            if not self.trips or self.aborted or sent_at < self._open_until:
+                return False
+            self.trips = 0
+            return True
+
+    def acquire(self) -> float:
+        waited = 0.0
+        while True:
+            with self._lock:
+                remaining = self._open_until - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(remaining)
+            waited += remaining
+        return waited + self.bucket.acquire()
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After is either delta-seconds or an HTTP-date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return max(0.0, (dt - datetime.now(timezone.utc)).total_seconds())
+
+class RetryPolicy:
+    RETRY_STATUSES = {0, 403, 429, 500, 502, 503, 504}
+
+    def __init__(self, attempts: int = 0, backoff_seconds: Optional[List[float]] = None):
+        self.attempts = max(0, int(attempts))
+        self.backoff = [float(b) for b in (backoff_seconds or [])] or [1.0]
+
+    @classmethod
+    def from_config(cls, retailer_cov: Dict[str, Any]) -> "RetryPolicy":
+        r = (retailer_cov or {}).get("retries") or {}
+        return cls(r.get("attempts", 0), r.get("backoff_seconds"))
+
+    def should_retry(self, status: int, tries: int, blocked: bool = False) -> bool:
+        """`tries` = attempts made so far for this item (1 after the first fetch); block pages count as failures."""
+        return (blocked or status in self.RETRY_STATUSES) and tries <= self.attempts
+
+    def delay(self, tries: int, retry_after: Optional[float] = None) -> float:
+        base = self.backoff[min(tries, len(self.backoff)) - 1]
+        return max(base, retry_after or 0.0)
+
+class RetryQueue:
+    """Lane work queue ordered by ready time; workers block only when nothing is ready."""
+
+    def __init__(self, items: Iterable[Any]):
+        self._heap: List[Tuple[float, int, Any]] = []
+        self._seq = 0
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        now = time.monotonic()
+        for it in items:
+            self._push(now, it)
+
+    def _push(self, ready_at: float, item: Any):
+        heapq.heappush(self._heap, (ready_at, self._seq, item))
+        self._seq += 1
+
+    def get(self) -> Optional[Any]:
+        """Next ready item, or None once the queue is drained and nothing is in flight."""
+        got = self.get_timed()
+        return None if got is None else got[0]
+
+    def get_timed(self) -> Optional[Tuple[Any, float]]:
+        """Like `get`, also returning how long the item sat ready before a worker took it."""
+        with self._cond:
+            while True:
+                if self._heap:
+                    wait = self._heap[0][0] - time.monotonic()
+                    if wait <= 0:
+                        self._in_flight += 1
+                        return heapq.heappop(self._heap)[2], -wait
+                    self._cond.wait(wait)
+                elif self._in_flight == 0:
+                    return None
+                else:
+                    self._cond.wait()
+
+    def done(self, requeue: Optional[Tuple[float, Any]] = None):
+        """Mark an item finished; `requeue=(delay_s, item)` schedules it again."""
+        with self._cond:
+            self._in_flight -= 1
+            if requeue is not None:
+                delay, item = requeue
+                self._push(time.monotonic() + delay, item)
+            self._cond.notify_all()
@@ -0,0 +1,177 @@
+# ingestion/metrics.py
+# Run-level counters per retailer, written next to the observations CSV as <run>.metrics.json.
+# Per-attempt records (stage timings, bytes read, outcome, ...) go to <run>.stages.jsonl, one JSON line each.
+# - summary(): p50/p95/sum per retailer and stage (queue_wait, rate_wait, connect, ttfb, download, probe,
+#   archive, parse, stock, write) plus the tracking-plan monitors: block rate, freshness, row volumes,
+#   the largest window of the stock-text scan (pages where detect_stock fell through to visible text)
+#   and the pages answered from JSON-LD without a DOM (`jsonld_primary`)
+# - write_prometheus(): the same summary as a node_exporter textfile (<run>.prom and data/metrics/bpt_ingestion.prom)
+
+import json, math, threading, time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+STAGES = ("queue_wait", "rate_wait", "connect", "ttfb", "download", "probe", "archive", "parse", "stock", "write")
+QUANTILES = (0.5, 0.95)
+
+def percentile(values: List[float], q: float) -> float:
+    """Linear interpolation between closest ranks (numpy's default); `values` must be sorted."""
+    if not values:
+        return math.nan
+    pos = (len(values) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+def _label(v: Any) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _sample(name: str, value: float, **labels: Any) -> str:
+    lbl = ",".join(f'{k}="{_label(v)}"' for k, v in labels.items())
+    return f"{name}{{{lbl}}} {value!r}" if lbl else f"{name} {value!r}"
+
+class RunMetrics:
+    """Thread-safe per-retailer counters/gauges and per-attempt records for one run."""
+
+    def __init__(self, run_id: str, freshness_slo_s: Optional[float] = None):
+        self.run_id = run_id
+        self.freshness_slo_s = freshness_slo_s
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._by_retailer: Dict[str, Dict[str, Any]] = {}
+        self._pages: List[Dict[str, Any]] = []
+
+    def _bucket(self, retailer: str) -> Dict[str, Any]:
+        return self._by_retailer.setdefault(retailer, {})
+
+    def add(self, retailer: str, **counters: float):
+        with self._lock:
+            b = self._bucket(retailer)
+            for k, v in counters.items():
+                b[k] = b.get(k, 0) + v
+
+    def set(self, retailer: str, **values: Any):
+        with self._lock:
+            self._bucket(retailer).update(values)
+
+    def page(self, retailer: str, **fields: Any):
+        """One record per fetch attempt (retries included): outcome, `stages` {stage: seconds}, ..."""
+        with self._lock:
+            self._pages.append({"run_id": self.run_id, "retailer": retailer, **fields})
+
+    def pages(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._pages)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Per retailer: stage quantiles, rows by outcome, block rate, last success and data age."""
+        by_retailer: Dict[str, List[Dict[str, Any]]] = {}
+        for p in self.pages():
+            by_retailer.setdefault(p["retailer"], []).append(p)
+        out: Dict[str, Dict[str, Any]] = {}
+        for retailer, pages in sorted(by_retailer.items()):
+            stages: Dict[str, Dict[str, float]] = {}
+            for stage in STAGES:
+                vals = sorted(p["stages"][stage] for p in pages if stage in (p.get("stages") or {}))
+                if vals:
+                    stages[stage] = {**{f"p{round(q * 100)}": round(percentile(vals, q), 6) for q in QUANTILES},
+                                     "sum": round(sum(vals), 6), "count": len(vals)}
+            rows: Dict[str, int] = {}
+            for p in pages:
+                if p.get("outcome") != "retry":  # a retried attempt wrote no row
+                    rows[p["outcome"]] = rows.get(p["outcome"], 0) + 1
+            fetched = [p for p in pages if p.get("outcome") != "circuit_open"]
+            ok_at = [p["finished_at"] for p in pages if p.get("outcome") == "ok"]
+            ages = sorted(p["data_age_s"] for p in pages if p.get("data_age_s") is not None)
+            scans = [p["text_scan_peak_bytes"] for p in pages if "text_scan_peak_bytes" in p]
+            out[retailer] = {
+                "stages": stages,
+                "rows": rows,
+                "attempts": len(fetched),
+                "block_rate": round(sum(1 for p in fetched if p.get("blocked")) / len(fetched), 4) if fetched else 0.0,
+                "last_success_ts": max(ok_at) if ok_at else None,
+                "data_age_s": {f"p{round(q * 100)}": round(percentile(ages, q), 1) for q in QUANTILES} if ages else {},
+                # rows with no usable data inside the SLO (never fetched OK, or last good result too old)
+                "stale_pages": sum(1 for p in pages if p.get("outcome") != "retry" and (
+                    p.get("data_age_s") is None or (self.freshness_slo_s is not None
+                                                    and p["data_age_s"] > self.freshness_slo_s))),
+                "text_scan": {"pages": len(scans), "peak_bytes": max(scans)} if scans else {},
+                "jsonld_primary_pages": sum(1 for p in pages if p.get("jsonld_primary")),
+            }
+        return out
+
+    def to_dict(self) -> Dict[str, Any]:
+        summary = self.summary()
+        with self._lock:
+            return {"run_id": self.run_id, "started_at": self.started_at,
+                    "retailers": {r: dict(v) for r, v in self._by_retailer.items()}, "summary": summary}
+
+    def write_json(self, path: Path):
+        path.write_text(json.dumps(self.to_dict(), indent=2, sort_keys=True), encoding="utf-8")
+
+    def write_jsonl(self, path: Path):
+        with path.open("w", encoding="utf-8") as f:
+            for p in self.pages():
+                f.write(json.dumps(p, sort_keys=True) + "\n")
+
+    def prometheus_lines(self) -> Iterable[str]:
+        summary = self.summary()
+        with self._lock:
+            counters = {r: dict(v) for r, v in self._by_retailer.items()}
+        yield "# HELP bpt_run_info Last ingestion run."
+        yield "# TYPE bpt_run_info gauge"
+        yield _sample("bpt_run_info", 1, run_id=self.run_id)
+        yield "# HELP bpt_run_started_timestamp_seconds Start of the last ingestion run."
+        yield "# TYPE bpt_run_started_timestamp_seconds gauge"
+        yield _sample("bpt_run_started_timestamp_seconds", round(self.started_at, 3))
+        yield "# HELP bpt_stage_seconds Per-item stage time in the last run."
+        yield "# TYPE bpt_stage_seconds summary"
+        for retailer, s in summary.items():
+            for stage, st in s["stages"].items():
+                for q in QUANTILES:
+                    yield _sample("bpt_stage_seconds", st[f"p{round(q * 100)}"], retailer=retailer, stage=stage, quantile=q)
+                yield _sample("bpt_stage_seconds_sum", st["sum"], retailer=retailer, stage=stage)
+                yield _sample("bpt_stage_seconds_count", st["count"], retailer=retailer, stage=stage)
+        yield "# HELP bpt_run_rows Observation rows written in the last run, by outcome."
+        yield "# TYPE bpt_run_rows gauge"
+        for retailer, s in summary.items():
+            for outcome, n in sorted(s["rows"].items()):
+                yield _sample("bpt_run_rows", n, retailer=retailer, outcome=outcome)
+        yield "# HELP bpt_block_rate Share of fetch attempts answered 0/403/429/5xx or with a block page."
+        yield "# TYPE bpt_block_rate gauge"
+        for retailer, s in summary.items():
+            yield _sample("bpt_block_rate", s["block_rate"], retailer=retailer)
+        yield "# HELP bpt_last_success_timestamp_seconds Last successful fetch+parse in the last run."
+        yield "# TYPE bpt_last_success_timestamp_seconds gauge"
+        for retailer, s in summary.items():
+            if s["last_success_ts"] is not None:
+                yield _sample("bpt_last_success_timestamp_seconds", round(s["last_success_ts"], 3), retailer=retailer)
+        yield "# HELP bpt_data_age_seconds Age of the freshest usable result per page (0 = fetched this run)."
+        yield "# TYPE bpt_data_age_seconds summary"
+        for retailer, s in summary.items():
+            for q in QUANTILES:
+                if s["data_age_s"]:
+                    yield _sample("bpt_data_age_seconds", s["data_age_s"][f"p{round(q * 100)}"], retailer=retailer, quantile=q)
+        yield "# HELP bpt_stale_pages Pages with no usable result inside the freshness SLO."
+        yield "# TYPE bpt_stale_pages gauge"
+        for retailer, s in summary.items():
+            yield _sample("bpt_stale_pages", s["stale_pages"], retailer=retailer)
+        yield "# HELP bpt_text_scan_peak_bytes Largest text window held by the stock-text scan in the last run."
+        yield "# TYPE bpt_text_scan_peak_bytes gauge"
+        for retailer, s in summary.items():
+            if s["text_scan"]:
+                yield _sample("bpt_text_scan_peak_bytes", s["text_scan"]["peak_bytes"], retailer=retailer)
+        yield "# HELP bpt_lane_seconds Wall time of each retailer lane."
+        yield "# TYPE bpt_lane_seconds gauge"
+        for retailer, c in sorted(counters.items()):
+            if "lane_seconds" in c:
+                yield _sample("bpt_lane_seconds", c["lane_seconds"], retailer=retailer)
+
+    def write_prometheus(self, *paths: Path):
+        """Textfile-collector format; written to a temp file and renamed so scrapes never see half a file."""
+        text = "\n".join(self.prometheus_lines()) + "\n"
+        for path in paths:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(path.suffix + ".tmp")
+            tmp.write_text(text, encoding="utf-8")
+            tmp.replace(path)
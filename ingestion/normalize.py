@@ -0,0 +1,72 @@
+# ingestion/normalize.py
+# Batched price/discount normalisation for bulk re-parses (replay, backfills over the archive).
+# - takes arrays of raw extracted snippets, returns float64 arrays (NaN = no match / missing)
+# - pyarrow.compute (RE2) when installed: regex extract + separator strip + cast, no Python loop
+# - otherwise numpy over the scalar functions, so results are the same either way
+# - patterns come from plans.py and stay inside the Python-re/RE2 common subset; parity with
+#   plans.norm_price_text / norm_discount_text is checked by tools/check_normalize_parity.py
+
+import re
+from typing import Iterable, Optional, Sequence, Union
+
+import numpy as np
+
+from plans import DISCOUNT_PATTERN, PRICE_PATTERN, THOUSANDS_SEPS, norm_discount_text, norm_price_text
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # optional: fall back to the scalar path
+    pa = pc = None
+
+Texts = Union[Sequence[Optional[str]], "pa.Array", "pa.ChunkedArray", np.ndarray]
+
+def backend(engine: Optional[str] = None) -> str:
+    """Engine a batch call will use: pyarrow when installed, unless `engine="numpy"` is asked for."""
+    if engine not in (None, "pyarrow", "numpy"):
+        raise ValueError(f"unknown engine {engine!r}")
+    if engine == "pyarrow" and pc is None:
+        raise RuntimeError("engine='pyarrow' requested but pyarrow is not installed")
+    return engine or ("pyarrow" if pc is not None else "numpy")
+
+def _as_arrow(texts: Texts):
+    if isinstance(texts, (pa.Array, pa.ChunkedArray)):
+        return texts
+    if isinstance(texts, np.ndarray):
+        texts = texts.tolist()
+    # "" behaves like None in the scalar functions (`if not txt`)
+    return pa.array([t if t else None for t in texts], type=pa.string())
+
+def _named(pattern: str, name: str) -> str:
+    """pyarrow's extract_regex only takes named groups: name the leading group 1."""
+    if not re.match(r"\((?!\?)", pattern):
+        raise ValueError(f"pattern must start with its capture group: {pattern!r}")
+    return f"(?P<{name}>" + pattern[1:]
+
+def _to_numpy(arr) -> np.ndarray:
+    return np.asarray(pc.fill_null(arr, float("nan")).to_numpy(zero_copy_only=False), dtype=np.float64)
+
+def _scalar_map(fn, texts: Iterable[Optional[str]]) -> np.ndarray:
+    if pa is not None and isinstance(texts, (pa.Array, pa.ChunkedArray)):
+        texts = texts.to_pylist()
+    out = np.frompyfunc(lambda t: np.nan if (v := fn(t)) is None else v, 1, 1)(np.asarray(texts, dtype=object))
+    return np.asarray(out, dtype=np.float64)
+
+def normalize_prices(texts: Texts, pattern: str = PRICE_PATTERN, engine: Optional[str] = None) -> np.ndarray:
+    """Batched plans.norm_price_text: first match of `pattern` group 1, thousands separators dropped, ',' -> '.'."""
+    if backend(engine) == "numpy":
+        rx = re.compile(pattern)
+        return _scalar_map(lambda t: norm_price_text(t, rx), texts)
+    num = pc.struct_field(pc.extract_regex(_as_arrow(texts), _named(pattern, "num")), [0])
+    num = pc.replace_substring_regex(num, f"[{THOUSANDS_SEPS}]", "")
+    num = pc.replace_substring(num, ",", ".")
+    return _to_numpy(pc.cast(num, pa.float64()))
+
+def normalize_discounts(texts: Texts, pattern: str = DISCOUNT_PATTERN, engine: Optional[str] = None) -> np.ndarray:
+    """Batched plans.norm_discount_text: |group 1| / 100."""
+    if backend(engine) == "numpy":
+        rx = re.compile(pattern)
+        return _scalar_map(lambda t: norm_discount_text(t, rx), texts)
+    pct = pc.struct_field(pc.extract_regex(_as_arrow(texts), _named(pattern, "pct")), [0])
+    pct = pc.abs(pc.cast(pct, pa.int64()))
+    return _to_numpy(pc.divide(pc.cast(pct, pa.float64()), 100.0))
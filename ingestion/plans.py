@@ -0,0 +1,170 @@
+# ingestion/plans.py
+# Compile each retailer block of selectors.yml into an ExtractionPlan once at startup:
+# - CSS selectors -> pre-compiled Selector objects (no soupsieve re-parse per page)
+# - price/discount/unit-price and stock-text patterns -> compiled regexes (+ the scalar price/discount normalisers)
+# - the ordered stock-text fallbacks used by detect_stock, scanned window by window (StockTextScanner)
+# - the optional `block_detection` block -> BlockDetector (captcha/robot pages, checked while streaming)
+# - `jsonld_primary`: parse_html answers from JSON-LD alone when it is complete
+
+import re, sys, json, hashlib
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Tuple
+
+from htmldoc import Selector
+
+# Price/discount patterns are kept to the subset Python `re` and RE2 (pyarrow.compute) agree on, so the
+# batched normaliser (normalize.py) matches the scalar one exactly: ASCII [0-9], explicit NBSP / narrow NBSP.
+THOUSANDS_SEPS   = " \u00a0\u202f"   # "1 234,50", with plain, no-break or narrow no-break space
+PRICE_PATTERN    = "([0-9]{1,3}(?:[" + THOUSANDS_SEPS + "][0-9]{3})+[.,][0-9]{2}|[0-9]+[.,][0-9]{2})"
+DISCOUNT_PATTERN = "(-?[0-9]{1,3})[\t\n\f\r" + THOUSANDS_SEPS + "]*%"
+
+DEFAULT_PRICE_RE    = re.compile(PRICE_PATTERN)
+DEFAULT_DISCOUNT_RE = re.compile(DISCOUNT_PATTERN)
+GENERIC_IN_STOCK_RE = re.compile(r"(en stock|in stock|disponible|usually ships|available)", re.I)
+GENERIC_OOS_RE      = re.compile(r"(rupture|indisponible|out of stock|unavailable|sold out|notify me)", re.I)
+
+# StockTextScanner: text searched at a time, and the tail carried into the next window (the longest
+# stock phrase that can straddle two windows; the full-page text joins nodes with one space)
+SCAN_WINDOW_CHARS = 4096
+SCAN_CARRY_CHARS = 64
+
+_PRICE_CHARS = str.maketrans({",": ".", **{c: None for c in THOUSANDS_SEPS}})
+
+def norm_price_text(txt: Optional[str], pat: Pattern = DEFAULT_PRICE_RE) -> Optional[float]:
+    if not txt: return None
+    m = pat.search(txt)
+    return float(m.group(1).translate(_PRICE_CHARS)) if m else None
+
+def norm_discount_text(txt: Optional[str], pat: Pattern = DEFAULT_DISCOUNT_RE) -> Optional[float]:
+    if not txt: return None
+    m = pat.search(txt)
+    return abs(int(m.group(1))) / 100.0 if m else None
+
+def _yaml_regex(pat: Optional[str], flags: int = 0) -> Optional[Pattern]:
+    """selectors.yml stores some patterns double-escaped (`\\\\d` instead of `\\d`); undo that, then compile."""
+    if not pat:
+        return None
+    return re.compile(pat.replace("\\\\", "\\"), flags)
+
+def _selector(css: Optional[str]) -> Optional[Selector]:
+    return Selector(css) if css and css.strip() else None
+
+class BlockDetector:
+    """Recognise block pages served with HTTP 200: needle strings early in the body, or a too-short body."""
+    __slots__ = ("needles", "min_html_len", "scan_bytes")
+
+    def __init__(self, needles: List[str], min_html_len: int = 0, scan_bytes: int = 65536):
+        self.needles = tuple(n for n in needles if n)
+        self.min_html_len = max(0, int(min_html_len))
+        self.scan_bytes = max(1, int(scan_bytes))
+
+    @classmethod
+    def from_config(cls, cfg: Optional[Dict[str, Any]]) -> Optional["BlockDetector"]:
+        if not cfg:
+            return None
+        return cls(list(cfg.get("needles") or []), cfg.get("min_html_len", 0), cfg.get("scan_bytes", 65536))
+
+    def check_prefix(self, text: str) -> Optional[str]:
+        """Reason if the first `scan_bytes` of the body already give the page away."""
+        head = text[:self.scan_bytes]
+        return next((f"needle:{n}" for n in self.needles if n in head), None)
+
+    def check_complete(self, text: str) -> Optional[str]:
+        """Reason for a fully downloaded body (needles, then the length floor)."""
+        reason = self.check_prefix(text)
+        if reason is None and len(text) < self.min_html_len:
+            reason = f"short:{len(text)}"
+        return reason
+
+class StockTextScanner:
+    """The stock-text fallbacks run over a bounded window of visible text instead of the whole page.
+
+    Same verdict as searching the joined page text with each pattern in priority order (first pattern
+    with a hit anywhere wins): text nodes are joined into windows of about `window` chars, the last
+    `carry` chars of a window open the next one so phrases across a boundary are still seen, and only
+    patterns that would beat the best hit so far are searched. A hit on the top pattern ends the scan.
+    """
+    __slots__ = ("patterns", "verdicts", "window", "carry")
+
+    def __init__(self, stock_text: Iterable[Tuple[Pattern, bool]],
+                 window: int = SCAN_WINDOW_CHARS, carry: int = SCAN_CARRY_CHARS):
+        stock_text = tuple(stock_text)
+        self.patterns = tuple(rx for rx, _ in stock_text)
+        self.verdicts = tuple(v for _, v in stock_text)
+        self.window = window
+        self.carry = carry
+
+    def _best(self, buf: str, best: int) -> int:
+        return next((i for i, rx in enumerate(self.patterns[:best]) if rx.search(buf)), best)
+
+    def scan(self, texts: Iterable[str]) -> Tuple[Optional[bool], int, int]:
+        """(verdict, peak bytes of a window, text nodes read) over stripped text nodes."""
+        best = len(self.patterns)
+        peak = nodes = size = 0
+        parts: List[str] = []
+        for t in texts:
+            nodes += 1
+            parts.append(t)
+            size += len(t) + 1
+            if size < self.window:
+                continue
+            buf = " ".join(parts)
+            peak = max(peak, sys.getsizeof(buf))
+            best = self._best(buf, best)
+            if best == 0:
+                break
+            parts = [buf[-self.carry:]]
+            size = len(parts[0])
+        else:
+            if nodes and best:
+                buf = " ".join(parts)
+                peak = max(peak, sys.getsizeof(buf))
+                best = self._best(buf, best)
+        return (self.verdicts[best] if best < len(self.patterns) else None), peak, nodes
+
+class ExtractionPlan:
+    """Everything parse_html needs for one retailer, compiled once."""
+    __slots__ = (
+        "retailer", "cfg",
+        "price", "list_price", "discount", "availability",
+        "price_re", "discount_re", "unit_price_re",
+        "in_stock_re", "oos_re", "stock_text", "stock_scan", "block", "jsonld_primary", "fingerprint",
+    )
+
+    def __init__(self, retailer: str, cfg: Dict[str, Any]):
+        self.retailer = retailer
+        self.cfg = cfg
+        # identifies the selector config a cached parse result came from
+        self.fingerprint = hashlib.sha1(json.dumps(cfg, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:12]
+        self.price        = _selector(cfg.get("price_selector"))
+        self.list_price   = _selector(cfg.get("sale_price_selector"))
+        self.discount     = _selector(cfg.get("discount_selector"))
+        self.availability = _selector(cfg.get("availability_selector"))
+
+        self.price_re      = _yaml_regex(cfg.get("price_regex")) or DEFAULT_PRICE_RE
+        self.discount_re   = _yaml_regex(cfg.get("discount_regex")) or DEFAULT_DISCOUNT_RE
+        self.unit_price_re = _yaml_regex(cfg.get("unit_price_regex"), re.I)
+        self.in_stock_re   = _yaml_regex(cfg.get("in_stock_text"), re.I)
+        self.oos_re        = _yaml_regex(cfg.get("oos_text"), re.I)
+        self.block         = BlockDetector.from_config(cfg.get("block_detection"))
+        # trust complete JSON-LD (price + availability) and skip the DOM (see jsonld.py)
+        self.jsonld_primary = bool(cfg.get("jsonld_primary", False))
+
+        # full-page text fallbacks, in the order detect_stock tries them
+        stock_text: Tuple[Tuple[Pattern, bool], ...] = (
+            (GENERIC_IN_STOCK_RE, True),
+            (GENERIC_OOS_RE, False),
+            (self.in_stock_re, True),
+            (self.oos_re, False),
+        )
+        self.stock_text = tuple((rx, verdict) for rx, verdict in stock_text if rx is not None)
+        self.stock_scan = StockTextScanner(self.stock_text)
+
+    def __repr__(self) -> str:
+        return f"ExtractionPlan({self.retailer!r})"
+
+def compile_plan(cfg: Dict[str, Any], retailer: str = "") -> ExtractionPlan:
+    return ExtractionPlan(retailer, cfg or {})
+
+def load_plans(selectors: Dict[str, Any]) -> Dict[str, ExtractionPlan]:
+    """One plan per retailer block in selectors.yml (non-dict entries are ignored)."""
+    return {r: compile_plan(cfg, r) for r, cfg in selectors.items() if isinstance(cfg, dict)}
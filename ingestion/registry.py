@@ -0,0 +1,148 @@
+# ingestion/registry.py
+# Shared SKU registry reader for the runner and tools/.
+# - loads dbt/seeds/sku_registry.csv once into compact __slots__ rows (typed size_value)
+# - indexes rows by retailer, sku_id and category
+# - streams slices (per retailer, with offset/limit) without copying the table
+# - caches a pickled snapshot next to the other run caches, invalidated by the CSV's mtime/size
+
+import csv, pickle
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+SEED = ROOT / "dbt" / "seeds" / "sku_registry.csv"
+SNAPSHOT_DIR = ROOT / "data" / "cache"
+
+FIELDS = ("sku_id", "category", "subcategory", "brand", "product_name", "size_value",
+          "size_unit", "variant_id", "retailer", "product_url", "currency")
+
+def _float_or_none(v: Optional[str]) -> Optional[float]:
+    try:
+        return float(v) if v not in (None, "") else None
+    except ValueError:
+        return None
+
+class SkuRow:
+    """One (sku_id, retailer) PDP from the registry."""
+    __slots__ = FIELDS
+
+    def __init__(self, sku_id: str, category: str, subcategory: str, brand: str, product_name: str,
+                 size_value: Optional[float], size_unit: str, variant_id: str, retailer: str,
+                 product_url: str, currency: str):
+        self.sku_id = sku_id
+        self.category = category
+        self.subcategory = subcategory
+        self.brand = brand
+        self.product_name = product_name
+        self.size_value = size_value
+        self.size_unit = size_unit
+        self.variant_id = variant_id
+        self.retailer = retailer
+        self.product_url = product_url
+        self.currency = currency
+
+    @classmethod
+    def from_csv(cls, rec: Dict[str, str]) -> "SkuRow":
+        g = lambda k: (rec.get(k) or "").strip()
+        return cls(g("sku_id"), g("category"), g("subcategory"), g("brand"), g("product_name"),
+                   _float_or_none(g("size_value")), g("size_unit"), g("variant_id"), g("retailer"),
+                   g("product_url"), g("currency"))
+
+    def get(self, key: str, default=None):
+        """dict-style access so rows drop into code written against csv.DictReader rows."""
+        val = getattr(self, key, default) if key in FIELDS else default
+        if key == "size_value" and val is not None:
+            return f"{val:g}"  # keep the seed's textual form (100, not 100.0) in output CSVs
+        return val
+
+    def as_dict(self) -> Dict[str, str]:
+        return {k: self.get(k) for k in FIELDS}
+
+    def __getstate__(self):
+        return tuple(getattr(self, k) for k in FIELDS)
+
+    def __setstate__(self, state):
+        for k, v in zip(FIELDS, state):
+            setattr(self, k, v)
+
+    def __repr__(self) -> str:
+        return f"SkuRow({self.sku_id!r}, {self.retailer!r})"
+
+class Registry:
+    def __init__(self, rows: List[SkuRow]):
+        self.rows: Tuple[SkuRow, ...] = tuple(rows)
+        self.by_retailer: Dict[str, Tuple[int, ...]] = self._index("retailer")
+        self.by_sku: Dict[str, Tuple[int, ...]] = self._index("sku_id")
+        self.by_category: Dict[str, Tuple[int, ...]] = self._index("category")
+
+    def _index(self, field: str) -> Dict[str, Tuple[int, ...]]:
+        idx: Dict[str, List[int]] = {}
+        for i, row in enumerate(self.rows):
+            idx.setdefault(getattr(row, field), []).append(i)
+        return {k: tuple(v) for k, v in idx.items()}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def retailers(self) -> List[str]:
+        return list(self.by_retailer)
+
+    def iter_retailer(self, retailer: str, limit: Optional[int] = None, offset: int = 0) -> Iterator[SkuRow]:
+        """Stream the retailer's rows in registry order."""
+        ids = self.by_retailer.get(retailer, ())
+        stop = None if limit is None else offset + limit
+        return (self.rows[i] for i in islice(ids, offset, stop))
+
+    def iter_category(self, category: str) -> Iterator[SkuRow]:
+        return (self.rows[i] for i in self.by_category.get(category, ()))
+
+    def for_sku(self, sku_id: str) -> List[SkuRow]:
+        return [self.rows[i] for i in self.by_sku.get(sku_id, ())]
+
+    def get(self, sku_id: str, retailer: str) -> Optional[SkuRow]:
+        return next((r for r in self.for_sku(sku_id) if r.retailer == retailer), None)
+
+    def first_n_by_retailer(self, retailers: List[str], limit_per: int) -> Dict[str, List[SkuRow]]:
+        return {r: list(self.iter_retailer(r, limit_per)) for r in retailers}
+
+    def urls(self, retailer: str, limit: Optional[int] = None) -> List[str]:
+        return [r.product_url for r in self.iter_retailer(retailer, limit)]
+
+def _read_csv(path: Path) -> List[SkuRow]:
+    with path.open(encoding="utf-8", errors="replace", newline="") as f:
+        return [SkuRow.from_csv(rec) for rec in csv.DictReader(f)]
+
+_loaded: Dict[Path, Tuple[Tuple[int, int], Registry]] = {}
+
+def load_registry(path: Path = SEED, snapshot_dir: Optional[Path] = SNAPSHOT_DIR) -> Registry:
+    """Registry for `path`; memoized in-process and via an on-disk snapshot keyed by mtime+size."""
+    path = path.resolve()
+    st = path.stat()
+    stamp = (st.st_mtime_ns, st.st_size)
+    hit = _loaded.get(path)
+    if hit and hit[0] == stamp:
+        return hit[1]
+
+    rows = None
+    snap = snapshot_dir / f"{path.stem}.registry.pickle" if snapshot_dir else None
+    if snap and snap.exists():
+        try:
+            with snap.open("rb") as f:
+                saved_stamp, saved_rows = pickle.load(f)
+            if tuple(saved_stamp) == stamp:
+                rows = saved_rows
+        except Exception:
+            rows = None  # stale/corrupt snapshot: rebuild from CSV
+    if rows is None:
+        rows = _read_csv(path)
+        if snap:
+            snap.parent.mkdir(parents=True, exist_ok=True)
+            tmp = snap.with_suffix(".tmp")
+            with tmp.open("wb") as f:
+                pickle.dump((stamp, rows), f, protocol=pickle.HIGHEST_PROTOCOL)
+            tmp.replace(snap)
+
+    reg = Registry(rows)
+    _loaded[path] = (stamp, reg)
+    return reg
@@ -1,27 +1,75 @@
 # ingestion/runner.py
-# D05: minimal ingestion runner (requests + bs4)
-# - reads sku_registry.csv
+# D05: minimal ingestion runner (requests + pluggable HTML parser, see htmldoc.py)
+# - reads sku_registry.csv (via registry.py)
 # - uses selectors.yml per retailer
-# - rate-limits per retailer
-# - parses price/list/discount/in_stock
-# - writes to data/observations/<date>/obs_<ts>.csv and (optional) dbt/seeds/obs_latest.csv
-
-import re, csv, json, time, uuid, argparse
+# - rate-limits per retailer (token bucket + retries/backoff + 403/429 circuit breaker, see limiter.py);
+#   retailers run as parallel lanes (one per domain)
+# - adapts each domain's request interval to its observed block rate (AIMD, see cadence.py)
+# - parses price/list/discount/in_stock (from JSON-LD alone, without a DOM, for retailers with `jsonld_primary`)
+# - `--stream`: reads PDPs incrementally and stops once the configured fields are found (selectors.yml `streaming`)
+# - archives fetched HTML (compressed, deduplicated) under data/archive/
+# - times every attempt per stage (queue wait → write, see metrics.py): <run>.stages.jsonl, p50/p95 per retailer
+#   in <run>.metrics.json and a Prometheus textfile (<run>.prom + data/metrics/bpt_ingestion.prom)
+# - writes to data/observations/<date>/obs_<ts>.csv (+ .parquet with `--format csv parquet`, see sinks.py)
+#   and (optional) dbt/seeds/obs_latest.csv; `--format duckdb` appends to data/warehouse.duckdb for the dbt duckdb target
+# - `runner.py replay`: re-parse archived/saved HTML with the current selectors (process pool, no network)
+# - `--url-rewrite` / `--rate-scale` / `--data-dir`: point a crawl at a stand-in server (tools/sim/crawl_sim.py)
+
+import os, csv, time, uuid, argparse, threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Any, Tuple, Optional, List
+from typing import Dict, Any, Tuple, Optional, List, Union
 
-import requests
 import yaml
-from bs4 import BeautifulSoup
+
+from fetcher import RetailerSession
+from metrics import RunMetrics
+from validators import ValidatorStore, content_hash
+from archive import HtmlArchive
+from registry import SEED, SkuRow, load_registry
+from limiter import DomainLimiter, RetryPolicy, RetryQueue, parse_retry_after
+from cadence import CadenceController, CadenceStore, is_block_status
+from sinks import SINKS, open_sinks
+from htmldoc import PARSERS, DEFAULT_PARSER, parse_document
+from jsonld import LD_TYPE, JsonLd, extract as extract_jsonld, extract_blocks
+from plans import ExtractionPlan, compile_plan, load_plans, norm_price_text, norm_discount_text
 
 ROOT = Path(__file__).resolve().parents[1]
 SEL  = ROOT / "ingestion" / "selectors.yml"
-SEED = ROOT / "dbt" / "seeds" / "sku_registry.csv"
+COV  = ROOT / "config" / "retail_coverage.yml"
 OUTD = ROOT / "data" / "observations"
-DBG  = ROOT / "debug"
+CACHE = ROOT / "data" / "cache"
+ARCH = ROOT / "data" / "archive"
+OBS_SCHEMA = ROOT / "dbt" / "seeds" / "obs_latest.yml"
+WAREHOUSE = ROOT / "data" / "warehouse.duckdb"
+PROM = ROOT / "data" / "metrics" / "bpt_ingestion.prom"  # stable path for node_exporter's textfile collector
 OUTD.mkdir(parents=True, exist_ok=True)
-DBG.mkdir(parents=True,  exist_ok=True)
+
+def use_data_dir(root: Path):
+    """Send observations, caches, archive, metrics and the warehouse under `root` instead of data/."""
+    global OUTD, CACHE, ARCH, PROM, WAREHOUSE
+    root = Path(root)
+    OUTD, CACHE, ARCH = root / "observations", root / "cache", root / "archive"
+    PROM, WAREHOUSE = root / "metrics" / "bpt_ingestion.prom", root / "warehouse.duckdb"
+    OUTD.mkdir(parents=True, exist_ok=True)
+
+def parse_rewrites(specs: Optional[List[str]]) -> List[Tuple[str, str]]:
+    """["https://www.amazon.fr/=http://127.0.0.1:8800/amazon_fr/", ...] -> [(from_prefix, to_prefix), ...]"""
+    rules = []
+    for spec in specs or []:
+        src, sep, dst = spec.partition("=")
+        if not sep or not src:
+            raise ValueError(f"--url-rewrite expects FROM=TO, got {spec!r}")
+        rules.append((src, dst))
+    return rules
+
+def rewrite_url(url: str, rules: Optional[List[Tuple[str, str]]]) -> str:
+    """First matching prefix wins; the registry URL is still what goes in the output."""
+    for src, dst in rules or ():
+        if url.startswith(src):
+            return dst + url[len(src):]
+    return url
 
 # ---------- helpers ----------
 
@@ -29,81 +77,41 @@ def load_yaml(p: Path) -> Dict[str, Any]:
     with p.open(encoding="utf-8") as f:
         return yaml.safe_load(f) or {}
 
-def first_n_rows_by_retailer(seed_csv: Path, retailers: List[str], limit_per: int) -> Dict[str, List[Dict[str,str]]]:
-    buckets = {r: [] for r in retailers}
-    with seed_csv.open(encoding="utf-8", errors="replace", newline="") as f:
-        r = csv.DictReader(f)
-        for row in r:
-            ret = (row.get("retailer") or "").strip()
-            if ret in buckets and len(buckets[ret]) < limit_per:
-                buckets[ret].append(row)
-    return buckets
-
-def fetch(url: str, ua: str, timeout: int = 30) -> Tuple[int, str]:
-    headers = {
-        "User-Agent": ua or "Mozilla/5.0",
-        "Accept-Language": "fr-FR,fr;q=0.9,en;q=0.8",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Connection": "close",
-    }
-    try:
-        resp = requests.get(url, headers=headers, timeout=timeout)
-        return resp.status_code, resp.text
-    except Exception as e:
-        return 0, f"__ERROR__{e}"
-
-_price_pat   = re.compile(r"(\d+[\.,]\d{2})")
-_disc_pat    = re.compile(r"(-?\d{1,3})\s*%")
-_instock_any = re.compile(r"(en stock|in stock|disponible|usually ships|available)", re.I)
-_oos_any     = re.compile(r"(rupture|indisponible|out of stock|unavailable|sold out|notify me)", re.I)
-
-def norm_price_text(txt: Optional[str]) -> Optional[float]:
-    if not txt: return None
-    m = _price_pat.search(txt)
-    return float(m.group(1).replace(",", ".")) if m else None
-
-def norm_discount_text(txt: Optional[str]) -> Optional[float]:
-    if not txt: return None
-    m = _disc_pat.search(txt)
-    return abs(int(m.group(1))) / 100.0 if m else None
-
-def jsonld_stock(html: str) -> Optional[bool]:
-    """Try JSON-LD first (fast & reliable when present)."""
-    soup = BeautifulSoup(html, "html.parser")
-    for tag in soup.find_all("script", attrs={"type": "application/ld+json"}):
-        txt = tag.get_text(" ", strip=True)
-        if not txt:
-            continue
-        try:
-            data = json.loads(txt)
-        except Exception:
-            if "InStock" in txt: return True
-            if "OutOfStock" in txt: return False
-            continue
-
-        stack = [data]
-        while stack:
-            cur = stack.pop()
-            if isinstance(cur, dict):
-                av = cur.get("availability") or cur.get("itemAvailability")
-                if isinstance(av, str):
-                    if "InStock" in av: return True
-                    if "OutOfStock" in av: return False
-                off = cur.get("offers")
-                if isinstance(off, dict): stack.append(off)
-                elif isinstance(off, list): stack.extend(off)
-                for v in cur.values():
-                    if isinstance(v, (dict, list)):
-                        stack.append(v)
-            elif isinstance(cur, list):
-                stack.extend(cur)
-    return None
-
-def detect_stock(soup: BeautifulSoup, html: str, cfg: Dict[str, Any]) -> Optional[bool]:
+def seed_column_types(p: Path) -> Dict[str, str]:
+    """column_types of the obs_latest seed: the typed schema for Parquet output."""
+    seeds = load_yaml(p).get("seeds") or []
+    return next((s.get("config", {}).get("column_types") or {} for s in seeds if s.get("name") == "obs_latest"), {})
+
+class ParsedPage:
+    """One fetched page, parsed once and shared by every extraction step.
+
+    JSON-LD is only decoded when a step asks for it; the page text is never joined into one string
+    (detect_stock scans it node by node and leaves its footprint in `text_scan`).
+    """
+    __slots__ = ("html", "doc", "_ld", "text_scan")
+
+    def __init__(self, html: str, parser: str = DEFAULT_PARSER, ld: Optional[JsonLd] = None):
+        self.html = html
+        self.doc = parse_document(html, parser)
+        self._ld = ld
+        self.text_scan: Optional[Dict[str, int]] = None
+
+    @property
+    def ld(self) -> JsonLd:
+        """JSON-LD facts; the DOM is built already, so its script blocks are cheaper than a raw-HTML scan."""
+        if self._ld is None:
+            self._ld = extract_blocks(self.doc.script_texts(LD_TYPE))
+        return self._ld
+
+def jsonld_stock(page: Union[ParsedPage, str]) -> Optional[bool]:
+    """schema.org availability from the page's JSON-LD (a raw HTML string needs no DOM)."""
+    return (extract_jsonld(page) if isinstance(page, str) else page.ld).in_stock
+
+def detect_stock(page: ParsedPage, plan: ExtractionPlan) -> Optional[bool]:
+    doc = page.doc
     # 1) Button/selector heuristic
-    sel = cfg.get("availability_selector")
-    if sel:
-        el = soup.select_one(sel)
+    if plan.availability:
+        el = doc.select_one(plan.availability)
         if el:
             disabled = (el.get("disabled") is not None) or (str(el.get("aria-disabled","")).lower() in ("1","true","disabled"))
             if disabled:
@@ -115,145 +123,557 @@ def detect_stock(soup: BeautifulSoup, html: str, cfg: Dict[str, Any]) -> Optiona
                 return True
             return True
 
-    # 2) JSON-LD
-    jl = jsonld_stock(html)
+    # 2) JSON-LD (memoized on the page)
+    jl = jsonld_stock(page)
     if jl is True:  return True
     if jl is False: return False
 
-    # 3) Full-page text
-    text = soup.get_text(" ", strip=True)
-    if _instock_any.search(text): return True
-    if _oos_any.search(text):     return False
-    # Config-specific text (if provided)
-    in_pat  = cfg.get("in_stock_text")
-    oos_pat = cfg.get("oos_text")
-    if in_pat  and re.search(in_pat, text, flags=re.I): return True
-    if oos_pat and re.search(oos_pat, text, flags=re.I): return False
-    return None
-
-def parse_html(html: str, cfg: Dict[str, Any]) -> Tuple[Optional[float], Optional[float], Optional[float], Optional[bool]]:
-    soup = BeautifulSoup(html, "html.parser")
+    # 3) Visible text, node by node: generic phrases first, then retailer-specific ones (see StockTextScanner)
+    verdict, peak, nodes = plan.stock_scan.scan(doc.iter_text())
+    page.text_scan = {"text_scan_peak_bytes": peak, "text_scan_nodes": nodes}
+    return verdict
+
+def parse_html(html: str, plan: Union[ExtractionPlan, Dict[str, Any]], parser: str = DEFAULT_PARSER,
+               timings: Optional[Dict[str, float]] = None, stats: Optional[Dict[str, int]] = None,
+               ) -> Tuple[Optional[float], Optional[float], Optional[float], Optional[bool]]:
+    """`timings`, if given, gets "parse" (DOM build + selectors) and "stock" (detect_stock) seconds added;
+    `stats` gets text_scan_peak_bytes / text_scan_nodes when stock detection fell through to the text scan,
+    and jsonld_primary=1 when complete JSON-LD answered without a DOM (plans with `jsonld_primary`)."""
+    if not isinstance(plan, ExtractionPlan):
+        plan = compile_plan(plan)
+    t0 = time.perf_counter()
+    ld = None
+    if plan.jsonld_primary:
+        ld = extract_jsonld(html)
+        currency = plan.cfg.get("currency_hint")
+        if ld.complete and (not currency or ld.currency in (None, currency)):
+            price, listp = ld.price, ld.list_price if ld.list_price and ld.list_price > ld.price else None
+            disc = round((listp - price) / listp, 2) if listp else None
+            if stats is not None:
+                stats["jsonld_primary"] = 1
+            if timings is not None:
+                timings["parse"] = timings.get("parse", 0.0) + (time.perf_counter() - t0)
+            return price, listp, disc, ld.in_stock
+    page = ParsedPage(html, parser, ld)
+    doc = page.doc
     price = listp = disc = None
 
-    if cfg.get("price_selector"):
-        el = soup.select_one(cfg["price_selector"])
-        if el: price = norm_price_text(el.get_text(" ", strip=True))
+    if plan.price:
+        el = doc.select_one(plan.price)
+        if el: price = norm_price_text(el.get_text(), plan.price_re)
 
-    if cfg.get("sale_price_selector"):
-        el = soup.select_one(cfg["sale_price_selector"])
-        if el: listp = norm_price_text(el.get_text(" ", strip=True))
+    if plan.list_price:
+        el = doc.select_one(plan.list_price)
+        if el: listp = norm_price_text(el.get_text(), plan.price_re)
 
-    if cfg.get("discount_selector"):
-        el = soup.select_one(cfg["discount_selector"])
-        if el: disc = norm_discount_text(el.get_text(" ", strip=True))
+    if plan.discount:
+        el = doc.select_one(plan.discount)
+        if el: disc = norm_discount_text(el.get_text(), plan.discount_re)
 
-    instock = detect_stock(soup, html, cfg)
+    t_stock = time.perf_counter()
+    instock = detect_stock(page, plan)
 
     # derive discount if list price present
     if disc is None and listp and price and listp > price:
         disc = round((listp - price) / listp, 2)
+    if stats is not None and page.text_scan:
+        stats.update(page.text_scan)
+    if timings is not None:
+        t_end = time.perf_counter()
+        timings["parse"] = timings.get("parse", 0.0) + (t_stock - t0)
+        timings["stock"] = timings.get("stock", 0.0) + (t_end - t_stock)
 
     return price, listp, disc, instock
 
 # ---------- runner ----------
 
-def run(retailers: List[str], limit_per: int, copy_seed: bool):
+HEADER = [
+    "run_id", "observed_at_utc",
+    "sku_id", "retailer", "brand", "product_name", "category", "subcategory",
+    "size_value", "size_unit",
+    "price", "list_price", "discount_pct", "in_stock",
+    "currency", "http_status", "product_url", "parse_error",
+    "revalidated"   # "" = fetched+parsed, "304" = not modified, "hash" = body unchanged
+]
+
+def utc_stamp(dt: Optional[datetime] = None) -> str:
+    return (dt or datetime.now(timezone.utc)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def observation(run_id: str, observed_at_utc: str, row: Union[SkuRow, Dict[str, Any]], retailer: str, cfg: Dict[str, Any],
+                result: Tuple[Optional[float], Optional[float], Optional[float], Optional[bool]],
+                status: int, url: str, err: str = "", revalidated: str = "") -> Dict[str, Any]:
+    """One output row in HEADER order: registry metadata + parse result."""
+    price, listp, disc, instock = result
+    return {
+        "run_id": run_id,
+        "observed_at_utc": observed_at_utc,
+        "sku_id": row.get("sku_id"),
+        "retailer": retailer,
+        "brand": row.get("brand"),
+        "product_name": row.get("product_name"),
+        "category": row.get("category"),
+        "subcategory": row.get("subcategory"),
+        "size_value": row.get("size_value"),
+        "size_unit": row.get("size_unit"),
+        "price": price,
+        "list_price": listp,
+        "discount_pct": disc,
+        "in_stock": instock,
+        "currency": row.get("currency") or cfg.get("currency_hint") or "EUR",
+        "http_status": status,
+        "product_url": url,
+        "parse_error": err,
+        "revalidated": revalidated,
+    }
+
+# ---------- streaming (early stop once the configured fields are found) ----------
+
+RESULT_FIELDS = ("price", "list_price", "discount", "in_stock")  # parse_html result order
+IN_STOCK = RESULT_FIELDS.index("in_stock")
+
+class StreamProbe:
+    """Fetch probe: parses each streamed prefix, keeps the last result, stops once every stop field is set.
+
+    in_stock only counts when the availability selector or JSON-LD gave it: a text-scan verdict on a
+    prefix can flip once the rest of the page (e.g. its JSON-LD) arrives.
+    """
+    __slots__ = ("plan", "parser", "want", "result", "satisfied", "probes")
+
+    def __init__(self, plan: ExtractionPlan, parser: str, stop_fields: List[str]):
+        self.plan = plan
+        self.parser = parser
+        self.want = tuple(RESULT_FIELDS.index(f) for f in stop_fields if f in RESULT_FIELDS)
+        self.result = None
+        self.satisfied = False
+        self.probes = 0
+
+    def __call__(self, prefix: str) -> bool:
+        self.probes += 1
+        stats: Dict[str, int] = {}
+        try:
+            self.result = parse_html(prefix, self.plan, self.parser, stats=stats)
+        except Exception:
+            return False
+        from_text = "text_scan_nodes" in stats
+        self.satisfied = all(self.result[k] is not None and not (k == IN_STOCK and from_text) for k in self.want)
+        return self.satisfied
+
+def stream_settings(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    s = cfg.get("streaming") or {}
+    return {
+        "stop_fields": list(s.get("stop_fields") or ["price", "in_stock"]),
+        "first_probe": int(s.get("first_probe_bytes", 65536)),
+        "max_bytes": int(s["max_bytes"]) if s.get("max_bytes") else None,
+    }
+
+def lane_config(coverage: Dict[str, Any], retailer: str) -> Dict[str, Any]:
+    return (coverage.get("retailers") or {}).get(retailer) or {}
+
+def lane_cadence(store: Optional[CadenceStore], coverage: Dict[str, Any], selectors: Dict[str, Any],
+                 retailer: str) -> Optional[CadenceController]:
+    """Start at the persisted interval (else selectors.yml's), never faster than retail_coverage.yml's limit."""
+    if store is None:
+        return None
+    base = float((selectors.get(retailer) or {}).get("rate_limit_seconds", 20))
+    floor = float(lane_config(coverage, retailer).get("rate_limit_seconds", base))
+    return store.controller(retailer, base, min(floor, base))
+
+def lane_concurrency(coverage: Dict[str, Any], retailer: str) -> int:
+    return max(1, int(lane_config(coverage, retailer).get("concurrency", 1)))
+
+def data_age(cached: Optional[Dict[str, Any]]) -> Optional[float]:
+    """Seconds since the validator cache last confirmed this page's result (None = never fetched OK)."""
+    if not cached or not cached.get("updated_at"):
+        return None
+    ts = datetime.strptime(cached["updated_at"], "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+    return round((datetime.now(timezone.utc) - ts).total_seconds(), 1)
+
+def run_lane(retailer: str, rows: List[SkuRow], plan: ExtractionPlan, workers: int,
+             run_id: str, emit, metrics: RunMetrics, parser: str = DEFAULT_PARSER,
+             pool_size: Optional[int] = None, validators: Optional[ValidatorStore] = None,
+             archive: Optional[HtmlArchive] = None, lane_cov: Optional[Dict[str, Any]] = None,
+             stop_on_block: bool = True, cadence: Optional[CadenceController] = None, stream: bool = False,
+             url_rewrite: Optional[List[Tuple[str, str]]] = None, rate_scale: float = 1.0) -> float:
+    """Crawl one retailer's queue under its own limiter/retry policy; returns the lane wall time in seconds.
+
+    `rate_scale` multiplies every wait (interval, breaker cooldown, backoff, Retry-After) for simulated runs.
+    """
+    cfg = plan.cfg
+    lane_cov = lane_cov or {}
+    rl_s = int(cfg.get("rate_limit_seconds", 20))
+    ua   = cfg.get("user_agent") or "Mozilla/5.0"
+    timeout_s = int(cfg.get("timeout_seconds", 30))
+    if cadence:
+        rl_s = cadence.interval_s
+    scaled = lambda s: None if s is None else s * rate_scale
+    limiter = DomainLimiter(rl_s * rate_scale, burst=int(lane_cov.get("burst", 1)),
+                            jitter_pct=float(lane_cov.get("jitter_pct", 0)),
+                            cooldown_s=float(lane_cov.get("breaker_cooldown_seconds", 60)) * rate_scale,
+                            max_cooldown_s=900.0 * rate_scale, max_trips=int(lane_cov.get("breaker_max_trips", 3)))
+    policy = RetryPolicy.from_config(lane_cov)
+    stream_cfg = stream_settings(cfg) if stream else None
+    queue = RetryQueue((i, row, 1) for i, row in enumerate(rows, 1))
+    sess = RetailerSession(retailer, ua, pool_size=pool_size or workers, timeout=timeout_s)
+    print(f"\n=== {retailer} — {len(rows)} items (rate≈{rl_s}s, workers={workers}, retries={policy.attempts}) ===")
+
+    def record(row: SkuRow, tries: int, outcome: str, status: int, stages: Dict[str, float],
+               res=None, probe=None, data_age_s: Optional[float] = None, parse_stats: Optional[Dict[str, int]] = None,
+               time_to_extract_s: Optional[float] = None):
+        metrics.page(retailer, sku_id=row.get("sku_id"), attempt=tries, outcome=outcome, http_status=status,
+                     blocked=bool(res is not None and (res.blocked or is_block_status(status))),
+                     bytes_read=res.body_bytes if res else 0, wire_bytes=res.wire_bytes if res else 0,
+                     truncated=bool(res and res.truncated), probes=probe.probes if probe else 0,
+                     time_to_extract_s=None if time_to_extract_s is None else round(time_to_extract_s, 4),
+                     data_age_s=data_age_s, finished_at=round(time.time(), 3), **(parse_stats or {}),
+                     stages={k: round(v, 6) for k, v in stages.items()})
+
+    def attempt(i: int, row: SkuRow, tries: int, queue_wait: float = 0.0) -> Optional[float]:
+        """Fetch+parse one item; returns a retry delay, or None once its row has been written."""
+        stages = {"queue_wait": queue_wait, "rate_wait": limiter.acquire()}
+        sent_at = time.monotonic()
+
+        url = row.product_url
+        observed_at = utc_stamp()
+        cached = validators.lookup(url, plan.fingerprint) if validators is not None else None
+        probe = StreamProbe(plan, parser, stream_cfg["stop_fields"]) if stream_cfg else None
+        t_fetch = time.perf_counter()
+        conditional = validators.conditional_headers(cached) if validators is not None else None
+        res = sess.fetch(rewrite_url(url, url_rewrite), conditional, plan.block, probe,
+                         **({"first_probe": stream_cfg["first_probe"], "max_bytes": stream_cfg["max_bytes"]}
+                            if stream_cfg else {}))
+        stages.update(res.timings)
+        status, html = res.status, res.text
+        if cadence:
+            new_interval = cadence.record(status, bool(res.blocked) or None)
+            if new_interval is not None:
+                limiter.bucket.set_interval(new_interval * rate_scale)
+                metrics.add(retailer, cadence_changes=1)
+                print(f"  ⇅ {retailer}: block rate {cadence.judged_rate:.1%} → interval now {new_interval:.1f}s")
+
+        what = f"blocked ({res.blocked})" if res.blocked else f"HTTP {status}"
+        if res.blocked:
+            metrics.add(retailer, blocked=1)
+        if (status in (403, 429) or res.blocked) and stop_on_block:
+            pause = limiter.trip(scaled(parse_retry_after(res.headers.get("Retry-After"))))
+            metrics.add(retailer, breaker_trips=1)
+            print(f"  ⛔ {retailer}: {what}, pausing domain {pause:.0f}s (trip {limiter.trips}/{limiter.max_trips})")
+        elif (res.ok or status == 304) and not res.blocked and limiter.success(sent_at):
+            print(f"  ✓ {retailer}: HTTP {status} after the pause, breaker closed")
+        if policy.should_retry(status, tries, bool(res.blocked)) and not limiter.aborted:
+            delay = policy.delay(tries, parse_retry_after(res.headers.get("Retry-After"))) * rate_scale
+            metrics.add(retailer, retries=1)
+            record(row, tries, "retry", status, stages, res, probe)
+            print(f"  ↻ {retailer} [{i}/{len(rows)}] {what} → retry {tries}/{policy.attempts} in {delay:.0f}s")
+            return delay
+
+        price = listp = disc = None
+        instock = None
+        err = ""
+        revalidated = ""
+        blob = "-"
+        parse_stats: Dict[str, int] = {}
+        page_ref = dict(run_id=run_id, sku_id=row.get("sku_id"), retailer=retailer, product_url=url,
+                        http_status=status, observed_at_utc=observed_at)
+        if status == 304 and cached:
+            # not modified: reuse the last parsed observation
+            price, listp, disc, instock = cached["result"]
+            revalidated = "304"
+            validators.touch(url)
+            if archive and archive.link(cached["content_hash"], **page_ref):
+                blob = cached["content_hash"]
+        elif res.ok:
+            # always archive html (useful for debugging / offline re-parse)
+            t_archive = time.perf_counter()
+            body_hash = archive.put(html, **page_ref) if archive else content_hash(html)
+            stages["archive"] = time.perf_counter() - t_archive
+            blob = body_hash
+            if cached and cached.get("content_hash") == body_hash:
+                price, listp, disc, instock = cached["result"]
+                revalidated = "hash"
+            elif probe is not None and probe.satisfied:
+                price, listp, disc, instock = probe.result  # already parsed from the prefix we stopped at
+            else:
+                try:
+                    price, listp, disc, instock = parse_html(html, plan, parser, stages, parse_stats)
+                except Exception as e:
+                    err = f"parse_error:{type(e).__name__}"
+            if validators is not None and not err:
+                validators.update(url, plan.fingerprint, res.headers, body_hash, [price, listp, disc, instock])
+        elif res.blocked:
+            err = f"blocked:{res.blocked}"  # captcha/robot page served as 200: not parsed, not archived
+        else:
+            err = f"http_error:{status}" if status else html
+        if revalidated:
+            metrics.add(retailer, **{f"revalidated_{revalidated}": 1})
+        time_to_extract = time.perf_counter() - t_fetch
+        metrics.add(retailer, bytes_read=res.body_bytes, time_to_extract_s=time_to_extract,
+                    truncated_pages=int(res.truncated and not res.blocked))
+
+        t_write = time.perf_counter()
+        emit(observation(run_id, observed_at, row, retailer, cfg, (price, listp, disc, instock),
+                         status, url, err, revalidated))
+        stages["write"] = time.perf_counter() - t_write
+        outcome = "ok" if not err else "blocked" if res.blocked else "error"
+        record(row, tries, outcome, status, stages, res, probe,
+               0.0 if outcome == "ok" else data_age(cached), parse_stats, time_to_extract)
+
+        print(f"- {retailer} [{i}/{len(rows)}] status={status} price={price} list={listp} disc={disc} in_stock={instock}"
+              f"{' (revalidated:' + revalidated + ')' if revalidated else ''} -> {blob[:12]}")
+        return None
+
+    def worker():
+        while True:
+            got = queue.get_timed()
+            if got is None:
+                return
+            (i, row, tries), queue_wait = got
+            delay = None
+            try:
+                if limiter.aborted:
+                    # breaker tripped too often: stop hammering this domain, record what was skipped
+                    metrics.add(retailer, circuit_open_skipped=1)
+                    emit(observation(run_id, utc_stamp(), row, retailer, cfg, (None, None, None, None),
+                                     0, row.product_url, "http_error:circuit_open"))
+                    cached = validators.lookup(row.product_url, plan.fingerprint) if validators is not None else None
+                    record(row, tries, "circuit_open", 0, {"queue_wait": queue_wait}, data_age_s=data_age(cached))
+                else:
+                    delay = attempt(i, row, tries, queue_wait)
+            finally:
+                queue.done((delay, (i, row, tries + 1)) if delay is not None else None)
+
+    t0 = time.time()
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=retailer) as pool:
+            for fut in [pool.submit(worker) for _ in range(workers)]:
+                fut.result()
+    finally:
+        metrics.set(retailer, **sess.stats())
+        if cadence:
+            metrics.set(retailer, cadence_interval_s=round(cadence.interval_s, 3),
+                        block_rate=round(cadence.block_rate(), 4))
+        sess.close()
+    return time.time() - t0
+
+def run(retailers: List[str], limit_per: int, copy_seed: bool, parser: str = DEFAULT_PARSER,
+        pool_size: Optional[int] = None, revalidate: bool = True,
+        archive_max_mb: Optional[int] = 2048, archive_days: Optional[int] = 60,
+        buckets: Optional[Dict[str, List[SkuRow]]] = None, adaptive_cadence: bool = True,
+        stream: bool = False, formats: Optional[List[str]] = None, compression: str = "zstd",
+        url_rewrite: Optional[List[Tuple[str, str]]] = None, rate_scale: float = 1.0) -> Dict[str, Any]:
+    """Crawl `retailers` (first `limit_per` registry rows each, or the given `buckets`); returns a run summary."""
     selectors = load_yaml(SEL)
+    plans = load_plans(selectors)
+    coverage = load_yaml(COV)
     now = datetime.now(timezone.utc)
     run_id = uuid.uuid4().hex[:12]
     day_dir = OUTD / now.strftime("%Y-%m-%d")
     day_dir.mkdir(parents=True, exist_ok=True)
-    out_path = day_dir / f"obs_{now.strftime('%Y%m%dT%H%M%SZ')}_{run_id}.csv"
-
-    # prepare CSV
-    header = [
-        "run_id", "observed_at_utc",
-        "sku_id", "retailer", "brand", "product_name", "category", "subcategory",
-        "size_value", "size_unit",
-        "price", "list_price", "discount_pct", "in_stock",
-        "currency", "http_status", "product_url", "parse_error"
-    ]
-    out_f = out_path.open("w", encoding="utf-8", newline="")
-    writer = csv.DictWriter(out_f, fieldnames=header)
-    writer.writeheader()
-
-    # split by retailer and rate-limit per config
-    buckets = first_n_rows_by_retailer(SEED, retailers, limit_per)
-
-    for retailer in retailers:
-        cfg = selectors.get(retailer) or {}
-        rl_s = int(cfg.get("rate_limit_seconds", 20))
-        ua   = cfg.get("user_agent") or "Mozilla/5.0"
-        timeout_s = int(cfg.get("timeout_seconds", 30))
-
-        last_ts = 0.0
-        rows = buckets.get(retailer, [])
-        print(f"\n=== {retailer} — {len(rows)} items (rate≈{rl_s}s) ===")
-
-        for i, row in enumerate(rows, 1):
-            # rate-limit
-            now_s = time.time()
-            to_wait = rl_s - (now_s - last_ts)
-            if to_wait > 0:
-                time.sleep(to_wait)
-            last_ts = time.time()
-
-            url = (row.get("product_url") or "").strip()
-            status, html = fetch(url, ua, timeout=timeout_s)
-
-            # always save html (useful for debugging)
-            dbg_name = f"{retailer}_{int(time.time())}_{i}.html"
-            (DBG / dbg_name).write_text(html, encoding="utf-8", errors="ignore")
-
-            price = listp = disc = None
-            instock = None
-            err = ""
-            if status == 200 and not html.startswith("__ERROR__"):
-                try:
-                    price, listp, disc, instock = parse_html(html, cfg)
-                except Exception as e:
-                    err = f"parse_error:{type(e).__name__}"
-            else:
-                err = f"http_error:{status}" if status else html
-
-            writer.writerow({
-                "run_id": run_id,
-                "observed_at_utc": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
-                "sku_id": row.get("sku_id"),
-                "retailer": retailer,
-                "brand": row.get("brand"),
-                "product_name": row.get("product_name"),
-                "category": row.get("category"),
-                "subcategory": row.get("subcategory"),
-                "size_value": row.get("size_value"),
-                "size_unit": row.get("size_unit"),
-                "price": price,
-                "list_price": listp,
-                "discount_pct": disc,
-                "in_stock": instock,
-                "currency": row.get("currency") or cfg.get("currency_hint") or "EUR",
-                "http_status": status,
-                "product_url": url,
-                "parse_error": err
+    out_stem = day_dir / f"obs_{now.strftime('%Y%m%dT%H%M%SZ')}_{run_id}"
+    slo_h = (coverage.get("top_set") or {}).get("freshness_slo_hours")  # the registry is the Top-30 set
+    metrics = RunMetrics(run_id, float(slo_h) * 3600 if slo_h else None)
+    validators = ValidatorStore(CACHE / "validators.json") if revalidate else None
+    archive = HtmlArchive(ARCH)
+    cadences = CadenceStore(CACHE / "cadence.json", coverage.get("cadence"),
+                            float((coverage.get("thresholds") or {}).get("block_rate_max", 0.02))) if adaptive_cadence else None
+
+    # prepare output sinks (shared by all lanes)
+    sink = open_sinks(out_stem, formats or ["csv"], HEADER, compression=compression,
+                      column_types=seed_column_types(OBS_SCHEMA), warehouse=WAREHOUSE)
+    out_path = sink.paths[0]
+    write_lock = threading.Lock()
+    results: List[Dict[str, Any]] = []
+
+    def emit(rec: Dict[str, Any]):
+        with write_lock:
+            sink.write(rec)
+            results.append({
+                "retailer": rec["retailer"], "product_url": rec["product_url"],
+                "ok": not rec["parse_error"], "finished_at": time.time(),
             })
 
-            print(f"- {retailer} [{i}/{len(rows)}] status={status} price={price} list={listp} disc={disc} in_stock={instock} -> {dbg_name}")
-
-    out_f.close()
-    print(f"\n✅ Wrote {out_path}")
-
-    if copy_seed:
+    # split by retailer; each retailer is an independent lane with its own rate limit
+    if buckets is None:
+        buckets = load_registry(SEED).first_n_by_retailer(retailers, limit_per)
+    lane_seconds: Dict[str, float] = {}
+
+    t0 = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, len(retailers)), thread_name_prefix="lane") as lanes:
+        futures = {
+            retailer: lanes.submit(
+                run_lane, retailer, buckets.get(retailer, []), plans.get(retailer) or compile_plan({}, retailer),
+                lane_concurrency(coverage, retailer), run_id, emit, metrics, parser, pool_size, validators, archive,
+                lane_config(coverage, retailer), bool((coverage.get("ethics") or {}).get("stop_on_403_or_429", True)),
+                lane_cadence(cadences, coverage, selectors, retailer), stream, url_rewrite, rate_scale,
+            )
+            for retailer in retailers
+        }
+        for retailer, fut in futures.items():
+            try:
+                lane_s = lane_seconds[retailer] = fut.result()
+                metrics.set(retailer, lane_seconds=round(lane_s, 3))
+                print(f"\n⏱ {retailer}: lane finished in {lane_s:.1f}s")
+            except Exception as e:
+                print(f"\n❌ {retailer}: lane failed ({type(e).__name__}: {e})")
+
+    sink.close()
+    if validators is not None:
+        validators.save()
+    if cadences:
+        cadences.save()
+    pruned = archive.prune(
+        max_bytes=archive_max_mb * 1024 * 1024 if archive_max_mb else None,
+        max_age_days=archive_days,
+    )
+    archive.close()
+    print(f"\n✅ Wrote {', '.join(map(str, sink.paths))} (wall {time.time() - t0:.1f}s)")
+
+    # per-run files next to the run's stem, not the first sink's path (duckdb's is the shared warehouse)
+    metrics_path = out_stem.with_suffix(".metrics.json")
+    metrics.write_json(metrics_path)
+    metrics.write_jsonl(out_stem.with_suffix(".stages.jsonl"))
+    metrics.write_prometheus(out_stem.with_suffix(".prom"), PROM)
+    for retailer, m in metrics.to_dict()["retailers"].items():
+        if "requests" in m:
+            print(f"   {retailer}: {m['requests']} req over {m['connections_opened']} conn "
+                  f"({m['handshakes_saved']} handshakes saved), {m['wire_bytes']/1e6:.1f} MB on the wire "
+                  f"/ {m['body_bytes']/1e6:.1f} MB decoded")
+    for retailer, s in metrics.summary().items():
+        st = s["stages"]
+        print(f"   {retailer}: " + ", ".join(f"{k} p50 {v['p50'] * 1000:.0f}ms/p95 {v['p95'] * 1000:.0f}ms"
+                                              for k, v in st.items() if k in ("ttfb", "download", "parse"))
+              + f"; block rate {s['block_rate']:.1%}, rows {s['rows']}")
+    print(f"✅ Metrics → {metrics_path} (+ .stages.jsonl, .prom; textfile {PROM})")
+    print(f"✅ Archive → {ARCH} (pruned {pruned['pages_removed']} pages / {pruned['blobs_removed']} blobs)")
+
+    csv_path = next((p for p in sink.paths if p.suffix == ".csv"), None)
+    if copy_seed and csv_path:
         seed_out = ROOT / "dbt" / "seeds" / "obs_latest.csv"
-        seed_out.write_text(out_path.read_text(encoding="utf-8"), encoding="utf-8")
+        seed_out.write_text(csv_path.read_text(encoding="utf-8"), encoding="utf-8")
         print(f"✅ Copied to {seed_out} (dbt seed ready)")
+    elif copy_seed:
+        print("⚠️  --seed-copy needs CSV output (add `--format csv`); dbt seed not updated")
+
+    return {"run_id": run_id, "out_path": out_path, "out_paths": sink.paths, "metrics_path": metrics_path, "started_at": t0, "lane_seconds": lane_seconds, "results": results}
+
+# ---------- replay (offline re-parse) ----------
+
+_replay_plans: Dict[str, ExtractionPlan] = {}
+_replay_parser = DEFAULT_PARSER
+_replay_archive: Optional[HtmlArchive] = None
+
+def _replay_init(selectors: Dict[str, Any], parser: str, archive_root: Optional[str]):
+    """Process-pool initializer: compile plans (and open the archive) once per worker."""
+    global _replay_plans, _replay_parser, _replay_archive
+    _replay_plans = load_plans(selectors)
+    _replay_parser = parser
+    _replay_archive = HtmlArchive(Path(archive_root)) if archive_root else None
+
+def _replay_one(job: Tuple[str, str]) -> Tuple[Tuple[Optional[float], Optional[float], Optional[float], Optional[bool]], str]:
+    retailer, ref = job
+    try:
+        html = _replay_archive.read(ref) if _replay_archive else Path(ref).read_text(encoding="utf-8", errors="ignore")
+        plan = _replay_plans[retailer]
+        blocked = plan.block.check_complete(html) if plan.block else None
+        if blocked:
+            return (None, None, None, None), f"blocked:{blocked}"  # same as a live fetch: never parsed
+        return parse_html(html, plan, _replay_parser), ""
+    except Exception as e:
+        return (None, None, None, None), f"parse_error:{type(e).__name__}"
+
+def replay_jobs(source: Path, retailers: List[str], since: Optional[str], until: Optional[str]) -> Tuple[bool, List[Dict[str, Any]]]:
+    """Pages to re-parse from an archive directory (index.sqlite) or a directory of saved *.html files."""
+    if (source / "index.sqlite").exists():
+        arch = HtmlArchive(source)
+        jobs = [p for p in arch.pages(since=since, until=until) if p["retailer"] in retailers]
+        arch.close()
+        return True, jobs
+    jobs = []
+    for path in sorted(source.rglob("*.html")):
+        # debug dumps are named {retailer}_{ts}_{i}.html
+        retailer = next((r for r in sorted(retailers, key=len, reverse=True) if path.name.startswith(r + "_")), None)
+        if retailer:
+            ts = utc_stamp(datetime.fromtimestamp(path.stat().st_mtime, timezone.utc))
+            jobs.append({"retailer": retailer, "blob": str(path), "observed_at_utc": ts,
+                         "sku_id": None, "product_url": "", "http_status": 200})
+    return False, jobs
+
+def replay(source: Path, retailers: List[str], parser: str = DEFAULT_PARSER, workers: Optional[int] = None,
+           out_path: Optional[Path] = None, since: Optional[str] = None, until: Optional[str] = None) -> Path:
+    selectors = load_yaml(SEL)
+    plans = load_plans(selectors)
+    retailers = [r for r in retailers if r in plans]
+    is_archive, jobs = replay_jobs(source, retailers, since, until)
+
+    # registry metadata (brand, category, size...) joined back on (sku_id, retailer)
+    registry = load_registry(SEED)
+
+    now = datetime.now(timezone.utc)
+    run_id = uuid.uuid4().hex[:12]
+    if out_path is None:
+        out_path = OUTD / "replay" / f"obs_{now.strftime('%Y%m%dT%H%M%SZ')}_{run_id}.csv"
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    print(f"=== replay {len(jobs)} pages from {source} with {workers} workers (parser={parser}) ===")
+
+    t0 = time.time()
+    with out_path.open("w", encoding="utf-8", newline="") as out_f, ProcessPoolExecutor(
+        max_workers=workers, initializer=_replay_init,
+        initargs=(selectors, parser, str(source) if is_archive else None),
+    ) as pool:
+        writer = csv.DictWriter(out_f, fieldnames=HEADER)
+        writer.writeheader()
+        results = pool.map(_replay_one, [(j["retailer"], j["blob"]) for j in jobs],
+                           chunksize=max(1, len(jobs) // (workers * 8)))
+        for job, (result, err) in zip(jobs, results):
+            row = registry.get(job["sku_id"] or "", job["retailer"]) or {"sku_id": job["sku_id"]}
+            url = job["product_url"] or (row.get("product_url") or "")
+            writer.writerow(observation(run_id, job["observed_at_utc"], row, job["retailer"],
+                                        plans[job["retailer"]].cfg, result, job["http_status"], url, err))
+
+    dt = time.time() - t0
+    print(f"✅ Re-parsed {len(jobs)} pages in {dt:.1f}s ({len(jobs) / dt if dt else 0:.1f} pages/s) → {out_path}")
+    return out_path
 
 def main():
     ap = argparse.ArgumentParser(description="D05 ingestion runner")
     ap.add_argument("--retailers", nargs="+", default=["amazon_fr", "sephora_fr"], help="subset to run")
     ap.add_argument("--limit-per", type=int, default=10, help="max SKUs per retailer")
     ap.add_argument("--seed-copy", action="store_true", help="copy output to dbt/seeds/obs_latest.csv")
+    ap.add_argument("--parser", choices=PARSERS, default=DEFAULT_PARSER, help="HTML parser backend")
+    ap.add_argument("--pool-size", type=int, default=None, help="keep-alive connections per retailer (default: lane workers)")
+    ap.add_argument("--no-revalidate", action="store_true", help="ignore the ETag/Last-Modified validator cache")
+    ap.add_argument("--archive-max-mb", type=int, default=2048, help="size cap for data/archive (0 = no cap)")
+    ap.add_argument("--archive-days", type=int, default=60, help="keep archived pages this many days")
+    ap.add_argument("--format", nargs="+", choices=list(SINKS), default=["csv"], dest="formats",
+                    help="output format(s); the first one is the run's primary file")
+    ap.add_argument("--compression", choices=["zstd", "snappy", "gzip", "none"], default="zstd", help="Parquet codec")
+    ap.add_argument("--stream", action="store_true", help="stream PDPs and stop reading once the stop fields are found")
+    ap.add_argument("--fixed-cadence", action="store_true", help="disable the adaptive per-domain interval (cadence.json)")
+    ap.add_argument("--url-rewrite", action="append", default=None, metavar="FROM=TO",
+                    help="fetch URLs starting with FROM from TO instead (repeatable; e.g. a local stand-in server)")
+    ap.add_argument("--rate-scale", type=float, default=1.0, help="multiply every wait/interval (simulated runs only)")
+    ap.add_argument("--data-dir", type=Path, default=None, help="write observations/caches/archive here instead of data/")
+
+    sub = ap.add_subparsers(dest="cmd")
+    rp = sub.add_parser("replay", help="re-parse archived or saved HTML with the current selectors.yml")
+    rp.add_argument("--source", type=Path, default=ARCH, help="archive dir (with index.sqlite) or dir of *.html")
+    rp.add_argument("--retailers", nargs="+", default=["amazon_fr", "sephora_fr"], help="subset to replay")
+    rp.add_argument("--since", default=None, help="archive only: observed_at_utc >= (ISO8601, e.g. 2025-08-01)")
+    rp.add_argument("--until", default=None, help="archive only: observed_at_utc < (ISO8601)")
+    rp.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    rp.add_argument("--parser", choices=PARSERS, default=DEFAULT_PARSER, help="HTML parser backend")
+    rp.add_argument("--out", type=Path, default=None, help="output CSV (default: data/observations/replay/...)")
     args = ap.parse_args()
-    run(args.retailers, args.limit_per, args.seed_copy)
+
+    if args.cmd == "replay":
+        replay(args.source, args.retailers, args.parser, args.workers, args.out, args.since, args.until)
+        return
+    if args.data_dir:
+        use_data_dir(args.data_dir)
+    run(args.retailers, args.limit_per, args.seed_copy, args.parser, args.pool_size, not args.no_revalidate,
+        args.archive_max_mb, args.archive_days, adaptive_cadence=not args.fixed_cadence,
+        stream=args.stream, formats=args.formats, compression=args.compression,
+        url_rewrite=parse_rewrites(args.url_rewrite), rate_scale=args.rate_scale)
 
 if __name__ == "__main__":
     main()
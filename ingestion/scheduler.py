@@ -0,0 +1,276 @@
+# ingestion/scheduler.py
+# Long-running tiered scheduler for config/retail_coverage.yml.
+# - parses each tier's cadence_cron (5-field cron, evaluated in the tier's timezone)
+# - splits the registry into tiers (top_set = first `pages` PDPs, rest = the next `pages`)
+# - per tick: queue only pages that would otherwise go stale before the next tick completes,
+#   apply start jitter inside the SLO slack, run all retailers as parallel lanes (runner.run)
+# - reports projected vs actual completion time per tier
+#
+# Usage:
+#   python ingestion/scheduler.py              # loop forever
+#   python ingestion/scheduler.py --once       # run the next due tick now, then exit
+#   python ingestion/scheduler.py --dry-run    # print the upcoming tick plans only
+
+import json, time, random, argparse
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Set
+from zoneinfo import ZoneInfo
+
+import runner
+from registry import SEED, SkuRow, load_registry
+
+TIERS = ("top_set", "rest")
+FRESHNESS = runner.CACHE / "freshness.json"
+TICK_LOG = runner.CACHE / "scheduler_ticks.jsonl"
+
+# ---------- cron ----------
+
+class CronSpec:
+    """Minimal 5-field cron: minute hour day-of-month month day-of-week (`*`, lists, ranges, steps)."""
+
+    _BOUNDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expr: str):
+        parts = expr.split()
+        if len(parts) != 5:
+            raise ValueError(f"cron needs 5 fields, got {expr!r}")
+        self.expr = expr
+        sets = [self._field(p, lo, hi) for p, (lo, hi) in zip(parts, self._BOUNDS)]
+        self.minutes, self.hours, self.doms, self.months, self.dows = sets
+        self.dom_any = parts[2] == "*"
+        self.dow_any = parts[4] == "*"
+
+    @staticmethod
+    def _field(spec: str, lo: int, hi: int) -> Set[int]:
+        out: Set[int] = set()
+        for item in spec.split(","):
+            rng, _, step = item.partition("/")
+            if rng == "*":
+                a, b = lo, hi
+            elif "-" in rng:
+                a, b = (int(x) for x in rng.split("-", 1))
+            else:
+                a = b = int(rng)
+                if step:
+                    b = hi
+            if not (lo <= a <= b <= hi):
+                raise ValueError(f"cron field {spec!r} out of range {lo}-{hi}")
+            out.update(range(a, b + 1, int(step) if step else 1))
+        if hi == 7:  # day-of-week: 7 is Sunday too
+            out = {0 if v == 7 else v for v in out}
+        return out
+
+    def _day_ok(self, d: datetime) -> bool:
+        dom_ok = d.day in self.doms
+        dow_ok = (d.isoweekday() % 7) in self.dows
+        if self.dom_any or self.dow_any:
+            return dom_ok and dow_ok
+        return dom_ok or dow_ok  # both restricted: cron semantics are OR
+
+    def next_after(self, after: datetime, tz: ZoneInfo) -> datetime:
+        """First fire time strictly after `after`, as an aware datetime in `tz`."""
+        cur = after.astimezone(tz).replace(tzinfo=None, second=0, microsecond=0) + timedelta(minutes=1)
+        limit = cur + timedelta(days=366 * 5)
+        while cur < limit:
+            if cur.month not in self.months:
+                cur = (cur.replace(day=1) + timedelta(days=32)).replace(day=1, hour=0, minute=0)
+            elif not self._day_ok(cur):
+                cur = (cur + timedelta(days=1)).replace(hour=0, minute=0)
+            elif cur.hour not in self.hours:
+                cur = (cur + timedelta(hours=1)).replace(minute=0)
+            elif cur.minute not in self.minutes:
+                cur += timedelta(minutes=1)
+            else:
+                return cur.replace(tzinfo=tz)
+        raise ValueError(f"cron {self.expr!r} never fires")
+
+# ---------- tiers ----------
+
+class Tier:
+    def __init__(self, name: str, cfg: Dict[str, Any]):
+        self.name = name
+        self.cron = CronSpec(cfg["cadence_cron"])
+        self.tz = ZoneInfo(cfg.get("timezone") or "UTC")
+        self.jitter_pct = float(cfg.get("jitter_pct", 0))
+        self.pages = int(cfg.get("pages", 0))
+        self.slo = timedelta(hours=float(cfg.get("freshness_slo_hours", 24)))
+        self.rows: List[SkuRow] = []
+
+    def next_fire(self, after: datetime) -> datetime:
+        return self.cron.next_after(after, self.tz)
+
+def enabled_retailers(selectors: Dict[str, Any], coverage: Dict[str, Any]) -> List[str]:
+    cov = coverage.get("retailers") or {}
+    return [r for r, c in selectors.items()
+            if isinstance(c, dict) and c.get("enabled", True) and (cov.get(r) or {}).get("enabled", True)]
+
+def build_tiers(coverage: Dict[str, Any], retailers: List[str]) -> List[Tier]:
+    """Registry order decides membership: the first `top_set.pages` PDPs are priority, the next `rest.pages` follow."""
+    rows = [r for r in load_registry(SEED).rows if r.retailer in retailers and r.product_url]
+    tiers, start = [], 0
+    for name in TIERS:
+        if name not in coverage:
+            continue
+        t = Tier(name, coverage[name])
+        t.rows = rows[start:start + t.pages]
+        start += t.pages
+        tiers.append(t)
+    return tiers
+
+def _cadence_state() -> Dict[str, Any]:
+    path = runner.CACHE / "cadence.json"
+    try:
+        return json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+    except (OSError, ValueError):
+        return {}
+
+def lane_rate(selectors: Dict[str, Any], coverage: Dict[str, Any], retailer: str) -> float:
+    """Seconds per request a lane sustains (current adaptive interval, else the rate limit, over its workers)."""
+    rl = float((selectors.get(retailer) or {}).get("rate_limit_seconds", 20))
+    rl = float((_cadence_state().get(retailer) or {}).get("interval_s", rl))
+    return rl / runner.lane_concurrency(coverage, retailer)
+
+def projected_seconds(rows: List[SkuRow], selectors: Dict[str, Any], coverage: Dict[str, Any]) -> float:
+    """Lanes run in parallel, so a queue takes as long as its slowest retailer."""
+    per: Dict[str, int] = {}
+    for r in rows:
+        per[r.retailer] = per.get(r.retailer, 0) + 1
+    return max((n * lane_rate(selectors, coverage, ret) for ret, n in per.items()), default=0.0)
+
+# ---------- freshness ledger ----------
+
+def load_freshness() -> Dict[str, float]:
+    try:
+        return json.loads(FRESHNESS.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+def save_freshness(ledger: Dict[str, float]):
+    FRESHNESS.parent.mkdir(parents=True, exist_ok=True)
+    tmp = FRESHNESS.with_suffix(".tmp")
+    tmp.write_text(json.dumps(ledger, indent=1, sort_keys=True), encoding="utf-8")
+    tmp.replace(FRESHNESS)
+
+# ---------- planning ----------
+
+class TickPlan:
+    def __init__(self, fire_at: datetime, start_at: datetime, tiers: List[Tier]):
+        self.fire_at = fire_at
+        self.start_at = start_at
+        self.tiers = tiers
+        self.queue: Dict[str, List[SkuRow]] = {t.name: [] for t in tiers}
+        self.skipped: Dict[str, int] = {t.name: 0 for t in tiers}
+        self.projected: Dict[str, float] = {}
+
+    def buckets(self, retailers: List[str]) -> Dict[str, List[SkuRow]]:
+        """Per-retailer work queues; higher tiers first so priority pages finish earliest in each lane."""
+        out: Dict[str, List[SkuRow]] = {r: [] for r in retailers}
+        seen = set()
+        for t in self.tiers:
+            for row in self.queue[t.name]:
+                if row.product_url not in seen:
+                    seen.add(row.product_url)
+                    out[row.retailer].append(row)
+        return out
+
+def plan_tick(tiers: List[Tier], now: datetime, selectors: Dict[str, Any], coverage: Dict[str, Any],
+              ledger: Dict[str, float], rng: random.Random) -> TickPlan:
+    fires = {t.name: t.next_fire(now) for t in tiers}
+    fire_at = min(fires.values())
+    due = [t for t in tiers if fires[t.name] == fire_at]
+
+    # a page needs this tick if, left alone, it would breach its SLO before the next tick of its tier is done
+    plan = TickPlan(fire_at, fire_at, due)
+    for t in due:
+        next_fire = t.next_fire(fire_at)
+        horizon = next_fire + timedelta(seconds=projected_seconds(t.rows, selectors, coverage))
+        for row in t.rows:
+            last_ok = ledger.get(row.product_url)
+            if last_ok is not None and datetime.fromtimestamp(last_ok, timezone.utc) + t.slo >= horizon:
+                plan.skipped[t.name] += 1
+            else:
+                plan.queue[t.name].append(row)
+
+    # projections follow the real lane order (tiers stacked per retailer)
+    stacked: List[SkuRow] = []
+    for t in due:
+        stacked += plan.queue[t.name]
+        plan.projected[t.name] = projected_seconds(stacked, selectors, coverage)
+
+    # jitter only inside the slack every due tier still has before its SLO
+    slack = min((t.slo.total_seconds() - plan.projected[t.name] for t in due), default=0.0)
+    jitter = min((t.jitter_pct for t in due), default=0.0) / 100.0 * max(0.0, slack)
+    plan.start_at = fire_at + timedelta(seconds=rng.uniform(-jitter, jitter))
+    return plan
+
+def describe(plan: TickPlan) -> str:
+    lines = [f"tick fire={plan.fire_at.isoformat()} start={plan.start_at.isoformat()}"]
+    for t in plan.tiers:
+        proj = plan.projected[t.name]
+        flag = "" if proj <= t.slo.total_seconds() else "  ⚠ projected past SLO"
+        lines.append(f"  {t.name}: {len(plan.queue[t.name])} to fetch, {plan.skipped[t.name]} still fresh, "
+                     f"projected {proj / 60:.1f} min (SLO {t.slo.total_seconds() / 3600:.0f}h){flag}")
+    return "\n".join(lines)
+
+# ---------- execution ----------
+
+def execute(plan: TickPlan, retailers: List[str], ledger: Dict[str, float], **run_kwargs) -> Dict[str, Any]:
+    buckets = plan.buckets(retailers)
+    summary = runner.run(retailers, 0, False, buckets=buckets, **run_kwargs)
+    for res in summary["results"]:
+        if res["ok"]:
+            ledger[res["product_url"]] = res["finished_at"]
+    save_freshness(ledger)
+
+    finished = {r["product_url"]: r["finished_at"] for r in summary["results"]}
+    report = {"run_id": summary["run_id"], "fire_at": plan.fire_at.isoformat(),
+              "started_at": datetime.fromtimestamp(summary["started_at"], timezone.utc).isoformat(), "tiers": {}}
+    for t in plan.tiers:
+        urls = [r.product_url for r in plan.queue[t.name]]
+        done = [finished[u] for u in urls if u in finished]
+        actual = (max(done) - summary["started_at"]) if done else 0.0
+        report["tiers"][t.name] = {
+            "queued": len(urls), "skipped_fresh": plan.skipped[t.name],
+            "projected_seconds": round(plan.projected[t.name], 1), "actual_seconds": round(actual, 1),
+            "slo_seconds": t.slo.total_seconds(), "met_slo": actual <= t.slo.total_seconds(),
+        }
+        print(f"📊 {t.name}: projected {plan.projected[t.name] / 60:.1f} min, actual {actual / 60:.1f} min "
+              f"({len(done)}/{len(urls)} pages)")
+    TICK_LOG.parent.mkdir(parents=True, exist_ok=True)
+    with TICK_LOG.open("a", encoding="utf-8") as f:
+        f.write(json.dumps(report) + "\n")
+    return report
+
+def main():
+    ap = argparse.ArgumentParser(description="Tiered crawl scheduler (config/retail_coverage.yml)")
+    ap.add_argument("--once", action="store_true", help="run the next due tick immediately, then exit")
+    ap.add_argument("--dry-run", action="store_true", help="print the next tick plans and exit")
+    ap.add_argument("--parser", choices=runner.PARSERS, default=runner.DEFAULT_PARSER, help="HTML parser backend")
+    ap.add_argument("--seed", type=int, default=None, help="jitter RNG seed (reproducible schedules)")
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    last_fire = datetime.now(timezone.utc)
+    while True:
+        selectors, coverage = runner.load_yaml(runner.SEL), runner.load_yaml(runner.COV)
+        retailers = enabled_retailers(selectors, coverage)
+        tiers = build_tiers(coverage, retailers)
+        ledger = load_freshness()
+        # never re-plan a tick we already ran (a tick can start early through jitter)
+        plan = plan_tick(tiers, max(datetime.now(timezone.utc), last_fire), selectors, coverage, ledger, rng)
+        print(describe(plan))
+        if args.dry_run:
+            return
+
+        if not args.once:
+            wait = (plan.start_at - datetime.now(timezone.utc)).total_seconds()
+            if wait > 0:
+                print(f"⏳ sleeping {wait / 60:.1f} min")
+                time.sleep(wait)
+        execute(plan, retailers, ledger, parser=args.parser)
+        last_fire = plan.fire_at
+        if args.once:
+            return
+
+if __name__ == "__main__":
+    main()
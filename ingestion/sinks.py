@@ -0,0 +1,216 @@
+# ingestion/sinks.py
+# Output sinks for observation rows (one run can write several formats at once).
+# - CsvSink: the original data/observations/<date>/obs_<ts>_<run_id>.csv (every value stringified)
+# - ParquetSink: typed columns from dbt/seeds/obs_latest.yml column_types, dictionary-encoded
+#   retailer/brand/category, snappy/zstd compression, one row group per `row_group_rows` rows as they stream in
+# - DuckDBSink: appends typed rows (+ obs_date) to raw.observations in data/warehouse.duckdb for the dbt duckdb target
+# - FanOutSink: writes every row to each of the above
+
+import csv
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: Parquet output needs pyarrow
+    pa = pq = None
+
+try:
+    import duckdb
+except ImportError:  # optional: only the duckdb sink needs it
+    duckdb = None
+
+DICTIONARY_COLUMNS = ("retailer", "brand", "category")
+
+class CsvSink:
+    suffix = ".csv"
+
+    @classmethod
+    def path_for(cls, stem: Path, **_: Any) -> Path:
+        return stem.with_suffix(cls.suffix)
+
+    def __init__(self, path: Path, header: Sequence[str], **_: Any):
+        self.path = path
+        self._f = path.open("w", encoding="utf-8", newline="")
+        self._writer = csv.DictWriter(self._f, fieldnames=list(header))
+        self._writer.writeheader()
+
+    def write(self, rec: Dict[str, Any]):
+        self._writer.writerow(rec)
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+def _to_timestamp(v: Any) -> Optional[datetime]:
+    if v in (None, ""):
+        return None
+    if isinstance(v, datetime):
+        return v
+    return datetime.strptime(v, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+
+def _to_naive_utc(v: Any) -> Optional[datetime]:
+    ts = _to_timestamp(v)
+    return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts and ts.tzinfo else ts
+
+def _to_float(v: Any) -> Optional[float]:
+    return None if v in (None, "") else float(v)
+
+def _to_int(v: Any) -> Optional[int]:
+    return None if v in (None, "") else int(v)
+
+def _to_bool(v: Any) -> Optional[bool]:
+    if v in (None, ""):
+        return None
+    return v if isinstance(v, bool) else str(v).strip().lower() in ("true", "1")
+
+def _to_str(v: Any) -> Optional[str]:
+    return None if v is None else str(v)
+
+# dbt seed column_types -> value converter / column type per sink
+_CONVERTERS = {"string": _to_str, "timestamp": _to_timestamp, "float": _to_float,
+               "integer": _to_int, "boolean": _to_bool}
+_DUCKDB_TYPES = {"string": "VARCHAR", "timestamp": "TIMESTAMP", "float": "DOUBLE",
+                 "integer": "BIGINT", "boolean": "BOOLEAN"}
+
+def _arrow_types() -> Dict[str, Any]:
+    return {
+        "string":    (pa.string(), _to_str),
+        "timestamp": (pa.timestamp("s", tz="UTC"), _to_timestamp),
+        "float":     (pa.float64(), _to_float),
+        "integer":   (pa.int64(), _to_int),
+        "boolean":   (pa.bool_(), _to_bool),
+    }
+
+class ParquetSink:
+    suffix = ".parquet"
+
+    @classmethod
+    def path_for(cls, stem: Path, **_: Any) -> Path:
+        return stem.with_suffix(cls.suffix)
+
+    def __init__(self, path: Path, header: Sequence[str], column_types: Optional[Dict[str, str]] = None,
+                 compression: str = "zstd", row_group_rows: int = 5000, **_: Any):
+        if pa is None:
+            raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow)")
+        types = _arrow_types()
+        column_types = column_types or {}
+        self.path = path
+        self.row_group_rows = max(1, row_group_rows)
+        self._cols = list(header)
+        self._conv = [types[column_types.get(c, "string")][1] for c in self._cols]
+        self.schema = pa.schema([(c, types[column_types.get(c, "string")][0]) for c in self._cols])
+        self._buf: List[List[Any]] = [[] for _ in self._cols]
+        self._writer = pq.ParquetWriter(
+            str(path), self.schema, compression=compression,
+            use_dictionary=[c for c in DICTIONARY_COLUMNS if c in self._cols],
+        )
+        self.row_groups = 0
+
+    def write(self, rec: Dict[str, Any]):
+        for buf, col, conv in zip(self._buf, self._cols, self._conv):
+            buf.append(conv(rec.get(col)))
+        if len(self._buf[0]) >= self.row_group_rows:
+            self.flush()
+
+    def flush(self):
+        if not self._buf[0]:
+            return
+        self._writer.write_table(pa.Table.from_arrays(
+            [pa.array(buf, type=f.type) for buf, f in zip(self._buf, self.schema)], schema=self.schema,
+        ))
+        self.row_groups += 1
+        self._buf = [[] for _ in self._cols]
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+class DuckDBSink:
+    """Appends to one long-lived table; DuckDB has no declarative partitions, so rows carry obs_date
+    (and arrive in time order), which lets its per-row-group min/max indexes skip other days."""
+
+    table = "raw.observations"
+
+    @classmethod
+    def path_for(cls, stem: Path, warehouse: Optional[Path] = None, **_: Any) -> Path:
+        return warehouse or stem.with_suffix(".duckdb")
+
+    def __init__(self, path: Path, header: Sequence[str], column_types: Optional[Dict[str, str]] = None,
+                 row_group_rows: int = 5000, **_: Any):
+        if duckdb is None:
+            raise RuntimeError("DuckDB output needs duckdb (pip install duckdb)")
+        column_types = column_types or {}
+        self.path = path
+        self.row_group_rows = max(1, row_group_rows)
+        self._cols = list(header)
+        # TIMESTAMP holds naive UTC, so comparisons never depend on the session time zone
+        self._conv = [_to_naive_utc if column_types.get(c) == "timestamp" else _CONVERTERS[column_types.get(c, "string")]
+                      for c in self._cols]
+        self._ts_col = next((c for c in self._cols if column_types.get(c) == "timestamp"), None)
+        self._rows: List[tuple] = []
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._con = duckdb.connect(str(path))
+        self._con.execute("CREATE SCHEMA IF NOT EXISTS raw")
+        cols = ", ".join(f'"{c}" {_DUCKDB_TYPES[column_types.get(c, "string")]}' for c in self._cols)
+        self._con.execute(f"CREATE TABLE IF NOT EXISTS {self.table} ({cols}, obs_date DATE)")
+        have = {r[0] for r in self._con.execute(
+            "SELECT column_name FROM information_schema.columns WHERE table_schema = 'raw' AND table_name = 'observations'"
+        ).fetchall()}
+        for c in self._cols:  # HEADER grew since the table was created
+            if c not in have:
+                self._con.execute(f'ALTER TABLE {self.table} ADD COLUMN "{c}" {_DUCKDB_TYPES[column_types.get(c, "string")]}')
+        names = ", ".join(f'"{c}"' for c in self._cols)
+        self._insert = f"INSERT INTO {self.table} ({names}, obs_date) VALUES ({', '.join('?' for _ in self._cols)}, ?)"
+
+    def write(self, rec: Dict[str, Any]):
+        vals = [conv(rec.get(c)) for c, conv in zip(self._cols, self._conv)]
+        ts = vals[self._cols.index(self._ts_col)] if self._ts_col else None
+        self._rows.append((*vals, ts.date() if ts else None))
+        if len(self._rows) >= self.row_group_rows:
+            self.flush()
+
+    def flush(self):
+        if self._rows:
+            self._con.executemany(self._insert, self._rows)
+            self._rows = []
+
+    def close(self):
+        self.flush()
+        self._con.close()
+
+SINKS = {"csv": CsvSink, "parquet": ParquetSink, "duckdb": DuckDBSink}
+
+class FanOutSink:
+    def __init__(self, sinks: List[Any]):
+        self.sinks = sinks
+        self.paths = [s.path for s in sinks]
+
+    def write(self, rec: Dict[str, Any]):
+        for s in self.sinks:
+            s.write(rec)
+
+    def close(self):
+        for s in self.sinks:
+            s.close()
+
+def open_sinks(stem: Path, formats: Sequence[str], header: Sequence[str], **options: Any) -> FanOutSink:
+    """One sink per format: files at `stem` + the format's suffix (obs_<ts>_<run_id>.csv / .parquet),
+    the duckdb sink at options["warehouse"]."""
+    unknown = sorted(set(formats) - set(SINKS))
+    if unknown:
+        raise ValueError(f"unknown output format(s): {', '.join(unknown)}")
+    paths = {fmt: SINKS[fmt].path_for(stem, **options) for fmt in dict.fromkeys(formats)}
+    if len(set(paths.values())) < len(paths):
+        raise ValueError(f"output formats would share a file: {paths}")
+    opened: List[Any] = []
+    try:
+        for fmt, path in paths.items():
+            opened.append(SINKS[fmt](path, header, **options))
+    except Exception:
+        for s in opened:
+            s.close()
+        raise
+    return FanOutSink(opened)
@@ -0,0 +1,69 @@
+# ingestion/validators.py
+# Conditional-GET validator store for PDP fetches, keyed by product_url.
+# Per URL we keep: ETag, Last-Modified, sha256 of the body, the parsed result and the
+# fingerprint of the extraction plan that produced it. A 304 or an unchanged body hash
+# lets the runner reuse that result instead of re-parsing (only if the plan is unchanged).
+
+import json, hashlib, threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+def content_hash(html: str) -> str:
+    return hashlib.sha256(html.encode("utf-8", errors="ignore")).hexdigest()
+
+class ValidatorStore:
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        if path.exists():
+            try:
+                self._entries = json.loads(path.read_text(encoding="utf-8")) or {}
+            except (OSError, ValueError):
+                self._entries = {}  # corrupt cache: start over, it is only an optimisation
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, url: str, plan_key: str) -> Optional[Dict[str, Any]]:
+        """Entry for `url` if its stored result was produced by the same extraction plan."""
+        with self._lock:
+            e = self._entries.get(url)
+        if e and e.get("plan") == plan_key and e.get("result") is not None:
+            return e
+        return None
+
+    def conditional_headers(self, entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        h: Dict[str, str] = {}
+        if not entry:
+            return h
+        if entry.get("etag"):
+            h["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            h["If-Modified-Since"] = entry["last_modified"]
+        return h
+
+    def update(self, url: str, plan_key: str, headers: Dict[str, str], body_hash: str, result: List[Any]):
+        lower = {k.lower(): v for k, v in (headers or {}).items()}
+        with self._lock:
+            self._entries[url] = {
+                "etag": lower.get("etag"),
+                "last_modified": lower.get("last-modified"),
+                "content_hash": body_hash,
+                "plan": plan_key,
+                "result": list(result),
+                "updated_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            }
+
+    def touch(self, url: str):
+        with self._lock:
+            if url in self._entries:
+                self._entries[url]["updated_at"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with self._lock:
+            tmp.write_text(json.dumps(self._entries, indent=1, sort_keys=True), encoding="utf-8")
+        tmp.replace(self.path)
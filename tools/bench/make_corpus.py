@@ -0,0 +1,162 @@
+# tools/bench/make_corpus.py
+# Regenerate the frozen parser-benchmark corpus (tools/bench/corpus/*.html + expected.json).
+# Pages are synthetic: they copy the structure that selectors.yml relies on for Amazon FR / Sephora FR PDPs
+# (price blocks, availability widgets, JSON-LD, block pages) around deterministic filler of realistic size.
+# No captured page, product, customer or session data goes in, so the corpus can live in git.
+# Only rerun this when the corpus itself has to change; bench_parse.py baselines are tied to it.
+# Example: python tools/bench/make_corpus.py
+import json, random
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+CORPUS = HERE / "corpus"
+
+WORDS = ("texture", "parfum", "flacon", "peau", "cheveux", "routine", "matin", "soir", "léger", "fondant",
+         "hydratation", "éclat", "douceur", "formule", "nuance", "application", "résultat", "semaine", "tube",
+         "crème", "sérum", "soin", "odeur", "pinceau", "teint", "volume", "brillance", "pratique", "agréable")
+
+def sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+def filler_css(rng: random.Random, rules: int) -> str:
+    return "\n".join(f".c{rng.randrange(10**6):06x}{{margin:{rng.randint(0, 24)}px;color:#{rng.randrange(16**6):06x}}}"
+                     for _ in range(rules))
+
+def filler_state(rng: random.Random, items: int) -> str:
+    """Inline JS state blob like the ones both sites ship (not JSON-LD, never parsed by the runner)."""
+    state = {"widgets": [{"id": f"w{i}", "slot": rng.randrange(99), "weights": [rng.random() for _ in range(8)]}
+                         for i in range(items)]}
+    return "window.__STATE__ = " + json.dumps(state, separators=(",", ":")) + ";"
+
+def nav(rng: random.Random, links: int) -> str:
+    return "<ul class=\"nav\">" + "".join(
+        f"<li><a href=\"/c/{rng.randrange(10**5)}\">{sentence(rng, 2)}</a></li>" for _ in range(links)) + "</ul>"
+
+def reviews(rng: random.Random, n: int) -> str:
+    return "<section id=\"reviews\">" + "".join(
+        f"<div class=\"review\"><span class=\"stars\">{rng.randint(1, 5)}/5</span><p>{sentence(rng, rng.randint(12, 40))}</p></div>"
+        for _ in range(n)) + "</section>"
+
+def jsonld(name: str, sku: str, price: str, availability: str) -> str:
+    doc = {"@context": "https://schema.org", "@type": "Product", "name": name, "sku": sku,
+           "offers": {"@type": "Offer", "price": price, "priceCurrency": "EUR",
+                      "availability": f"https://schema.org/{availability}"}}
+    return f'<script type="application/ld+json">{json.dumps(doc, ensure_ascii=False)}</script>'
+
+# ---------- amazon_fr ----------
+
+def amazon_page(rng: random.Random, name: str, core: str, buybox: str, ld: str) -> str:
+    carousel = "".join(
+        f'<li class="p13n-item"><a href="/dp/B0{rng.randrange(10**8):08d}">{sentence(rng, 4)}</a>'
+        f'<span class="p13n-sc-price">{rng.randint(5, 80)},{rng.randint(0, 99):02d} €</span></li>' for _ in range(60))
+    return f"""<!doctype html><html lang="fr"><head><meta charset="utf-8"><title>{name} : Amazon.fr: Beauté et Parfum</title>
+<style>{filler_css(rng, 900)}</style><script>{filler_state(rng, 250)}</script></head><body>
+<header id="navbar">{nav(rng, 180)}</header>
+<div id="dp-container"><h1 id="title"><span id="productTitle">{name}</span></h1>
+{core}
+{buybox}
+<div id="feature-bullets"><ul>{"".join(f"<li>{sentence(rng, 14)}</li>" for _ in range(6))}</ul></div>
+</div>
+{ld}
+<div id="sims-carousel"><ol>{carousel}</ol></div>
+{reviews(rng, 45)}
+<footer>{nav(rng, 120)}</footer>
+</body></html>"""
+
+def amazon_core(price: str, list_price: str = "", saving: str = "") -> str:
+    struck = (f'<span class="a-price a-text-price" data-a-strike="true"><span class="a-offscreen">{list_price}</span>'
+              f'<span aria-hidden="true">{list_price}</span></span>') if list_price else ""
+    badge = f'<span class="a-size-large a-color-price savingsPercentage">{saving}</span>' if saving else ""
+    return (f'<div id="corePrice_feature_div"><div class="a-section">{badge}'
+            f'<span class="a-price aok-align-center priceToPay"><span class="a-offscreen">{price}</span>'
+            f'<span aria-hidden="true">{price}</span></span>{struck}</div></div>')
+
+AMAZON_BUYBOX_IN = ('<div id="availability" class="a-section"><span class="a-size-medium a-color-success">En stock</span></div>'
+                    '<input id="add-to-cart-button" type="submit" value="Ajouter au panier">'
+                    '<input id="buy-now-button" type="submit" value="Acheter cette article">')
+AMAZON_BUYBOX_OOS = ('<div id="outOfStock" class="a-box"><span class="a-color-price a-text-bold">Actuellement indisponible.</span>'
+                     '<p>Nous ne savons pas quand cet article sera de nouveau approvisionné.</p></div>')
+
+AMAZON_CAPTCHA = """<!doctype html><html><head><title>Amazon.fr</title></head><body>
+<div class="a-container"><h4>Saisissez les caractères que vous voyez ci-dessous</h4>
+<p class="a-last">Désolés, nous devons simplement nous assurer que vous n'êtes pas un robot.</p>
+<form method="get" action="/errors/validateCaptcha" name=""><input type=hidden name="amzn" value="0000000000" />
+<img src="https://images-na.ssl-images-amazon.com/captcha/xxxxxxxx/Captcha_xxxxxxxxxx.jpg">
+<input autocomplete="off" name="field-keywords" id="captchacharacters" type="text">
+<button type="submit" class="a-button-text">Continuer les achats</button></form>
+<!-- Robot Check --></div></body></html>"""
+
+# ---------- sephora_fr ----------
+
+def sephora_page(rng: random.Random, name: str, price_block: str, button: str, ld: str) -> str:
+    return f"""<!doctype html><html lang="fr"><head><meta charset="utf-8"><title>{name} | Sephora</title>
+<style>{filler_css(rng, 700)}</style><script>{filler_state(rng, 180)}</script>{ld}</head><body>
+<header class="header">{nav(rng, 220)}</header>
+<main id="pdp"><h1 class="product-name">{name}</h1>
+{price_block}
+{button}
+<div class="product-description">{"".join(f"<p>{sentence(rng, 25)}</p>" for _ in range(8))}</div>
+</main>
+{reviews(rng, 35)}
+<footer class="footer">{nav(rng, 90)}</footer>
+</body></html>"""
+
+def sephora_price(price: str, list_price: str = "", badge: str = "") -> str:
+    std = f'<span class="price-standard">{list_price}</span>' if list_price else ""
+    promo = f'<span data-testid="promo-badge">{badge}</span>' if badge else ""
+    return f'<div class="product-price"><span class="price-sales">{price}</span>{std}{promo}</div>'
+
+SEPHORA_BLOCK = """<!doctype html><html lang="fr"><head><title>sephora.fr</title></head><body>
+<p>Please enable JS and disable any ad blocker</p>
+<script>var dd={'rt':'c','cid':'AHrlqAAAAAMA','hsh':'0000000000','t':'bv','s':00000,'host':'geo.captcha-delivery.com'}</script>
+<script src="https://ct.captcha-delivery.com/c.js"></script></body></html>"""
+
+def build():
+    pages = {}
+    rng = random.Random(2025)
+    pages["amazon_fr_instock"] = (
+        amazon_page(rng, "Sérum Hydratant Acide Hyaluronique 30 ml", amazon_core("24,90 €"), AMAZON_BUYBOX_IN,
+                    jsonld("Sérum Hydratant 30 ml", "AMZ-0001", "24.90", "InStock")),
+        {"price": 24.9, "list_price": None, "discount": None, "in_stock": True, "blocked": ""})
+    pages["amazon_fr_discounted"] = (
+        amazon_page(rng, "Masque Capillaire Réparateur 200 ml", amazon_core("29,99 €", "39,99 €", "-25 %"),
+                    AMAZON_BUYBOX_IN, jsonld("Masque Capillaire 200 ml", "AMZ-0002", "29.99", "InStock")),
+        {"price": 29.99, "list_price": 39.99, "discount": 0.25, "in_stock": True, "blocked": ""})
+    pages["amazon_fr_oos"] = (
+        amazon_page(rng, "Palette Fards à Paupières 12 teintes", "", AMAZON_BUYBOX_OOS,
+                    jsonld("Palette 12 teintes", "AMZ-0003", "34.00", "OutOfStock")),
+        {"price": None, "list_price": None, "discount": None, "in_stock": False, "blocked": ""})
+    pages["amazon_fr_captcha"] = (
+        AMAZON_CAPTCHA,
+        {"price": None, "list_price": None, "discount": None, "in_stock": None, "blocked": "needle:Robot Check"})
+    pages["sephora_fr_instock"] = (
+        sephora_page(rng, "Crème Riche Nourrissante 50 ml", sephora_price("45,00 €"),
+                     '<button id="add-to-cart" type="submit">Ajouter au panier</button>',
+                     jsonld("Crème Riche 50 ml", "SEP-0001", "45.00", "InStock")),
+        {"price": 45.0, "list_price": None, "discount": None, "in_stock": True, "blocked": ""})
+    pages["sephora_fr_discounted"] = (
+        sephora_page(rng, "Mascara Volume Intense", sephora_price("28,00 €", "35,00 €", "-20%"),
+                     '<button id="add-to-cart" type="submit">Ajouter au panier</button>',
+                     jsonld("Mascara Volume", "SEP-0002", "28.00", "InStock")),
+        {"price": 28.0, "list_price": 35.0, "discount": 0.2, "in_stock": True, "blocked": ""})
+    pages["sephora_fr_oos"] = (
+        sephora_page(rng, "Huile Sèche Corps et Cheveux 100 ml", sephora_price("32,50 €"),
+                     '<button id="add-to-cart" type="submit" disabled aria-disabled="true">Me prévenir</button>',
+                     jsonld("Huile Sèche 100 ml", "SEP-0003", "32.50", "OutOfStock")),
+        {"price": 32.5, "list_price": None, "discount": None, "in_stock": False, "blocked": ""})
+    pages["sephora_fr_captcha"] = (
+        SEPHORA_BLOCK,
+        {"price": None, "list_price": None, "discount": None, "in_stock": None, "blocked": "needle:captcha-delivery.com"})
+    return pages
+
+def main():
+    CORPUS.mkdir(parents=True, exist_ok=True)
+    expected = {}
+    for name, (html, exp) in build().items():
+        (CORPUS / f"{name}.html").write_text(html, encoding="utf-8")
+        expected[f"{name}.html"] = exp
+        print(f"{name}.html: {len(html.encode('utf-8')) / 1024:.0f} KiB")
+    (CORPUS / "expected.json").write_text(json.dumps(expected, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+# tools/bench_parse.py
+# Micro-benchmark of the parse path over the frozen corpus in tools/bench/corpus (see tools/bench/make_corpus.py).
+# For every parser backend x selectors file it:
+# - checks the results against corpus/expected.json first (a fast wrong parser is not a win)
+# - times block_check, dom_build, parse_html, detect_stock and jsonld_stock per page (best of --repeat rounds:
+#   the minimum is the estimate least disturbed by other load on the box)
+# - reports pages/sec over the runner's path (block check, then parse_html unless blocked)
+#   and the peak Python heap of one pass (tracemalloc; C-level allocations of lxml/selectolax are not seen)
+# - compares with tools/bench/baseline.json, scaled by a pure-Python calibration loop so a slower box
+#   does not read as a regression; anything worse than --tolerance exits 1
+# - the baseline records the Python and parser-library versions: peak memory is only compared when they
+#   match (allocation sizes change between releases), timings always are
+# Example: python tools/bench_parse.py --parsers html.parser lxml --repeat 20
+#          python tools/bench_parse.py --save-baseline   (after an intended change, commit the new baseline)
+import gc, sys, json, time, argparse, platform, tracemalloc
+from importlib import metadata
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "ingestion"))
+
+import yaml
+from htmldoc import PARSERS, available_parsers
+from plans import load_plans
+from runner import SEL, ParsedPage, detect_stock, jsonld_stock, parse_html
+
+BENCH = ROOT / "tools" / "bench"
+CORPUS = BENCH / "corpus"
+BASELINE = BENCH / "baseline.json"
+FUNCTIONS = ("block_check", "dom_build", "parse_html", "detect_stock", "jsonld_stock")
+FIELDS = ("price", "list_price", "discount", "in_stock")
+LIBRARIES = ("beautifulsoup4", "lxml", "soupsieve", "selectolax")
+
+def versions():
+    """Python + parser libraries the numbers were taken with (None: not installed)."""
+    out = {"python": platform.python_version()}
+    for lib in LIBRARIES:
+        try:
+            out[lib] = metadata.version(lib)
+        except metadata.PackageNotFoundError:
+            out[lib] = None
+    return out
+
+def retailer_of(name: str, retailers) -> str:
+    """Corpus pages are named {retailer}_{case}.html."""
+    return next((r for r in sorted(retailers, key=len, reverse=True) if name.startswith(r + "_")), "")
+
+def load_corpus():
+    expected = json.loads((CORPUS / "expected.json").read_text(encoding="utf-8"))
+    return [(name, (CORPUS / name).read_text(encoding="utf-8"), exp) for name, exp in sorted(expected.items())]
+
+def calibrate() -> float:
+    """Seconds for a fixed pure-Python workload (string scanning + dict churn). Sampled once per
+    timing round, so the best sample was taken under the same conditions as the best round."""
+    text = "Ajouter au panier 12,99 € " * 2000
+    t0 = time.perf_counter()
+    d = {}
+    for i in range(60000):
+        d[i % 977] = text.find("€", i % 5000) + len(str(i))
+    return time.perf_counter() - t0
+
+def run_page(html: str, plan, parser: str):
+    """The runner's path for one fetched body: block detector, then parse_html unless blocked."""
+    blocked = (plan.block.check_complete(html) or "") if plan.block else ""
+    return blocked, (None, None, None, None) if blocked else parse_html(html, plan, parser)
+
+def check(pages, plans, parser: str) -> int:
+    bad = 0
+    for name, html, exp in pages:
+        blocked, got = run_page(html, plans[retailer_of(name, plans)], parser)
+        want = (exp["blocked"], tuple(exp[f] for f in FIELDS))
+        if (blocked, got) != want:
+            bad += 1
+            print(f"  ✗ {name} [{parser}]: got blocked={blocked!r} {got}, expected blocked={want[0]!r} {want[1]}")
+    return bad
+
+def timed(fn, *args) -> float:
+    t0 = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t0
+
+def bench(pages, plans, parser: str, repeat: int, calibration: list):
+    per_fn = {f: [] for f in FUNCTIONS}   # per round: seconds summed over the corpus
+    rounds = []
+    for _ in range(repeat):
+        calibration.append(calibrate())
+        totals = dict.fromkeys(FUNCTIONS, 0.0)
+        t_round = 0.0
+        for name, html, _ in pages:
+            plan = plans[retailer_of(name, plans)]
+            t_round += timed(run_page, html, plan, parser)
+            if plan.block:
+                totals["block_check"] += timed(plan.block.check_complete, html)
+            totals["dom_build"] += timed(ParsedPage, html, parser)
+            totals["parse_html"] += timed(parse_html, html, plan, parser)
+            # fresh pages: ParsedPage memoises the JSON-LD facts
+            totals["detect_stock"] += timed(detect_stock, ParsedPage(html, parser), plan)
+            totals["jsonld_stock"] += timed(jsonld_stock, ParsedPage(html, parser))
+        rounds.append(t_round)
+        for f in FUNCTIONS:
+            per_fn[f].append(totals[f])
+
+    gc.collect()  # bs4 trees left by the timing rounds would otherwise be freed (or not) inside the measured pass
+    tracemalloc.start()
+    for name, html, _ in pages:
+        run_page(html, plans[retailer_of(name, plans)], parser)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    n = len(pages)
+    return {
+        "pages": n,
+        "pages_per_sec": round(n / min(rounds), 2),
+        "us_per_page": {f: round(min(v) / n * 1e6, 1) for f, v in per_fn.items()},
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+def regressions(key: str, cur, base, scale: float, tol: float, min_delta_us: float, check_memory: bool = True):
+    """`scale` = current calibration / baseline calibration (>1: this box is slower)."""
+    out = []
+    want_pps = base["pages_per_sec"] / scale
+    if cur["pages_per_sec"] < want_pps * (1 - tol):
+        out.append(f"{key}: {cur['pages_per_sec']} pages/s < {want_pps:.1f} expected")
+    for f, us in cur["us_per_page"].items():
+        b = base["us_per_page"].get(f)
+        if b and us > b * scale * (1 + tol) and us - b * scale > min_delta_us:
+            out.append(f"{key}: {f} {us} µs/page > {b * scale:.1f} expected")
+    if check_memory and cur["peak_kib"] > base["peak_kib"] * (1 + tol):
+        out.append(f"{key}: peak {cur['peak_kib']} KiB > {base['peak_kib']} KiB")
+    return out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--parsers", nargs="+", choices=PARSERS, default=None, help="backends to run (default: all installed)")
+    ap.add_argument("--selectors", nargs="+", type=Path, default=[SEL], help="selectors.yml variants to compare")
+    ap.add_argument("--repeat", type=int, default=15, help="timing rounds over the corpus (the best one is kept)")
+    ap.add_argument("--baseline", type=Path, default=BASELINE)
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown / memory growth vs baseline")
+    ap.add_argument("--min-delta-us", type=float, default=20.0,
+                    help="ignore per-function slowdowns smaller than this (µs/page): timer jitter on tiny functions")
+    ap.add_argument("--save-baseline", action="store_true", help="write these results as the new baseline")
+    ap.add_argument("--json", type=Path, default=None, help="also write the results here")
+    args = ap.parse_args()
+
+    installed = available_parsers()
+    parsers = [p for p in (args.parsers or installed) if p in installed]
+    missing = sorted(set(args.parsers or []) - set(installed))
+    if missing:
+        print(f"skipping (not installed): {', '.join(missing)}")
+    pages = load_corpus()
+    samples = [calibrate() for _ in range(3)]
+    results = {"runs": {}, "versions": versions()}
+    wrong = 0
+
+    print(f"{len(pages)} pages, {args.repeat} rounds\n")
+    print(f"{'selectors/parser':<32} {'pages/s':>8} " + " ".join(f"{f:>13}" for f in FUNCTIONS) + f" {'peak KiB':>9}")
+    for sel_path in args.selectors:
+        plans = load_plans(yaml.safe_load(sel_path.read_text(encoding="utf-8")) or {})
+        for parser in parsers:
+            key = f"{sel_path.stem}/{parser}"
+            bad = check(pages, plans, parser)
+            wrong += bad
+            if bad:
+                print(f"{key:<32} skipped: {bad} wrong result(s)")
+                continue
+            r = results["runs"][key] = bench(pages, plans, parser, args.repeat, samples)
+            print(f"{key:<32} {r['pages_per_sec']:>8} " + " ".join(f"{r['us_per_page'][f]:>10} µs" for f in FUNCTIONS)
+                  + f" {r['peak_kib']:>9}")
+
+    calibration = results["calibration_s"] = round(min(samples), 5)
+    print(f"calibration {calibration * 1000:.1f} ms")
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    if args.save_baseline:
+        if wrong:
+            sys.exit("❌ not saving a baseline from wrong results")
+        args.baseline.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"\n✅ Baseline → {args.baseline}")
+        return
+
+    problems = []
+    if args.baseline.exists():
+        base = json.loads(args.baseline.read_text(encoding="utf-8"))
+        scale = calibration / base["calibration_s"]
+        changed = {k: (base.get("versions", {}).get(k), v) for k, v in results["versions"].items()
+                   if base.get("versions", {}).get(k) != v}
+        if changed:
+            print("  (peak memory not compared, versions differ from the baseline: "
+                  + ", ".join(f"{k} {a} → {b}" for k, (a, b) in sorted(changed.items())) + ")")
+        for key, cur in results["runs"].items():
+            if key in base["runs"]:
+                problems += regressions(key, cur, base["runs"][key], scale, args.tolerance, args.min_delta_us,
+                                        check_memory=not changed)
+            else:
+                print(f"  (no baseline for {key})")
+        print(f"\nvs {args.baseline.name} (box speed ×{1 / scale:.2f} of the baseline's, tolerance {args.tolerance:.0%}):")
+    else:
+        print(f"\nno baseline at {args.baseline}; run with --save-baseline to create one")
+    for p in problems:
+        print(f"  ❌ {p}")
+    if wrong:
+        print(f"  ❌ {wrong} page(s) parsed differently from expected.json")
+    if not problems and not wrong:
+        print("  ✅ no regressions")
+    sys.exit(1 if problems or wrong else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# tools/check_jsonld_parity.py
+# Check the DOM-free JSON-LD path (ingestion/jsonld.py) against the DOM on saved pages:
+# - script_blocks() finds the same <script type="application/ld+json"> bodies as every installed DOM backend
+# - its availability verdict matches the previous jsonld_stock (DOM script blocks + generic DFS, kept below)
+# Both exit 1 on a mismatch. It also reports, per retailer, what `jsonld_primary: true` would change:
+# pages with complete JSON-LD and the fields where it disagrees with the DOM selectors (informational;
+# read it before switching a retailer over), plus the time per page of both paths.
+# Example: python tools/check_jsonld_parity.py --corpus tools/bench/corpus debug
+import sys, json, time, argparse
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "ingestion"))
+
+import yaml
+from htmldoc import PARSERS, available_parsers, parse_document
+from jsonld import LD_TYPE, extract, script_blocks
+from plans import load_plans
+from runner import SEL, parse_html
+
+FIELDS = ("price", "list_price", "discount", "in_stock")
+
+def legacy_jsonld_stock(blocks):
+    """jsonld_stock before jsonld.py: first decisive availability of a stack DFS over each block."""
+    for txt in blocks:
+        if not txt:
+            continue
+        try:
+            data = json.loads(txt)
+        except Exception:
+            if "InStock" in txt: return True
+            if "OutOfStock" in txt: return False
+            continue
+        stack = [data]
+        while stack:
+            cur = stack.pop()
+            if isinstance(cur, dict):
+                av = cur.get("availability") or cur.get("itemAvailability")
+                if isinstance(av, str):
+                    if "InStock" in av: return True
+                    if "OutOfStock" in av: return False
+                stack.extend(v for v in cur.values() if isinstance(v, (dict, list)))
+            elif isinstance(cur, list):
+                stack.extend(cur)
+    return None
+
+def retailer_of(path: Path, retailers):
+    return next((r for r in sorted(retailers, key=len, reverse=True) if path.name.startswith(r + "_")), None)
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--corpus", nargs="+", type=Path, default=[ROOT / "tools" / "bench" / "corpus", ROOT / "debug"],
+                    help="directories of saved *.html pages named {retailer}_... (missing ones are skipped)")
+    ap.add_argument("--parsers", nargs="+", choices=PARSERS, default=None, help="backends to compare (default: all installed)")
+    args = ap.parse_args()
+
+    plans = load_plans(yaml.safe_load(SEL.read_text(encoding="utf-8")) or {})
+    installed = available_parsers()
+    parsers = [p for p in (args.parsers or installed) if p in installed]
+    paths = sorted(p for d in args.corpus if d.is_dir() for p in d.rglob("*.html"))
+
+    bad = 0
+    report = {}
+    for path in paths:
+        html = path.read_text(encoding="utf-8", errors="replace")
+        blocks = script_blocks(html)
+        for parser in parsers:
+            dom_blocks = parse_document(html, parser).script_texts(LD_TYPE)
+            if dom_blocks != blocks:
+                bad += 1
+                print(f"  ✗ {path.name} [{parser}]: {len(blocks)} block(s) from the scan, {len(dom_blocks)} from the DOM")
+        ld, t_ld = timed(extract, html)
+        want = legacy_jsonld_stock(blocks)
+        if ld.in_stock != want:
+            bad += 1
+            print(f"  ✗ {path.name}: availability {ld.in_stock!r}, previous jsonld_stock {want!r}")
+
+        retailer = retailer_of(path, plans)
+        if retailer is None or not ld.complete:
+            continue
+        dom, t_dom = timed(parse_html, html, plans[retailer], parsers[0])
+        plan = load_plans({retailer: {**plans[retailer].cfg, "jsonld_primary": True}})[retailer]
+        fast = parse_html(html, plan, parsers[0])
+        r = report.setdefault(retailer, {"pages": 0, "diffs": {}, "t_ld": 0.0, "t_dom": 0.0})
+        r["pages"] += 1
+        r["t_ld"] += t_ld
+        r["t_dom"] += t_dom
+        for f, a, b in zip(FIELDS, dom, fast):
+            if a != b:
+                r["diffs"].setdefault(f, []).append(f"{path.name}: DOM {a!r} → JSON-LD {b!r}")
+
+    print(f"{'✅' if not bad else '❌'} {len(paths)} pages x {len(parsers)} parsers: {bad} mismatch(es) "
+          f"in JSON-LD blocks / availability")
+    for retailer, r in sorted(report.items()):
+        print(f"\n{retailer}: {r['pages']} page(s) with complete JSON-LD; "
+              f"{r['t_ld'] / r['pages'] * 1e6:.0f} µs/page without DOM vs {r['t_dom'] / r['pages'] * 1e6:.0f} µs/page "
+              f"parse_html[{parsers[0]}]")
+        for f in FIELDS:
+            diffs = r["diffs"].get(f, [])
+            print(f"  {f:<10} {'same on every page' if not diffs else f'{len(diffs)} difference(s)'}")
+            for d in diffs[:5]:
+                print(f"    {d}")
+    sys.exit(1 if bad else 0)
+
+if __name__ == "__main__":
+    main()
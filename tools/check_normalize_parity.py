@@ -0,0 +1,66 @@
+# tools/check_normalize_parity.py
+# Check that the batched normalisers (ingestion/normalize.py) return bit-for-bit the same floats as the
+# scalar norm_price_text / norm_discount_text, on hand-picked French/English formats plus random snippets.
+# Runs every installed engine (pyarrow, numpy fallback); exits 1 on any mismatch.
+# Example: python tools/check_normalize_parity.py --random 200000
+import sys, random, struct, argparse
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "ingestion"))
+
+import normalize
+from plans import norm_discount_text, norm_price_text
+
+NBSP, NNBSP = "\u00a0", "\u202f"
+
+PRICE_CASES = [
+    "12,99 €", "12.99", "€12.99", "1 234,50 €", f"1{NBSP}234,50{NBSP}€", f"1{NNBSP}234,50{NNBSP}€",
+    f"12 345{NNBSP}678,00", "Prix : 7,5 €", "0,99", "1234,50", "1.234,50 €", "Économisez 3 € — 12,99 €",
+    "12,999", "de 5 à 12,99", "EUR 49,00 / 100 ml", "€ 1,234.56", "", None, "gratuit", "99 €", "12 ,99",
+]
+DISCOUNT_CASES = [
+    "-20%", "-20 %", f"-20{NNBSP}%", f"-15{NBSP}%", "Économisez 30 %", "100%", "-0%", "1234%", "-5\t%",
+    "", None, "promo", "20 % sur le 2e", "- 20 %",
+]
+
+def random_snippets(n: int, rng: random.Random):
+    alphabet = "0123456789,. €%-" + NBSP + NNBSP + "abcxyz"
+    for _ in range(n):
+        yield "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 16)))
+
+def bits(v) -> int:
+    """Canonical bit pattern: None/NaN -> one sentinel, else the IEEE-754 double."""
+    if v is None or v != v:
+        return -1
+    return struct.unpack("<q", struct.pack("<d", float(v)))[0]
+
+def check(name: str, texts, scalar, batched, engine: str) -> int:
+    got = batched(texts, engine=engine)
+    bad = [(t, scalar(t), g) for t, g in zip(texts, got) if bits(scalar(t)) != bits(g)]
+    for t, want, g in bad[:10]:
+        print(f"  ✗ {name}[{engine}] {t!r}: scalar={want!r} batched={g!r}")
+    print(f"{'✅' if not bad else '❌'} {name:<9} {engine:<8} {len(texts)} inputs, {len(bad)} mismatches")
+    return len(bad)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--random", type=int, default=50000, help="extra random snippets per function")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    prices = PRICE_CASES + list(random_snippets(args.random, rng))
+    discounts = DISCOUNT_CASES + list(random_snippets(args.random, rng))
+    engines = ["numpy"] + (["pyarrow"] if normalize.backend() == "pyarrow" else [])
+    if "pyarrow" not in engines:
+        print("pyarrow not installed: checking the numpy fallback only")
+
+    bad = 0
+    for engine in engines:
+        bad += check("price", prices, norm_price_text, normalize.normalize_prices, engine)
+        bad += check("discount", discounts, norm_discount_text, normalize.normalize_discounts, engine)
+    sys.exit(1 if bad else 0)
+
+if __name__ == "__main__":
+    main()
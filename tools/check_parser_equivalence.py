@@ -0,0 +1,57 @@
+# tools/check_parser_equivalence.py
+# Re-parse saved debug HTML with every installed parser backend and check that
+# price / list / discount / in_stock come out identical to html.parser.
+# Example: python tools/check_parser_equivalence.py --corpus debug --parsers html.parser lxml selectolax
+import sys, argparse
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "ingestion"))
+
+import yaml
+from htmldoc import PARSERS, available_parsers
+from plans import load_plans
+from runner import SEL, parse_html
+
+def retailer_of(path: Path, retailers):
+    """Debug dumps are named {retailer}_{ts}_{i}.html."""
+    for r in sorted(retailers, key=len, reverse=True):
+        if path.name.startswith(r + "_"):
+            return r
+    return None
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--corpus", type=Path, default=ROOT / "debug", help="directory of saved *.html pages")
+    ap.add_argument("--parsers", nargs="+", choices=PARSERS, default=None, help="backends to compare (default: all installed)")
+    args = ap.parse_args()
+
+    plans = load_plans(yaml.safe_load(SEL.read_text(encoding="utf-8")) or {})
+    installed = available_parsers()
+    parsers = [p for p in (args.parsers or installed) if p in installed]
+    missing = sorted(set(args.parsers or []) - set(installed))
+    if missing:
+        print(f"skipping (not installed): {', '.join(missing)}")
+    reference, others = "html.parser", [p for p in parsers if p != "html.parser"]
+
+    pages = sorted(args.corpus.rglob("*.html"))
+    checked = mismatches = 0
+    for path in pages:
+        retailer = retailer_of(path, plans)
+        if not retailer:
+            continue
+        plan = plans[retailer]
+        html = path.read_text(encoding="utf-8", errors="ignore")
+        expected = parse_html(html, plan, reference)
+        checked += 1
+        for p in others:
+            got = parse_html(html, plan, p)
+            if got != expected:
+                mismatches += 1
+                print(f"✗ {path.name} [{p}] {got} != {reference} {expected}")
+
+    print(f"\nchecked {checked} pages × {len(others)} backend(s) against {reference}: {mismatches} mismatch(es)")
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
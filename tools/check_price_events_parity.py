@@ -0,0 +1,126 @@
+# tools/check_price_events_parity.py
+# Check that price_events built incrementally (one `dbt run` per load) matches a --full-refresh of the same data,
+# and that both hold the events each scenario should produce. Runs the dbt duckdb target on a throwaway warehouse:
+# - a sample replaced later in its hour (stg_obs_hourly / price_history re-debounce the newest hour), with and
+#   without the replacement still crossing the threshold
+# - an out-of-stock sample (no price) after an in-stock one in the same hour
+# - a series quiet for more than a week, a sub-threshold move, oos / restock across loads
+# The project is copied to a temp dir (dbt writes target/ and logs/ there); dbt_packages/ is reused when found,
+# else `dbt deps` installs it. Needs dbt-duckdb. Exits 1 on any difference.
+# Example: python tools/check_price_events_parity.py --packages-dir dbt_packages
+import sys, shutil, argparse, tempfile
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "ingestion"))
+
+import yaml
+from runner import HEADER, OBS_SCHEMA, seed_column_types
+from sinks import DuckDBSink
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+try:
+    from dbt.cli.main import dbtRunner
+except ImportError:
+    dbtRunner = None
+
+LOADS = ("2025-09-01T10:05:00Z", "2025-09-01T11:05:00Z", "2025-09-01T11:40:00Z",
+         "2025-09-05T09:00:00Z", "2025-09-12T09:00:00Z")
+# sku_id: ({load: (price, in_stock)}, [(load, event_type, prev_price, price)] a correct build has)
+SCENARIOS = {
+    "SAME-HOUR":      ({0: (10.0, True), 1: (10.5, True), 2: (11.0, True)}, [(2, "price_up", 10.0, 11.0)]),
+    "SAME-HOUR-BACK": ({0: (10.0, True), 1: (10.5, True), 2: (10.02, True)}, []),
+    "SAME-HOUR-OOS":  ({0: (20.0, True), 1: (20.0, True), 2: (None, False)}, [(2, "oos", None, None)]),
+    "QUIET":          ({0: (30.0, True), 4: (33.0, True)}, [(4, "price_up", 30.0, 33.0)]),
+    "SMALL-MOVE":     ({0: (40.0, True), 3: (40.2, True)}, []),
+    "STOCK":          ({0: (50.0, True), 3: (None, False), 4: (50.0, True)},
+                       [(3, "oos", None, None), (4, "restock", None, None)]),
+}
+EVENTS_SQL = "select sku_id, event_ts, event_type, prev_price, price from main.price_events"
+
+def ts(load: int) -> datetime:
+    return datetime.strptime(LOADS[load], "%Y-%m-%dT%H:%M:%SZ")
+
+def num(v):
+    return None if v is None else round(float(v), 4)
+
+def load(warehouse: Path, i: int):
+    """Append load `i` of every scenario to raw.observations, as the runner's duckdb sink does."""
+    sink = DuckDBSink(warehouse, HEADER, column_types=seed_column_types(OBS_SCHEMA))
+    for sku, (readings, _) in SCENARIOS.items():
+        if i in readings:
+            price, in_stock = readings[i]
+            sink.write({"run_id": f"parity{i}", "observed_at_utc": LOADS[i], "sku_id": sku, "retailer": "amazon_fr",
+                        "price": price, "in_stock": in_stock, "currency": "EUR", "http_status": 200,
+                        "product_url": f"https://example.test/{sku}", "parse_error": ""})
+    sink.close()
+
+def dbt(project: Path, *args: str):
+    res = dbtRunner().invoke([*args, "--project-dir", str(project), "--profiles-dir", str(project), "--quiet"])
+    if not res.success:
+        raise SystemExit(f"dbt {' '.join(args)} failed: {res.exception or 'see the log above'}")
+
+def events(warehouse: Path):
+    con = duckdb.connect(str(warehouse))
+    try:
+        return {(sku, t, kind, num(prev), num(price)) for sku, t, kind, prev, price in con.execute(EVENTS_SQL).fetchall()}
+    finally:
+        con.close()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--packages-dir", type=Path, default=ROOT / "dbt_packages",
+                    help="installed dbt packages to reuse (else `dbt deps` runs, which needs network)")
+    ap.add_argument("--keep", action="store_true", help="keep the temp project and warehouse, and print their path")
+    args = ap.parse_args()
+    if dbtRunner is None or duckdb is None:
+        raise RuntimeError("this check needs dbt-duckdb (pip install dbt-duckdb)")
+
+    tmp = Path(tempfile.mkdtemp(prefix="bpt_price_events_"))
+    project, warehouse = tmp / "project", tmp / "warehouse.duckdb"
+    shutil.copytree(ROOT / "dbt", project / "dbt")
+    for name in ("dbt_project.yml", "packages.yml"):
+        shutil.copy(ROOT / name, project / name)
+    (project / "profiles.yml").write_text(yaml.safe_dump({"beauty_price_tracker": {
+        "target": "local", "outputs": {"local": {"type": "duckdb", "path": str(warehouse), "threads": 1}}}}))
+    if args.packages_dir.is_dir():
+        shutil.copytree(args.packages_dir, project / "dbt_packages")
+    else:
+        dbt(project, "deps")
+
+    try:
+        for i in range(len(LOADS)):
+            load(warehouse, i)
+            dbt(project, "run", "-s", "+price_events+")
+        incremental = events(warehouse)
+        dbt(project, "run", "--full-refresh", "-s", "+price_events+")
+        full = events(warehouse)
+    finally:
+        if args.keep:
+            print(f"kept {tmp}")
+        else:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    bad = 0
+    for sku, (_, expected) in SCENARIOS.items():
+        want = {(sku, ts(i), kind, prev, price) for i, kind, prev, price in expected}
+        got_inc = {e for e in incremental if e[0] == sku}
+        got_full = {e for e in full if e[0] == sku}
+        ok = got_inc == got_full == want
+        bad += not ok
+        print(f"  {'✓' if ok else '✗'} {sku:<15} {len(want)} expected, {len(got_inc)} incremental, {len(got_full)} full-refresh")
+        if not ok:
+            for name, got in (("incremental", got_inc), ("full-refresh", got_full)):
+                for e in sorted(got - want, key=str):
+                    print(f"      {name} extra   {e[1]} {e[2]} {e[3]} → {e[4]}")
+                for e in sorted(want - got, key=str):
+                    print(f"      {name} missing {e[1]} {e[2]} {e[3]} → {e[4]}")
+    print(f"{'✅' if not bad else '❌'} {len(SCENARIOS)} scenarios over {len(LOADS)} incremental loads, {bad} mismatch(es)")
+    sys.exit(1 if bad else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# tools/check_stock_scan_parity.py
+# Check that the node-by-node stock-text scan (plans.StockTextScanner) gives the same verdict as the
+# old full-page search: each stock-text pattern in priority order over the joined visible text.
+# - saved pages (bench corpus + debug/ by default), every installed parser backend, every retailer plan
+# - random texts built from the stock phrases, split into text nodes at random points and scanned with tiny
+#   windows too (phrases straddling window boundaries)
+# - prints the scan's peak buffer next to the size of the joined text it no longer builds
+# Exits 1 on any mismatch.
+# Example: python tools/check_stock_scan_parity.py --corpus tools/bench/corpus debug --random 20000
+import sys, random, argparse
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "ingestion"))
+
+import yaml
+from htmldoc import PARSERS, available_parsers, parse_document
+from plans import StockTextScanner, load_plans
+from runner import SEL
+
+PHRASES = ("en stock", "in stock", "disponible", "indisponible", "rupture de stock", "out of stock",
+           "sold out", "notify me", "usually ships", "available", "unavailable", "Ajouter au panier")
+FILLER = ("soin", "crème", "sérum", "flacon", "livraison", "avis", "ml", "€", "-20 %", "stock", "dispo")
+
+def reference(stock_text, text: str):
+    for rx, verdict in stock_text:
+        if rx.search(text):
+            return verdict
+    return None
+
+def split_nodes(text: str, rng: random.Random):
+    """Cut `text` at random spaces into stripped nodes whose " ".join is `text` again."""
+    words = text.split(" ")
+    nodes, cur = [], []
+    for w in words:
+        cur.append(w)
+        if rng.random() < 0.3:
+            nodes.append(" ".join(cur))
+            cur = []
+    if cur:
+        nodes.append(" ".join(cur))
+    return [n for n in nodes if n]
+
+def check_pages(paths, plans, parsers) -> int:
+    """Real pages through the default scanner (the text nodes come from the same iter_text as in detect_stock)."""
+    bad = 0
+    for path in paths:
+        html = path.read_text(encoding="utf-8", errors="replace")
+        for parser in parsers:
+            doc = parse_document(html, parser)
+            nodes = list(doc.iter_text())
+            text = " ".join(nodes)
+            peak = 0
+            for retailer, plan in plans.items():
+                want = reference(plan.stock_text, text)
+                got, used, _ = plan.stock_scan.scan(iter(nodes))
+                peak = max(peak, used)
+                if got != want:
+                    bad += 1
+                    print(f"  ✗ {path.name} [{parser}/{retailer}]: scan={got!r} full-text={want!r}")
+            print(f"  {path.name} [{parser}]: {len(nodes)} text nodes, joined text {sys.getsizeof(text) / 1024:.0f} KiB, "
+                  f"scan peak {peak} B")
+    return bad
+
+def check_random(n: int, plans, rng: random.Random) -> int:
+    """Tiny windows as well as the default one, so most phrases land across a window boundary."""
+    bad = 0
+    scanners = [(r, p.stock_text, [p.stock_scan] + [StockTextScanner(p.stock_text, window=w) for w in (1, 16, 48)])
+                for r, p in plans.items()]
+    for _ in range(n):
+        words = [rng.choice(PHRASES if rng.random() < 0.15 else FILLER) for _ in range(rng.randint(1, 40))]
+        nodes = split_nodes(" ".join(words), rng)
+        for retailer, stock_text, variants in scanners:
+            want = reference(stock_text, " ".join(nodes))
+            for sc in variants:
+                got = sc.scan(nodes)[0]
+                if got != want:
+                    bad += 1
+                    if bad <= 10:
+                        print(f"  ✗ {retailer}/window={sc.window} {nodes!r}: scan={got!r} full-text={want!r}")
+    return bad
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--corpus", nargs="+", type=Path, default=[ROOT / "tools" / "bench" / "corpus", ROOT / "debug"],
+                    help="directories of saved *.html pages (missing ones are skipped)")
+    ap.add_argument("--parsers", nargs="+", choices=PARSERS, default=None, help="backends to run (default: all installed)")
+    ap.add_argument("--random", type=int, default=5000, help="random node sequences per retailer plan")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    plans = load_plans(yaml.safe_load(SEL.read_text(encoding="utf-8")) or {})
+    installed = available_parsers()
+    parsers = [p for p in (args.parsers or installed) if p in installed]
+    paths = sorted(p for d in args.corpus if d.is_dir() for p in d.rglob("*.html"))
+
+    bad = check_pages(paths, plans, parsers)
+    print(f"{'✅' if not bad else '❌'} pages    {len(paths)} files x {len(parsers)} parsers x {len(plans)} plans, {bad} mismatches")
+    rnd = check_random(args.random, plans, random.Random(args.seed))
+    print(f"{'✅' if not rnd else '❌'} random   {args.random} node sequences x {len(plans)} plans, {rnd} mismatches")
+    sys.exit(1 if bad or rnd else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# tools/sim/crawl_sim.py
+# Offline end-to-end crawl benchmark: starts tools/sim/fake_retailer.py, points runner.run() at it through
+# --url-rewrite style rules and crawls N synthetic SKUs, so concurrency / rate-limit / retry / caching
+# settings can be compared deterministically without touching amazon.fr or sephora.fr.
+# - the server runs in its own process (its work does not share the runner's GIL)
+# - everything the runner writes goes under --out (use_data_dir): real data/ and caches are never touched
+# - retail_coverage.yml is copied there with the --concurrency/--burst/--retries/--jitter-pct overrides applied
+# - --rate-scale shrinks every wait (0.001: a 15 s interval becomes 15 ms) so 10k SKUs fit in minutes
+# - --runs 2+ re-crawls with the same caches: shows what ETag revalidation saves
+# - prints a per-run report (wall time, pages/s, status mix, retries, stage p50/p95) and writes report.json
+# Example: python tools/sim/crawl_sim.py --skus 10000 --concurrency 4 --rate-429 0.01 --rate-captcha 0.005 --runs 2
+import sys, json, time, argparse, subprocess, contextlib
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.request import urlopen
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "ingestion"))
+
+import yaml
+import runner
+from htmldoc import PARSERS, DEFAULT_PARSER
+from registry import SkuRow
+from fake_retailer import parser as server_parser  # tools/sim is on sys.path when run as a script
+
+SERVER = Path(__file__).resolve().parent / "fake_retailer.py"
+HOSTS = {"amazon_fr": "https://www.amazon.fr/dp/", "sephora_fr": "https://www.sephora.fr/p/"}
+SERVER_FLAGS = ("latency_ms", "jitter_ms", "size_kb", "rate_403", "rate_429", "rate_captcha", "retry_after",
+                "etag", "change_rate", "seed")
+REPORT_STAGES = ("queue_wait", "rate_wait", "connect", "ttfb", "download", "parse")
+
+def start_server(args):
+    cmd = [sys.executable, str(SERVER), "--port", "0"]
+    for f in SERVER_FLAGS:
+        cmd += [f"--{f.replace('_', '-')}", str(getattr(args, f))]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    if not line.startswith("listening on "):
+        proc.kill()
+        sys.exit(f"fake retailer failed to start: {line!r}")
+    return proc, line.split()[2]
+
+def server_stats(base: str):
+    with urlopen(f"{base}/__stats", timeout=10) as r:
+        return json.loads(r.read())["stats"]
+
+def sim_rows(retailers, skus: int):
+    per = max(1, skus // len(retailers))
+    buckets = {}
+    for r in retailers:
+        prefix = HOSTS.get(r, f"https://www.{r}.invalid/p/")
+        buckets[r] = [SkuRow(f"SIM-{i:05d}", "Skincare", "Sim", "SimBrand", f"Sim product {i}", 50.0, "ml", "", r,
+                             f"{prefix}SIM-{i:05d}", "EUR") for i in range(1, per + 1)]
+    return buckets
+
+def sim_coverage(args, out: Path) -> Path:
+    cov = runner.load_yaml(runner.COV)
+    for r in args.retailers:
+        lane = cov.setdefault("retailers", {}).setdefault(r, {})
+        if args.concurrency is not None:
+            lane["concurrency"] = args.concurrency
+        if args.burst is not None:
+            lane["burst"] = args.burst
+        if args.retries is not None:
+            lane.setdefault("retries", {})["attempts"] = args.retries
+        lane["jitter_pct"] = args.jitter_pct
+    path = out / "retail_coverage.yml"
+    path.write_text(yaml.safe_dump(cov, sort_keys=False, allow_unicode=True), encoding="utf-8")
+    return path
+
+def diff(after, before):
+    return {r: {k: v - (before.get(r) or {}).get(k, 0) for k, v in s.items()} for r, s in after.items()}
+
+def report(k: int, summary, metrics, served, log: Path):
+    wall = time.time() - summary["started_at"]
+    rows = len(summary["results"])
+    rep = {"run": k, "run_id": summary["run_id"], "wall_s": round(wall, 2), "rows": rows,
+           "pages_per_sec": round(rows / wall, 1) if wall else None, "retailers": {}}
+    print(f"\nrun {k} ({summary['run_id']}): {rows} rows in {wall:.1f}s → {rep['pages_per_sec']} pages/s  [log: {log}]")
+    for r, s in metrics["summary"].items():
+        c = metrics["retailers"].get(r, {})
+        st = s["stages"]
+        rep["retailers"][r] = {
+            "served": served.get(r, {}), "rows": s["rows"], "attempts": s["attempts"], "block_rate": s["block_rate"],
+            "retries": c.get("retries", 0), "breaker_trips": c.get("breaker_trips", 0),
+            "revalidated_304": c.get("revalidated_304", 0), "lane_seconds": c.get("lane_seconds"),
+            "stages": {k2: st[k2] for k2 in REPORT_STAGES if k2 in st},
+        }
+        codes = ", ".join(f"{code}×{n}" for code, n in sorted(served.get(r, {}).items()) if code[0].isdigit() and n)
+        print(f"  {r}: {s['attempts']} attempts ({codes}; captcha×{served.get(r, {}).get('captcha', 0)}), "
+              f"rows {s['rows']}, retries {c.get('retries', 0)}, breaker trips {c.get('breaker_trips', 0)}, "
+              f"lane {c.get('lane_seconds')}s")
+        print("    " + ", ".join(f"{name} p50 {st[name]['p50'] * 1000:.1f}/p95 {st[name]['p95'] * 1000:.1f} ms"
+                                 for name in REPORT_STAGES if name in st))
+    return rep
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--skus", type=int, default=2000, help="synthetic SKUs in total, split across retailers")
+    ap.add_argument("--retailers", nargs="+", default=["amazon_fr", "sephora_fr"])
+    ap.add_argument("--runs", type=int, default=1, help="crawls over the same caches (2+: revalidation at work)")
+    ap.add_argument("--rate-scale", type=float, default=0.001, help="multiply every runner wait by this")
+    ap.add_argument("--concurrency", type=int, default=None, help="workers per lane (default: retail_coverage.yml)")
+    ap.add_argument("--burst", type=int, default=None, help="token bucket burst per lane")
+    ap.add_argument("--retries", type=int, default=None, help="retry attempts per item")
+    ap.add_argument("--jitter-pct", type=float, default=0.0, help="limiter jitter (0 keeps runs deterministic)")
+    ap.add_argument("--parser", choices=PARSERS, default=DEFAULT_PARSER)
+    ap.add_argument("--stream", action="store_true")
+    ap.add_argument("--fixed-cadence", action="store_true")
+    ap.add_argument("--no-revalidate", action="store_true")
+    ap.add_argument("--out", type=Path, default=None, help="default: data/sim/<timestamp>")
+    server = ap.add_argument_group("fake retailer (see fake_retailer.py --help)")
+    for flag in SERVER_FLAGS:
+        opt = next(a for a in server_parser()._actions if a.dest == flag)
+        server.add_argument(*opt.option_strings, type=opt.type, default=opt.default, choices=opt.choices, help=opt.help)
+    args = ap.parse_args()
+
+    out = args.out or ROOT / "data" / "sim" / datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    out.mkdir(parents=True, exist_ok=True)
+    runner.COV = sim_coverage(args, out)
+    runner.use_data_dir(out / "data")
+    buckets = sim_rows(args.retailers, args.skus)
+
+    proc, base = start_server(args)
+    rules = [(HOSTS.get(r, f"https://www.{r}.invalid/p/"), f"{base}/{r}/") for r in args.retailers]
+    print(f"fake retailer at {base}; {sum(map(len, buckets.values()))} SKUs; output under {out}")
+    reports = []
+    try:
+        for k in range(1, args.runs + 1):
+            before = server_stats(base)
+            log = out / f"run{k}.log"
+            with log.open("w", encoding="utf-8") as f, contextlib.redirect_stdout(f):
+                summary = runner.run(args.retailers, 0, False, args.parser, revalidate=not args.no_revalidate,
+                                     buckets=buckets, adaptive_cadence=not args.fixed_cadence, stream=args.stream,
+                                     url_rewrite=rules, rate_scale=args.rate_scale)
+            metrics = json.loads(summary["metrics_path"].read_text(encoding="utf-8"))
+            reports.append(report(k, summary, metrics, diff(server_stats(base), before), log))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+    settings = {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()}
+    (out / "report.json").write_text(json.dumps({"settings": settings, "runs": reports}, indent=2) + "\n",
+                                     encoding="utf-8")
+    print(f"\n✅ Report → {out / 'report.json'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# tools/sim/fake_retailer.py
+# Local stand-in for the retailer sites, for offline crawl benchmarks (driven by tools/sim/crawl_sim.py).
+# - serves the recorded PDPs of tools/bench/corpus under /<retailer>/<anything>; the page behind a path is
+#   picked by hash, so every simulated SKU keeps the same template, tagged with its path and content version
+# - configurable latency (base + jitter), minimum body size, gzip
+# - 403 / 429 (+ Retry-After) / captcha-with-200 injection rates
+# - ETag behaviour: strong, weak or none; --change-rate = chance a page changed since it was last served
+# - every decision is a hash of (seed, path, n-th request for that path): same flags, same sequence per URL
+# - GET /__stats returns the counters as JSON
+# Example: python tools/sim/fake_retailer.py --port 8800 --latency-ms 80 --rate-429 0.01 --rate-captcha 0.005
+import sys, json, gzip, time, hashlib, argparse, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parents[2]
+CORPUS = ROOT / "tools" / "bench" / "corpus"
+
+def unit(*parts) -> float:
+    """Deterministic uniform [0, 1) from the given parts."""
+    h = hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=8).digest()
+    return int.from_bytes(h, "big") / 2 ** 64
+
+class Shop:
+    """Pages, per-path state and counters shared by all handler threads."""
+
+    def __init__(self, args):
+        self.args = args
+        self.pages: Dict[str, List[bytes]] = {}
+        self.captcha: Dict[str, bytes] = {}
+        for p in sorted(Path(args.corpus).glob("*.html")):
+            retailer, _, case = p.stem.rpartition("_")
+            body = p.read_bytes()
+            if case == "captcha":
+                self.captcha[retailer] = body
+            else:
+                self.pages.setdefault(retailer, []).append(body)
+        self.hits: Dict[str, int] = {}
+        self.version: Dict[str, int] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self.lock = threading.Lock()
+
+    def next_hit(self, path: str):
+        """(n-th request for this path, content version now served)."""
+        with self.lock:
+            n = self.hits[path] = self.hits.get(path, 0) + 1
+            v = self.version.get(path, 0)
+            if n > 1 and unit(self.args.seed, "change", path, n) < self.args.change_rate:
+                v = self.version[path] = v + 1
+            return n, v
+
+    def count(self, retailer: str, key: str, n: int = 1):
+        with self.lock:
+            b = self.stats.setdefault(retailer, {})
+            b[key] = b.get(key, 0) + n
+
+    def body(self, retailer: str, path: str, version: int) -> bytes:
+        pages = self.pages[retailer]
+        page = pages[int(unit(self.args.seed, "page", path) * len(pages))]
+        tag = f"\n<!-- sim {path} v{version} -->\n".encode()
+        pad = self.args.size_kb * 1024 - len(page) - len(tag)
+        return page + tag + (b"<!--" + b"." * (pad - 7) + b"-->" if pad > 7 else b"")
+
+    def etag(self, path: str, version: int) -> str:
+        tag = '"' + hashlib.sha1(f"{path}@{version}".encode()).hexdigest()[:16] + '"'
+        return "W/" + tag if self.args.etag == "weak" else tag
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real sites
+    shop: Shop
+
+    def log_message(self, *_):
+        pass
+
+    def send(self, status: int, body: bytes = b"", headers: Dict[str, str] = None, retailer: str = ""):
+        gz = self.shop.args.gzip and body and "gzip" in (self.headers.get("Accept-Encoding") or "")
+        if gz:
+            body = gzip.compress(body, compresslevel=1)
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if gz:
+            self.send_header("Content-Encoding", "gzip")
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+        if retailer:
+            self.shop.count(retailer, str(status))
+            self.shop.count(retailer, "bytes_sent", len(body))
+
+    def do_GET(self):
+        shop, a = self.shop, self.shop.args
+        if self.path == "/__stats":
+            with shop.lock:
+                data = json.dumps({"stats": shop.stats, "paths": len(shop.hits)}).encode()
+            self.send(200, data, {"Content-Type": "application/json"})
+            return
+        retailer = self.path.lstrip("/").split("/", 1)[0]
+        if retailer not in shop.pages:
+            self.send(404, b"unknown retailer")
+            return
+        n, version = shop.next_hit(self.path)
+        delay = (a.latency_ms + unit(a.seed, "lat", self.path, n) * a.jitter_ms) / 1000
+        if delay > 0:
+            time.sleep(delay)
+
+        u = unit(a.seed, "fault", self.path, n)
+        if u < a.rate_403:
+            self.send(403, b"<html><body>Forbidden</body></html>", retailer=retailer)
+        elif u < a.rate_403 + a.rate_429:
+            self.send(429, b"<html><body>Too Many Requests</body></html>", {"Retry-After": str(a.retry_after)}, retailer)
+        elif u < a.rate_403 + a.rate_429 + a.rate_captcha and retailer in shop.captcha:
+            shop.count(retailer, "captcha")
+            self.send(200, shop.captcha[retailer], retailer=retailer)
+        elif a.etag != "none" and self.headers.get("If-None-Match") == shop.etag(self.path, version):
+            self.send(304, headers={"ETag": shop.etag(self.path, version)}, retailer=retailer)
+        else:
+            headers = {"ETag": shop.etag(self.path, version)} if a.etag != "none" else {}
+            self.send(200, shop.body(retailer, self.path, version), headers, retailer)
+
+def parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(description="fake retailer server for offline crawl benchmarks")
+    ap.add_argument("--port", type=int, default=8800, help="0 = any free port (printed on the first stdout line)")
+    ap.add_argument("--corpus", type=Path, default=CORPUS, help="recorded pages, named {retailer}_{case}.html")
+    ap.add_argument("--latency-ms", type=float, default=50.0, help="time to first byte")
+    ap.add_argument("--jitter-ms", type=float, default=50.0, help="extra latency, uniform in [0, jitter]")
+    ap.add_argument("--size-kb", type=int, default=0, help="pad pages to at least this size")
+    ap.add_argument("--gzip", action=argparse.BooleanOptionalAction, default=True, help="gzip when the client accepts it")
+    ap.add_argument("--rate-403", type=float, default=0.0)
+    ap.add_argument("--rate-429", type=float, default=0.0)
+    ap.add_argument("--rate-captcha", type=float, default=0.0, help="captcha page served with HTTP 200")
+    ap.add_argument("--retry-after", type=int, default=30, help="Retry-After seconds sent with 429s")
+    ap.add_argument("--etag", choices=["strong", "weak", "none"], default="strong")
+    ap.add_argument("--change-rate", type=float, default=0.05, help="chance a page changed since it was last served")
+    ap.add_argument("--seed", type=int, default=1)
+    return ap
+
+def main():
+    args = parser().parse_args()
+    Handler.shop = Shop(args)
+    if not Handler.shop.pages:
+        sys.exit(f"no pages in {args.corpus}")
+    srv = ThreadingHTTPServer(("127.0.0.1", args.port), Handler)
+    srv.daemon_threads = True
+    print(f"listening on http://127.0.0.1:{srv.server_port} ({', '.join(sorted(Handler.shop.pages))})", flush=True)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
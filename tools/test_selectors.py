@@ -3,12 +3,16 @@
 # visibility filtering for list price, and policy flag to avoid
 # computing discount on retailers like Sephora.
 
-import time, re, csv, json, pathlib, requests, yaml
+import sys, time, re, json, argparse, pathlib, requests, yaml
 from bs4 import BeautifulSoup
 
 ROOT = pathlib.Path(__file__).resolve().parents[1]
-SEED = ROOT / "dbt/seeds/sku_registry.csv"
+sys.path.insert(0, str(ROOT / "ingestion"))
+from htmldoc import SOUP_PARSERS, default_soup_parser
+from registry import SEED, load_registry
+
 SEL  = ROOT / "ingestion/selectors_v2.yml"   # <— v2 config
+PARSER = default_soup_parser()  # --parser
 
 def headers(ua: str | None) -> dict:
     return {
@@ -39,15 +43,9 @@ def is_in_stock(text: str, in_pat: str, oos_pat: str) -> bool | None:
     return None
 
 def examples_from_seed() -> dict[str, list[str]]:
-    by: dict[str, list[str]] = {}
-    if not SEED.exists(): return by
-    with SEED.open(encoding="utf-8") as f:
-        for row in csv.DictReader(f):
-            r = row["retailer"].strip()
-            by.setdefault(r, [])
-            if len(by[r]) < 3:
-                by[r].append(row["product_url"])
-    return by
+    if not SEED.exists(): return {}
+    reg = load_registry(SEED)
+    return {r: reg.urls(r, 3) for r in reg.retailers()}
 
 # -------- JSON-LD availability/price --------
 def jsonld_offers(soup: BeautifulSoup) -> tuple[float | None, str | None, bool | None]:
@@ -211,6 +209,10 @@ def extract_with_fallback(soup: BeautifulSoup, sel: dict) -> tuple[float | None,
 
 # -------- Runner --------
 def main():
+    global PARSER
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--parser", choices=SOUP_PARSERS, default=PARSER, help="BeautifulSoup tree builder (default: lxml when installed)")
+    PARSER = ap.parse_args().parser
     cfg_all = yaml.safe_load(SEL.read_text(encoding="utf-8"))
     # prefer explicit examples list if you add it later; else take first 3 from seed
     examples = {r: (cfg_all[r].get("examples") or [])[:3]
@@ -231,7 +233,7 @@ def main():
                 rs = requests.get(url, headers=headers(ua), timeout=15)
                 print(f"- {url}\n  status={rs.status_code} len={len(rs.text)}")
                 rs.raise_for_status()
-                soup = BeautifulSoup(rs.text, "html.parser")
+                soup = BeautifulSoup(rs.text, PARSER)
                 price, list_price, disc, instock = extract_with_fallback(soup, sel)
                 print(f"  price={price} list={list_price} disc={disc} in_stock={instock}")
                 if instock is None:
@@ -1,11 +1,16 @@
-import re, csv, json, time, argparse
+import re, sys, json, time, argparse
 from pathlib import Path
 from bs4 import BeautifulSoup
 import yaml, requests
 
 ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "ingestion"))
+from htmldoc import SOUP_PARSERS, default_soup_parser
+from registry import SEED, load_registry
+
 SEL = ROOT / "ingestion" / "selectors.yml"
-SEED = ROOT / "dbt" / "seeds" / "sku_registry.csv"
+PARSER = default_soup_parser()  # --parser
+REGISTRY = load_registry(SEED)
 DBG  = ROOT / "debug"
 DBG.mkdir(exist_ok=True, parents=True)
 
@@ -14,13 +19,7 @@ def load_yaml(p: Path):
         return yaml.safe_load(f)
 
 def first_n_urls(retailer: str, n: int):
-    rows = []
-    with SEED.open(encoding="utf-8", errors="replace") as f:
-        r = csv.DictReader(f)
-        for row in r:
-            if row.get("retailer","").strip() == retailer:
-                rows.append(row["product_url"])
-    return rows[:n]
+    return REGISTRY.urls(retailer, n)
 
 def fetch(url: str, ua: str, timeout: int = 30):
     h = {"User-Agent": ua, "Accept-Language": "fr-FR,fr;q=0.9,en;q=0.8"}
@@ -39,7 +38,7 @@ def norm_discount_text(txt: str):
 def jsonld_stock(html: str):
     """Parse all JSON-LD blocks; return True/False if availability found, else None."""
     try:
-        soup = BeautifulSoup(html, "html.parser")
+        soup = BeautifulSoup(html, PARSER)
         for tag in soup.find_all("script", attrs={"type":"application/ld+json"}):
             txt = tag.get_text(" ", strip=True)
             if not txt: 
@@ -124,7 +123,7 @@ def detect_stock(soup: BeautifulSoup, html: str, cfg: dict):
     return None
 
 def parse_one(html: str, cfg: dict):
-    soup = BeautifulSoup(html, "html.parser")
+    soup = BeautifulSoup(html, PARSER)
     price = list_price = disc = None
 
     # price (current)
@@ -169,11 +168,14 @@ def run_for(retailer: str, limit: int, rate: int):
         time.sleep(delay)
 
 def main():
+    global PARSER
     ap = argparse.ArgumentParser()
     ap.add_argument("--retailers", nargs="+", default=["amazon_fr", "sephora_fr"])
     ap.add_argument("--limit", type=int, default=2)
     ap.add_argument("--rate", type=int, default=22)
+    ap.add_argument("--parser", choices=SOUP_PARSERS, default=PARSER, help="BeautifulSoup tree builder (default: lxml when installed)")
     args = ap.parse_args()
+    PARSER = args.parser
 
     for r in args.retailers:
         run_for(r, args.limit, args.rate)
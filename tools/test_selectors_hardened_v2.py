@@ -1,21 +1,28 @@
 # tools/test_selectors_hardened_v2.py
-import re, csv, json, time, argparse, random
+import re, sys, json, time, argparse, random
 from pathlib import Path
 from bs4 import BeautifulSoup
 import yaml, requests
 
 ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "ingestion"))
+from htmldoc import SOUP_PARSERS, default_soup_parser
+from registry import SEED, load_registry
+
 SEL  = ROOT / "ingestion" / "selectors.yml"
-SEED = ROOT / "dbt" / "seeds" / "sku_registry.csv"
+PARSER = default_soup_parser()  # --parser
+REGISTRY = load_registry(SEED)
 DBG  = ROOT / "debug"
 DBG.mkdir(exist_ok=True, parents=True)
 
 # --- Amazon block-page heuristics (tiny HTML + classic strings) ---
-AMZ_BLOCK_NEEDLES = [
+# shared with the runner via selectors.yml amazon_fr.block_detection
+_AMZ_BLOCK = (yaml.safe_load(SEL.read_text(encoding="utf-8")).get("amazon_fr") or {}).get("block_detection") or {}
+AMZ_BLOCK_NEEDLES = _AMZ_BLOCK.get("needles") or [
     "Robot Check", "/errors/validateCaptcha", "api-services-support@amazon",
     "To discuss automated access to Amazon data"
 ]
-AMZ_MIN_HTML_LEN = 30000  # typical real PDP is >100kB, block pages are ~5–12kB
+AMZ_MIN_HTML_LEN = int(_AMZ_BLOCK.get("min_html_len", 30000))  # typical real PDP is >100kB, block pages are ~5–12kB
 
 
 # -------------------- helpers --------------------
@@ -24,13 +31,7 @@ def load_yaml(p: Path):
         return yaml.safe_load(f)
 
 def first_n_urls(retailer: str, n: int):
-    rows = []
-    with SEED.open(encoding="utf-8", errors="replace") as f:
-        r = csv.DictReader(f)
-        for row in r:
-            if row.get("retailer", "").strip() == retailer:
-                rows.append(row["product_url"])
-    return rows[:n]
+    return REGISTRY.urls(retailer, n)
 
 def amazon_headers(ua: str) -> dict:
     return {
@@ -94,7 +95,7 @@ def norm_discount_text(txt: str):
 def jsonld_stock(html: str):
     """Parse all JSON-LD blocks; return True/False if availability found, else None."""
     try:
-        soup = BeautifulSoup(html, "html.parser")
+        soup = BeautifulSoup(html, PARSER)
         for tag in soup.find_all("script", attrs={"type": "application/ld+json"}):
             txt = tag.get_text(" ", strip=True)
             if not txt:
@@ -170,7 +171,7 @@ def detect_stock(soup: BeautifulSoup, html: str, cfg: dict):
 
 
 def parse_one(html: str, cfg: dict, retailer: str):
-    soup = BeautifulSoup(html, "html.parser")
+    soup = BeautifulSoup(html, PARSER)
     price = list_price = disc = None
 
     # 1) use selectors from YAML
@@ -255,11 +256,14 @@ def run_for(retailer: str, limit: int, rate: int):
         print(f"  [saved {out.name}]")
 
 def main():
+    global PARSER
     ap = argparse.ArgumentParser()
     ap.add_argument("--retailers", nargs="+", default=["amazon_fr", "sephora_fr"])
     ap.add_argument("--limit", type=int, default=2)
     ap.add_argument("--rate", type=int, default=26)  # a bit slower by default
+    ap.add_argument("--parser", choices=SOUP_PARSERS, default=PARSER, help="BeautifulSoup tree builder (default: lxml when installed)")
     args = ap.parse_args()
+    PARSER = args.parser
 
     for r in args.retailers:
         run_for(r, args.limit, args.rate)